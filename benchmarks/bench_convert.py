@@ -0,0 +1,50 @@
+"""
+Times the conversion of the getifaddrs() and the Windows backends for a large
+synthetic interface table. No special privileges or operating system are
+needed, the tables come from ``ifaddr._fake``::
+
+    python benchmarks/bench_convert.py --addresses 100000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr._fake as fake  # noqa: E402
+import ifaddr._posix as posix  # noqa: E402
+import ifaddr._shared as shared  # noqa: E402
+import ifaddr._win32 as win32  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--addresses', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Both tables have an IPv4 and an IPv6 address per interface.
+    count = args.addresses // 2
+    libc = fake.FakeLibc(fake.synthetic(count))
+    posix_filter = shared.AdapterFilter(multicast_flag=posix.IFF_MULTICAST)
+    win32_adapters = fake.win32_adapters(count)
+    win32_filter = shared.AdapterFilter(multicast_flag=win32.IFF_MULTICAST)
+
+    print(f'{count} interfaces, {2 * count} addresses')
+    for name, function in [
+        ('getifaddrs', lambda: list(posix.adapters_from_libc(libc, False, posix_filter))),
+        (
+            'win32',
+            lambda: win32.convert_win32_adapters(
+                win32_adapters, include_unconfigured=False, adapter_filter=win32_filter
+            ),
+        ),
+    ]:
+        best = min(timeit.Timer(function).repeat(repeat=args.repeat, number=1))
+        print(f'{name:>12}: {best * 1000:8.2f} ms ({best / (2 * count) * 1e6:.2f} µs per address)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Compares filtering in get_adapters() with filtering its full result in Python,
+for the common "IPv4 on up, non-loopback, multicast capable interfaces" query.
+
+Run as root to populate a throwaway network namespace with many interfaces,
+only a tenth of which are up::
+
+    python benchmarks/bench_filter.py --interfaces 2000
+"""
+
+import argparse
+import os
+import socket
+import sys
+import timeit
+from typing import Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr  # noqa: E402
+import ifaddr._posix  # noqa: E402
+from _namespace import enter_namespace, populate  # noqa: E402
+
+
+def filter_in_python(backend: Any) -> List[ifaddr.IP]:
+    result = []
+    for adapter in backend.get_adapters():
+        if not adapter.multicast or adapter.name == 'lo':
+            continue
+        result.extend(ip for ip in adapter.ips if ip.is_IPv4)
+    return result
+
+
+def filter_while_walking(backend: Any) -> List[ifaddr.IP]:
+    adapters = backend.get_adapters(
+        family=socket.AF_INET, exclude_loopback=True, require_multicast=True, require_up=True
+    )
+    return [ip for adapter in adapters for ip in adapter.ips]
+
+
+def run(repeat: int) -> None:
+    backends = [('getifaddrs', ifaddr._posix)]
+    if sys.platform.startswith('linux'):
+        import ifaddr._netlink as netlink
+
+        backends.append(('netlink', netlink))
+    for backend_name, backend in backends:
+        for name, function in [('python', filter_in_python), ('pruned', filter_while_walking)]:
+            timer = timeit.Timer(lambda: function(backend))
+            best = min(timer.repeat(repeat=repeat, number=1))
+            print(f'{backend_name:>12} {name:>8}: {best * 1000:8.2f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--interfaces', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.interfaces:
+        enter_namespace()
+        populate(args.interfaces, up_every=10)
+    run(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
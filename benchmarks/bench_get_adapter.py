@@ -0,0 +1,62 @@
+"""
+Compares looking up a single interface with get_adapter() against filtering
+and scanning get_adapters(), for both Linux backends.
+
+Run as root to populate a throwaway network namespace with many interfaces::
+
+    python benchmarks/bench_get_adapter.py --interfaces 1000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from typing import Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr._netlink  # noqa: E402
+import ifaddr._posix  # noqa: E402
+from _namespace import enter_namespace, populate  # noqa: E402
+
+
+def run(repeat: int) -> None:
+    adapters = list(ifaddr._posix.get_adapters(include_unconfigured=True))
+    target = adapters[-1]
+    print(f'{len(adapters)} adapters, looking up {target.name} (index {target.index})')
+    backends: List[Any] = [ifaddr._posix, ifaddr._netlink]
+    for backend in backends:
+        label = backend.__name__.rsplit('.', 1)[-1].lstrip('_')
+        assert backend.get_adapter(target.name) == backend.get_adapter(target.index)
+
+        def scan() -> List[ifaddr.Adapter]:
+            adapters = backend.get_adapters(include_unconfigured=True)
+            return [adapter for adapter in adapters if adapter.name == target.name]
+
+        def names_filter() -> List[ifaddr.Adapter]:
+            return list(backend.get_adapters(include_unconfigured=True, names=[target.name]))
+
+        for name, function in [
+            ('scan get_adapters()', scan),
+            ('names filter', names_filter),
+            ('get_adapter(name)', lambda: backend.get_adapter(target.name)),
+            ('get_adapter(index)', lambda: backend.get_adapter(target.index)),
+        ]:
+            best = min(timeit.Timer(function).repeat(repeat=repeat, number=1))
+            print(f'{label:>8} {name:>20}: {best * 1000:8.3f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--interfaces', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.interfaces:
+        enter_namespace()
+        populate(args.interfaces)
+    run(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
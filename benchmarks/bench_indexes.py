@@ -0,0 +1,55 @@
+"""
+Shows what getting the interface indexes costs the getifaddrs() backend. It
+compares its get_adapters() call with the if_nametoindex() call per
+interface it used to make, and with a single if_nameindex() call.
+
+Run as root to populate a throwaway network namespace with many interfaces::
+
+    python benchmarks/bench_indexes.py --interfaces 5000
+"""
+
+import argparse
+import os
+import socket
+import sys
+import timeit
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr  # noqa: E402
+import ifaddr._posix as posix  # noqa: E402
+from _namespace import enter_namespace, populate  # noqa: E402
+
+
+def run(repeat: int) -> None:
+    profiles: List[ifaddr.CallProfile] = []
+    ifaddr.set_profile_hook(profiles.append)
+    adapters = list(posix.get_adapters(include_unconfigured=True))
+    ifaddr.set_profile_hook(None)
+    names = [adapter.name for adapter in adapters]
+    print(f'{len(adapters)} adapters, system calls: {profiles[0].syscalls}')
+
+    for label, function in [
+        ('get_adapters()', lambda: posix.get_adapters(include_unconfigured=True)),
+        ('if_nametoindex() each', lambda: [socket.if_nametoindex(name) for name in names]),
+        ('if_nameindex() once', socket.if_nameindex),
+    ]:
+        best = min(timeit.Timer(function).repeat(repeat=repeat, number=1))
+        print(f'{label:>22}: {best * 1000:8.2f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--interfaces', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.interfaces:
+        enter_namespace()
+        populate(args.interfaces)
+    run(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
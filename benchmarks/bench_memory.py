@@ -0,0 +1,55 @@
+"""
+Measures memory use and allocations of :class:`ifaddr.Adapter` and :class:`ifaddr.IP`
+for a large synthetic set of addresses::
+
+    python benchmarks/bench_memory.py --addresses 10000
+"""
+
+import argparse
+import ipaddress
+import os
+import sys
+import tracemalloc
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr  # noqa: E402
+import ifaddr._shared as shared  # noqa: E402
+
+
+def build(count: int) -> List[ifaddr.Adapter]:
+    adapters = []
+    for i in range(count // 2):
+        name = f'veth{i}'
+        ips = [
+            ifaddr.IP(shared.IPv4Ext(ipaddress.IPv4Address(0x0A000000 + i).packed), 24, name),
+            ifaddr.IP(
+                shared.IPv6Ext(ipaddress.IPv6Address((0xFE80 << 112) + i).packed, 0, i), 64, name
+            ),
+        ]
+        adapters.append(ifaddr.Adapter(name, name, ips, index=i))
+    return adapters
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--addresses', type=int, default=10000)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    adapters = build(args.addresses)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    print(f'{len(adapters)} adapters, {args.addresses} addresses')
+    print(f'retained: {size / 1024:10.1f} KiB ({size / args.addresses:.0f} bytes per address)')
+    print(f'blocks:   {blocks:10d} ({blocks / args.addresses:.1f} per address)')
+
+
+if __name__ == '__main__':
+    main()
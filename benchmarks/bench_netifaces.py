@@ -0,0 +1,59 @@
+"""
+Compares ifaddr.netifaces with the netifaces C extension, if it's installed.
+
+Run as root to populate a throwaway network namespace with many interfaces::
+
+    python benchmarks/bench_netifaces.py --interfaces 1000
+
+Without ``--interfaces`` the interfaces of the current namespace are used.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from typing import Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr.netifaces  # noqa: E402
+from _namespace import enter_namespace, populate  # noqa: E402
+
+
+def run(repeat: int) -> None:
+    implementations: List[Any] = [('ifaddr', ifaddr.netifaces)]
+    try:
+        import netifaces
+    except ImportError:
+        print('netifaces is not installed, only measuring ifaddr')
+    else:
+        implementations.append(('netifaces', netifaces))
+
+    interfaces = ifaddr.netifaces.interfaces()
+    # The last interface is the worst case for a scan that stops at the match.
+    name = interfaces[-1]
+    print(f'{len(interfaces)} interfaces, querying {name}')
+    for label, module in implementations:
+        for function, call in [
+            ('interfaces()', module.interfaces),
+            ('ifaddresses()', lambda: module.ifaddresses(name)),
+            ('gateways()', module.gateways),
+        ]:
+            best = min(timeit.Timer(call).repeat(repeat=repeat, number=1))
+            print(f'{label:>10} {function:>14}: {best * 1000:8.3f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--interfaces', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.interfaces:
+        enter_namespace()
+        populate(args.interfaces)
+    run(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Compares the rtnetlink and getifaddrs() backends on Linux.
+
+Run as root to populate a throwaway network namespace with many interfaces::
+
+    python benchmarks/bench_netlink.py --interfaces 2000
+
+Without ``--interfaces`` the interfaces of the current namespace are used.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr._netlink  # noqa: E402
+import ifaddr._posix  # noqa: E402
+from _namespace import enter_namespace, populate  # noqa: E402
+
+
+def run(repeat: int) -> None:
+    adapters = list(ifaddr._posix.get_adapters(include_unconfigured=True))
+    print(f'{len(adapters)} adapters, {sum(len(a.ips) for a in adapters)} addresses')
+    for name, function in [
+        ('getifaddrs', ifaddr._posix.get_adapters),
+        ('netlink', ifaddr._netlink.get_adapters),
+    ]:
+        timer = timeit.Timer(lambda: list(function()))
+        best = min(timer.repeat(repeat=repeat, number=1))
+        print(f'{name:>12}: {best * 1000:8.2f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--interfaces', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.interfaces:
+        enter_namespace()
+        populate(args.interfaces)
+    run(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares enumerating many network namespaces with ifaddr.netns.get_adapters()
+against running a subprocess per namespace, which is what you'd do without
+it. Needs root, unshare and nsenter::
+
+    python benchmarks/bench_netns.py --namespaces 100
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr.netns  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def spawn_namespaces(count: int) -> List['subprocess.Popen[bytes]']:
+    children = []
+    for _ in range(count):
+        child = subprocess.Popen(
+            ['unshare', '--net', 'sh', '-c', 'ip link set lo up; echo; exec sleep 3600'],
+            stdout=subprocess.PIPE,
+        )
+        children.append(child)
+    for child in children:
+        assert child.stdout is not None
+        child.stdout.readline()
+    return children
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--namespaces', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    children = spawn_namespaces(args.namespaces)
+    try:
+        paths = [f'/proc/{child.pid}/ns/net' for child in children]
+
+        start = time.perf_counter()
+        for path in paths:
+            subprocess.run(
+                ['nsenter', f'--net={path}', sys.executable, '-c']
+                + ['import ifaddr; ifaddr.get_adapters()'],
+                check=True,
+                env=dict(os.environ, PYTHONPATH=ROOT),
+            )
+        subprocesses = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = ifaddr.netns.get_adapters(paths, max_workers=args.workers)
+        threads = time.perf_counter() - start
+        errors = [result for result in results.values() if result.error is not None]
+        assert not errors, errors
+
+        print(f'{args.namespaces} namespaces')
+        print(f'   subprocess per namespace: {subprocesses * 1000:10.1f} ms')
+        print(f'  ifaddr.netns.get_adapters: {threads * 1000:10.1f} ms')
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares finding the local network of many peer addresses with
+:class:`ifaddr.PrefixTable` against scanning every IP with :mod:`ipaddress`::
+
+    python benchmarks/bench_prefix.py --networks 200 --peers 10000
+"""
+
+import argparse
+import ipaddress
+import os
+import random
+import sys
+import timeit
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr  # noqa: E402
+
+
+def build(networks: int) -> List[ifaddr.Adapter]:
+    adapters = []
+    for i in range(networks):
+        name = f'eth{i}'
+        prefix = 16 + i % 13
+        packed = ipaddress.IPv4Address(0x0A000001 + (i << 16)).packed
+        ip = ifaddr.IP.from_packed(packed, prefix, name)
+        adapters.append(ifaddr.Adapter(name, name, [ip], index=i + 1))
+    return adapters
+
+
+def scan(
+    adapters: List[ifaddr.Adapter], peers: List[str]
+) -> List[Optional[Tuple[ifaddr.Adapter, ifaddr.IP]]]:
+    results = []
+    for peer in peers:
+        address = ipaddress.ip_address(peer)
+        best: Optional[Tuple[ifaddr.Adapter, ifaddr.IP]] = None
+        for adapter in adapters:
+            for ip in adapter.ips:
+                network = ipaddress.ip_network(f'{ip.address}/{ip.network_prefix}', strict=False)
+                if address not in network:
+                    continue
+                if best is None or ip.network_prefix > best[1].network_prefix:
+                    best = (adapter, ip)
+        results.append(best)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--networks', type=int, default=200)
+    parser.add_argument('--peers', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    adapters = build(args.networks)
+    rng = random.Random(0)
+    # About half of the peers are in one of the networks.
+    peers = [
+        str(ipaddress.IPv4Address(0x0A000000 + (rng.randrange(args.networks * 2) << 16) + host))
+        for host in (rng.randrange(1 << 16) for _ in range(args.peers))
+    ]
+    table = ifaddr.PrefixTable.from_adapters(adapters)
+    assert table.lookup_many(peers) == [table.lookup(peer) for peer in peers]
+
+    print(f'{args.networks} networks, {args.peers} peers')
+    # The scan is quadratic, a sample is enough to extrapolate from.
+    sample = peers[: max(1, args.peers // 100)]
+    assert scan(adapters, sample) == table.lookup_many(sample)
+    timer = timeit.Timer(lambda: ifaddr.PrefixTable.from_adapters(adapters))
+    print(f'{"build table":>16}: {min(timer.repeat(repeat=args.repeat, number=1)) * 1e3:10.3f} ms')
+    for name, function, count in [
+        ('ipaddress scan', lambda: scan(adapters, sample), len(sample)),
+        ('lookup', lambda: [table.lookup(peer) for peer in peers], args.peers),
+        ('lookup_many', lambda: table.lookup_many(peers), args.peers),
+    ]:
+        best = min(timeit.Timer(function).repeat(repeat=args.repeat, number=1))
+        print(f'{name:>16}: {best / count * 1e6:10.3f} µs per peer')
+
+
+if __name__ == '__main__':
+    main()
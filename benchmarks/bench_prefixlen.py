@@ -0,0 +1,50 @@
+"""
+Compares netmask to prefix length conversion with the ipaddress based
+approach used previously::
+
+    python benchmarks/bench_prefixlen.py
+"""
+
+import ipaddress
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ifaddr._shared import netmask_to_prefixlen  # noqa: E402
+
+IPV4_NETMASK = ipaddress.IPv4Address('255.255.255.0')
+IPV6_NETMASK = ipaddress.IPv6Address('ffff:ffff:ffff:ffff::')
+IPV4_PACKED = IPV4_NETMASK.packed
+IPV6_PACKED = IPV6_NETMASK.packed
+
+
+def legacy_ipv4(netmask: ipaddress.IPv4Address) -> int:
+    return ipaddress.IPv4Network('0.0.0.0/' + str(netmask)).prefixlen
+
+
+def legacy_ipv6(netmask: ipaddress.IPv6Address) -> int:
+    prefix_length = 0
+    address_as_int = int(netmask)
+    for i in range(netmask.max_prefixlen):
+        if address_as_int >> i & 1:
+            prefix_length = prefix_length + 1
+    return prefix_length
+
+
+def main() -> None:
+    cases = [
+        ('IPv4 ipaddress', lambda: legacy_ipv4(IPV4_NETMASK)),
+        ('IPv4 packed', lambda: netmask_to_prefixlen(IPV4_PACKED)),
+        ('IPv6 bit loop', lambda: legacy_ipv6(IPV6_NETMASK)),
+        ('IPv6 packed', lambda: netmask_to_prefixlen(IPV6_PACKED)),
+    ]
+    for name, function in cases:
+        number = 100000
+        best = min(timeit.repeat(function, number=number, repeat=5))
+        print(f'{name:>16}: {best / number * 1e9:8.0f} ns')
+
+
+if __name__ == '__main__':
+    main()
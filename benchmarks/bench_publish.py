@@ -0,0 +1,61 @@
+"""
+Compares what a worker process pays per lookup when it enumerates the adapters
+itself with what it pays when it reads them from a SnapshotPublisher.
+
+Run as root to populate a throwaway network namespace with many interfaces::
+
+    python benchmarks/bench_publish.py --interfaces 1000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr  # noqa: E402
+from _namespace import enter_namespace, populate  # noqa: E402
+
+
+def run(repeat: int) -> None:
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        path = os.path.join(tmp, 'adapters')
+        publisher = ifaddr.SnapshotPublisher(path, include_unconfigured=True)
+        publisher.publish()
+        reader = ifaddr.SnapshotReader(path)
+        reader.get_adapters()
+        print(f'{len(reader.get_adapters())} adapters, {os.path.getsize(path)} bytes published')
+
+        def reload() -> None:
+            # A fresh reader loads the file like a worker after a change.
+            ifaddr.SnapshotReader(path).get_adapters()
+
+        for label, function in [
+            ('get_adapters()', lambda: ifaddr.get_adapters(include_unconfigured=True)),
+            ('reader.changed()', reader.changed),
+            ('reader.get_adapters()', reader.get_adapters),
+            ('load new version', reload),
+        ]:
+            timer = timeit.Timer(function)
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat=repeat, number=number)) / number
+            print(f'{label:>22}: {best * 1e6:10.1f} µs')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--interfaces', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.interfaces:
+        enter_namespace()
+        populate(args.interfaces)
+    run(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Times encoding and decoding snapshots with Snapshot.to_bytes()/from_bytes()
+and to_json()/from_json(), with pickle for comparison, for a typical node
+and for a large synthetic interface table::
+
+    python benchmarks/bench_serialize.py --interfaces 8,1000
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import timeit
+from typing import Any, Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr  # noqa: E402
+import ifaddr._fake as fake  # noqa: E402
+import ifaddr._posix as posix  # noqa: E402
+from ifaddr._shared import AdapterFilter  # noqa: E402
+
+
+def make_snapshot(count: int) -> ifaddr.Snapshot:
+    libc = fake.FakeLibc(fake.synthetic(count))
+    adapter_filter = AdapterFilter(multicast_flag=posix.IFF_MULTICAST)
+    return ifaddr.Snapshot(posix.adapters_from_libc(libc, True, adapter_filter))
+
+
+def run(count: int, repeat: int) -> None:
+    snapshot = make_snapshot(count)
+    encodings: List[Tuple[str, Callable[[], Any], Callable[[Any], Any]]] = [
+        ('bytes', snapshot.to_bytes, ifaddr.Snapshot.from_bytes),
+        ('json', snapshot.to_json, ifaddr.Snapshot.from_json),
+        ('pickle', lambda: pickle.dumps(snapshot), pickle.loads),
+    ]
+    print(f'{count} interfaces, {sum(len(a.ips) for a in snapshot)} addresses')
+    for name, encode, decode in encodings:
+        encoded = encode()
+        timer = timeit.Timer(encode)
+        number, _ = timer.autorange()
+        encode_time = min(timer.repeat(repeat=repeat, number=number)) / number
+        timer = timeit.Timer(lambda: decode(encoded))
+        number, _ = timer.autorange()
+        decode_time = min(timer.repeat(repeat=repeat, number=number)) / number
+        print(
+            f'{name:>8}: {len(encoded):9d} bytes, encode {encode_time * 1e6:10.1f} µs, '
+            f'decode {decode_time * 1e6:10.1f} µs ({1 / decode_time:10.0f} per second)'
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--interfaces', type=lambda s: [int(n) for n in s.split(',')], default=[8, 1000]
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    for count in args.interfaces:
+        run(count, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
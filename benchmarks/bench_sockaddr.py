@@ -0,0 +1,61 @@
+"""
+Compares decoding the socket addresses of a getifaddrs() list in place with
+precompiled structs (ifaddr._sockaddr.read_sockaddr) against the ctypes
+structures and pointer casts the backend used before. The list comes from
+``ifaddr._fake``::
+
+    python benchmarks/bench_sockaddr.py --addresses 100000
+"""
+
+import argparse
+import ctypes
+import os
+import socket
+import sys
+import timeit
+from typing import Any, List, Optional, Union
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr._fake as fake  # noqa: E402
+from ifaddr._shared import IPv4Ext, IPv6Ext  # noqa: E402
+from ifaddr._sockaddr import read_sockaddr, sockaddr, sockaddr_in, sockaddr_in6  # noqa: E402
+
+
+def ctypes_sockaddr_to_ip(sockaddr_ptr: Any) -> Optional[Union[IPv4Ext, IPv6Ext]]:
+    # What sockaddr_to_ip() did before it used read_sockaddr()
+    if sockaddr_ptr:
+        if sockaddr_ptr[0].sa_familiy == socket.AF_INET:
+            ipv4 = ctypes.cast(sockaddr_ptr, ctypes.POINTER(sockaddr_in))
+            return IPv4Ext(bytes(ipv4[0].sin_addr))
+        elif sockaddr_ptr[0].sa_familiy == socket.AF_INET6:
+            ipv6 = ctypes.cast(sockaddr_ptr, ctypes.POINTER(sockaddr_in6))
+            return IPv6Ext(bytes(ipv6[0].sin6_addr), ipv6[0].sin6_flowinfo, ipv6[0].sin6_scope_id)
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--addresses', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    libc = fake.FakeLibc(fake.synthetic(args.addresses // 2))
+    # The backend gets the addresses as integers from the unpacked nodes, and
+    # had ctypes pointers before.
+    pointers: List[Any] = [node.ifa_addr for node in libc.nodes if node.ifa_addr]
+    addresses = [ctypes.addressof(p.contents) for p in pointers]
+    pointers = [ctypes.cast(a, ctypes.POINTER(sockaddr)) for a in addresses]
+    assert [read_sockaddr(a)[1] for a in addresses] == [ctypes_sockaddr_to_ip(p) for p in pointers]
+
+    print(f'{len(addresses)} socket addresses')
+    for name, function in [
+        ('ctypes casts', lambda: [ctypes_sockaddr_to_ip(p) for p in pointers]),
+        ('read_sockaddr', lambda: [read_sockaddr(a) for a in addresses]),
+    ]:
+        best = min(timeit.Timer(function).repeat(repeat=args.repeat, number=1))
+        print(f'{name:>14}: {best * 1000:8.2f} ms ({best / len(addresses) * 1e9:.0f} ns each)')
+
+
+if __name__ == '__main__':
+    main()
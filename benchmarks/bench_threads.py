@@ -0,0 +1,84 @@
+"""
+Measures the throughput of parallel get_adapters() calls for an increasing
+number of threads, every thread making the same number of calls. Scaling is
+only to be expected from a free-threaded build (python3.13t and later) on a
+machine with enough cores::
+
+    python3.14t benchmarks/bench_threads.py --threads 1,2,4,8
+
+By default the calls convert a synthetic table from a fake getifaddrs() (see
+``ifaddr._fake``), which measures ifaddr's own code. With ``--system`` they
+enumerate the system's interfaces with the platform's default backend.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr  # noqa: E402
+import ifaddr._fake as fake  # noqa: E402
+import ifaddr._posix as posix  # noqa: E402
+import ifaddr._shared as shared  # noqa: E402
+
+
+def wall_time(function: Callable[[], Any], threads: int, calls: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def worker() -> None:
+        barrier.wait()
+        for _ in range(calls):
+            function()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        '--threads',
+        type=lambda s: [int(n) for n in s.split(',')],
+        default=[1, 2, 4, os.cpu_count() or 1],
+    )
+    parser.add_argument('--calls', type=int, default=200, help='calls per thread')
+    parser.add_argument('--interfaces', type=int, default=100)
+    parser.add_argument('--system', action='store_true')
+    args = parser.parse_args()
+
+    if args.system:
+        function: Callable[[], Any] = lambda: list(ifaddr.get_adapters())  # noqa: E731
+    else:
+        libc = fake.FakeLibc(fake.synthetic(args.interfaces))
+        adapter_filter = shared.AdapterFilter(multicast_flag=posix.IFF_MULTICAST)
+        function = lambda: list(posix.adapters_from_libc(libc, False, adapter_filter))  # noqa: E731
+    function()
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f'Python {sys.version.split()[0]}, GIL {"enabled" if gil else "disabled"}, ', end='')
+    print(f'{os.cpu_count()} CPUs')
+    single = None
+    for threads in sorted(set(args.threads)):
+        seconds = wall_time(function, threads, args.calls)
+        throughput = threads * args.calls / seconds
+        single = single or throughput
+        print(
+            f'{threads:3d} threads: {throughput:10.1f} calls/s '
+            f'({throughput / single:5.2f}x, {throughput / single / threads:6.1%} efficiency)'
+        )
+
+
+if __name__ == '__main__':
+    main()
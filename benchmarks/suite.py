@@ -0,0 +1,181 @@
+"""
+Measures wall time and allocations of the enumeration building blocks for
+interface tables of increasing size and stores the results as JSON, so runs
+of different versions can be compared::
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --output after.json --compare before.json
+
+By default the tables are served by a fake getifaddrs() (see ``ifaddr._fake``). With
+``--namespace`` (root and iproute2 required) every size is measured in a fresh
+network namespace with real interfaces instead, using the platform's default
+backend.
+"""
+
+import argparse
+import gc
+import ipaddress
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ifaddr  # noqa: E402
+import ifaddr._fake as fake  # noqa: E402
+import ifaddr._posix as posix  # noqa: E402
+import ifaddr._shared as shared  # noqa: E402
+from ifaddr._sockaddr import sockaddr_to_ip  # noqa: E402
+import ifaddr.netifaces  # noqa: E402
+from _namespace import populate  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+Benchmark = Tuple[str, Callable[[], Any]]
+
+
+def measure(function: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    gc.collect()
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = function()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {
+        'seconds': best,
+        'peak_bytes': peak - before,
+        'retained_bytes': retained - before,
+    }
+
+
+def primitives(size: int, libc: fake.FakeLibc) -> List[Benchmark]:
+    # The first `size` entries are the link-layer ones.
+    sockaddrs = [node.ifa_addr for node in libc.nodes[size:]]
+    netmasks = [ipaddress.IPv6Address((2**128 - 1) ^ (2 ** (i % 129) - 1)) for i in range(size)]
+    packed = [ipaddress.IPv4Address(0x0A000000 + i).packed for i in range(size)]
+    return [
+        ('sockaddr_to_ip', lambda: [sockaddr_to_ip(s) for s in sockaddrs]),
+        ('ipv6_prefixlength', lambda: [shared.ipv6_prefixlength(n) for n in netmasks]),
+        ('IP.from_packed', lambda: [ifaddr.IP.from_packed(p, 24, 'mock') for p in packed]),
+    ]
+
+
+def fake_benchmarks(size: int) -> List[Benchmark]:
+    libc = fake.FakeLibc(fake.synthetic(size))
+    adapter_filter = shared.AdapterFilter(multicast_flag=posix.IFF_MULTICAST)
+
+    def get_adapters(include_unconfigured: bool = False) -> Any:
+        return posix.adapters_from_libc(libc, include_unconfigured, adapter_filter)
+
+    # netifaces goes through ifaddr.get_adapters().
+    ifaddr.get_adapters = get_adapters  # type: ignore[assignment]
+    return [
+        ('get_adapters', lambda: list(get_adapters())),
+        ('netifaces.interfaces', ifaddr.netifaces.interfaces),
+    ] + primitives(size, libc)
+
+
+def namespace_benchmarks(size: int) -> List[Benchmark]:
+    return [
+        ('get_adapters', lambda: list(ifaddr.get_adapters())),
+        ('netifaces.interfaces', ifaddr.netifaces.interfaces),
+    ] + primitives(size, fake.FakeLibc(fake.synthetic(size)))
+
+
+def run(sizes: List[int], repeat: int, namespace: bool) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        if namespace:
+            # One child per size, each in its own namespace.
+            output = subprocess.run(
+                ['unshare', '--net', sys.executable, __file__, '--child', str(size)]
+                + ['--repeat', str(repeat)],
+                check=True,
+                capture_output=True,
+            ).stdout
+            measured = json.loads(output)
+        else:
+            measured = [
+                {'benchmark': name, 'size': size, **measure(function, repeat)}
+                for name, function in fake_benchmarks(size)
+            ]
+        for result in measured:
+            print(
+                f'{result["benchmark"]:>22} {size:6d}: {result["seconds"] * 1000:10.3f} ms '
+                f'{result["peak_bytes"] / 1024:10.1f} KiB peak',
+                flush=True,
+            )
+        results += measured
+    return results
+
+
+def run_child(size: int, repeat: int) -> None:
+    populate(size)
+    results = [
+        {'benchmark': name, 'size': size, **measure(function, repeat)}
+        for name, function in namespace_benchmarks(size)
+    ]
+    json.dump(results, sys.stdout)
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {(r['benchmark'], r['size']): r for r in json.load(f)['results']}
+    print(f'\nchanges relative to {baseline_path}:')
+    for result in results:
+        old = baseline.get((result['benchmark'], result['size']))
+        if old is None:
+            continue
+        time = result['seconds'] / old['seconds'] - 1
+        memory = result['peak_bytes'] / max(old['peak_bytes'], 1) - 1
+        print(
+            f'{result["benchmark"]:>22} {result["size"]:6d}: '
+            f'time {time:+8.1%}  peak memory {memory:+8.1%}'
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--sizes', type=lambda s: [int(n) for n in s.split(',')])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--namespace', action='store_true')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare with')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, args.repeat)
+        return
+
+    results = run(args.sizes or DEFAULT_SIZES, args.repeat, args.namespace)
+    document = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'mode': 'namespace' if args.namespace else 'fake',
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
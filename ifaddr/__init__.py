@@ -21,11 +21,96 @@
 
 import sys
 
-from ifaddr._shared import Adapter, IP
+# Same as typing.TYPE_CHECKING (type checkers treat it as true), without the
+# cost of importing typing.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from ifaddr._cache import AdapterCache
+    from ifaddr._prefix import PrefixTable
+    from ifaddr._profile import CallProfile, set_profile_hook
+    from ifaddr._publish import SnapshotPublisher, SnapshotReader
+    from ifaddr._shared import Adapter, AdapterStats, AddressRecord, IP
+    from ifaddr._snapshot import Snapshot, SnapshotDiff
+    from ifaddr._watch import AdapterChange, ChangeType, IPChange, Watcher, watch
+
+    if sys.platform == 'win32':
+        from ifaddr._win32 import get_adapter, get_adapters, iter_addresses
+    elif sys.platform.startswith('linux'):
+        from ifaddr._netlink import get_adapter, get_adapters, iter_addresses
+    else:
+        from ifaddr._posix import get_adapter, get_adapters, iter_addresses
 
 if sys.platform == 'win32':
-    from ifaddr._win32 import get_adapters
+    _backend = 'ifaddr._win32'
+elif sys.platform.startswith('linux'):
+    _backend = 'ifaddr._netlink'
 else:
-    from ifaddr._posix import get_adapters
+    _backend = 'ifaddr._posix'
+
+# The submodules (and with them ctypes, ipaddress and the C library) are
+# imported when one of their names is first looked up, not by `import ifaddr`.
+_lazy = {
+    'Adapter': 'ifaddr._shared',
+    'AdapterCache': 'ifaddr._cache',
+    'AdapterChange': 'ifaddr._watch',
+    'AdapterStats': 'ifaddr._shared',
+    'AddressRecord': 'ifaddr._shared',
+    'CallProfile': 'ifaddr._profile',
+    'ChangeType': 'ifaddr._watch',
+    'IP': 'ifaddr._shared',
+    'IPChange': 'ifaddr._watch',
+    'PrefixTable': 'ifaddr._prefix',
+    'Snapshot': 'ifaddr._snapshot',
+    'SnapshotDiff': 'ifaddr._snapshot',
+    'SnapshotPublisher': 'ifaddr._publish',
+    'SnapshotReader': 'ifaddr._publish',
+    'Watcher': 'ifaddr._watch',
+    'get_adapter': _backend,
+    'get_adapters': _backend,
+    'iter_addresses': _backend,
+    'set_profile_hook': 'ifaddr._profile',
+    'watch': 'ifaddr._watch',
+}
+
+
+def __getattr__(name: str) -> object:
+    try:
+        module_name = _lazy[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    import importlib
+
+    # The import system serializes concurrent imports of the same module, so
+    # threads racing here all get (and store) the same object.
+    value = getattr(importlib.import_module(module_name), name)
+    # Later lookups find the name in the module dict and don't end up here.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
+
 
-__all__ = ['Adapter', 'IP', 'get_adapters']
+__all__ = [
+    'Adapter',
+    'AdapterCache',
+    'AdapterChange',
+    'AdapterStats',
+    'AddressRecord',
+    'CallProfile',
+    'ChangeType',
+    'IP',
+    'IPChange',
+    'PrefixTable',
+    'Snapshot',
+    'SnapshotDiff',
+    'SnapshotPublisher',
+    'SnapshotReader',
+    'Watcher',
+    'get_adapter',
+    'get_adapters',
+    'iter_addresses',
+    'set_profile_hook',
+    'watch',
+]
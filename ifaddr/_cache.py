@@ -0,0 +1,163 @@
+# Copyright (c) 2014 Stefan C. Mueller
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import select
+import socket
+import sys
+import threading
+import time
+from types import TracebackType
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+import ifaddr._shared as shared
+
+
+def _default_get_adapters(include_unconfigured: bool) -> Iterable[shared.Adapter]:
+    import ifaddr
+
+    return ifaddr.get_adapters(include_unconfigured=include_unconfigured)
+
+
+class AdapterCache:
+    """
+    Caches the result of :func:`ifaddr.get_adapters`.
+
+    Results are reused for `ttl` seconds (forever if `ttl` is `None`) or until
+    :meth:`invalidate` is called. With `invalidate_on_change` the cache is
+    also invalidated as soon as the kernel reports a link or address change
+    (Linux only, elsewhere the TTL applies as usual).
+
+    The cache is thread-safe. When several threads find the cache stale at the
+    same time only one of them enumerates the adapters, the others wait for
+    and share its result.
+
+    The returned :class:`ifaddr.Adapter` objects are shared between callers
+    and must not be modified.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = 1.0,
+        *,
+        invalidate_on_change: bool = False,
+        get_adapters: Optional[Callable[[bool], Iterable[shared.Adapter]]] = None,
+    ) -> None:
+        self.ttl = ttl
+        #: Number of calls answered from the cache. Counted without a lock, so
+        #: concurrent calls may be undercounted.
+        self.hits = 0
+        #: Number of calls that had to enumerate the adapters.
+        self.misses = 0
+        self._get_adapters = get_adapters or _default_get_adapters
+        self._lock = threading.Lock()
+        # Separate from _lock so invalidating doesn't wait for an enumeration.
+        self._generation_lock = threading.Lock()
+        self._generation = 0
+        # include_unconfigured -> (generation, timestamp, adapters)
+        self._entries: Dict[bool, Tuple[int, float, List[shared.Adapter]]] = {}
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        if invalidate_on_change:
+            self._start_listener()
+
+    def get_adapters(self, include_unconfigured: bool = False) -> List[shared.Adapter]:
+        """
+        Same as :func:`ifaddr.get_adapters` but answered from the cache if
+        possible.
+        """
+        entry = self._entries.get(include_unconfigured)
+        if entry is not None and self._is_fresh(entry):
+            self.hits += 1
+            return list(entry[2])
+
+        with self._lock:
+            # Somebody else may have refreshed the entry while we were waiting.
+            entry = self._entries.get(include_unconfigured)
+            if entry is not None and self._is_fresh(entry):
+                self.hits += 1
+                return list(entry[2])
+            self.misses += 1
+            generation = self._generation
+            adapters = list(self._get_adapters(include_unconfigured))
+            self._entries[include_unconfigured] = (generation, time.monotonic(), adapters)
+            return list(adapters)
+
+    def _is_fresh(self, entry: Tuple[int, float, List[shared.Adapter]]) -> bool:
+        generation, timestamp, _ = entry
+        if generation != self._generation:
+            return False
+        return self.ttl is None or time.monotonic() - timestamp < self.ttl
+
+    def invalidate(self) -> None:
+        """Discards the cached results, the next call enumerates the adapters again."""
+        # Bumping the generation also discards results of enumerations that are
+        # in flight right now, they may have started before the change happened.
+        # The lock keeps concurrent bumps from getting lost without the GIL.
+        with self._generation_lock:
+            self._generation += 1
+
+    def _start_listener(self) -> None:
+        if not sys.platform.startswith('linux'):
+            return
+        import ifaddr._netlink as netlink
+
+        try:
+            self._socket = netlink.open_socket(
+                netlink.RTMGRP_LINK | netlink.RTMGRP_IPV4_IFADDR | netlink.RTMGRP_IPV6_IFADDR
+            )
+        except OSError:
+            return
+        self._thread = threading.Thread(
+            target=self._listen, args=(self._socket,), name='ifaddr-cache', daemon=True
+        )
+        self._thread.start()
+
+    def _listen(self, sock: socket.socket) -> None:
+        while self._socket is sock:
+            try:
+                readable, _, _ = select.select([sock], [], [], 0.5)
+                if readable:
+                    sock.recv(65536)
+            except OSError:
+                # Either closed or ENOBUFS. Invalidating is the right thing to do
+                # in both cases.
+                readable = [sock]
+            if readable:
+                self.invalidate()
+
+    def close(self) -> None:
+        """Stops listening for change notifications."""
+        sock, self._socket = self._socket, None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if sock is not None:
+            sock.close()
+
+    def __enter__(self) -> 'AdapterCache':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,365 @@
+# Copyright (c) 2014 Stefan C. Mueller
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+"""
+Synthetic and recorded interface tables for tests and benchmarks.
+
+:class:`FakeLibc` stands in for the C library: its `getifaddrs()` hands out a
+genuine `struct ifaddrs` linked list, so the getifaddrs() backend runs
+unmodified::
+
+    libc = FakeLibc(synthetic(10000))
+    adapters = ifaddr._posix.adapters_from_libc(libc, False, adapter_filter)
+
+The entries can be made up (:func:`entry`, :func:`link_entry`,
+:func:`synthetic`) or recorded from the running system (:func:`record`) and
+stored as JSON (:func:`dumps`, :func:`loads`). :func:`win32_adapters` does the
+same for the conversion of the Windows backend, it's the only part that works
+on Windows.
+"""
+
+import ctypes
+import json
+import os
+import socket
+import sys
+from typing import Any, List, NamedTuple, Optional, Sequence, Union
+
+import ifaddr._shared as shared
+from ifaddr._sockaddr import sockaddr, sockaddr_in, sockaddr_in6
+import ifaddr._win32 as win32
+
+if sys.platform == 'win32':
+    DEFAULT_FLAGS = shared.IFF_UP | shared.IFF_BROADCAST | shared.IFF_RUNNING
+else:
+    from ifaddr._posix import IFF_MULTICAST
+
+    DEFAULT_FLAGS = shared.IFF_UP | shared.IFF_BROADCAST | shared.IFF_RUNNING | IFF_MULTICAST
+
+_NO_GETIFADDRS = 'Windows has no getifaddrs() to stand in for'
+
+
+class Entry(NamedTuple):
+    """One `struct ifaddrs`, the addresses are raw `struct sockaddr` bytes."""
+
+    name: str
+    flags: int
+    addr: Optional[bytes] = None
+    netmask: Optional[bytes] = None
+    ifu: Optional[bytes] = None
+    data: Optional[bytes] = None
+
+
+def sockaddr_bytes(ip: Union[shared.IPv4Ext, shared.IPv6Ext]) -> bytes:
+    value: Union[sockaddr_in, sockaddr_in6]
+    if isinstance(ip, shared.IPv6Ext):
+        value = sockaddr_in6()
+        value.sin6_addr[:] = ip.packed
+        value.sin6_flowinfo = ip.flowinfo
+        value.sin6_scope_id = ip.scope_id
+        family = socket.AF_INET6
+    else:
+        value = sockaddr_in()
+        value.sin_addr[:] = ip.packed
+        family = socket.AF_INET
+    header = sockaddr.from_buffer(value)
+    header.sa_familiy = family
+    if hasattr(header, 'sa_len'):
+        header.sa_len = ctypes.sizeof(value)
+    return bytes(value)
+
+
+def _netmask(ip: Union[shared.IPv4Ext, shared.IPv6Ext], prefixlen: int) -> bytes:
+    bits = len(ip.packed) * 8
+    mask = ((1 << prefixlen) - 1) << (bits - prefixlen)
+    packed = mask.to_bytes(bits // 8, 'big')
+    if isinstance(ip, shared.IPv6Ext):
+        return sockaddr_bytes(shared.IPv6Ext(packed, 0, 0))
+    return sockaddr_bytes(shared.IPv4Ext(packed))
+
+
+def entry(
+    name: str,
+    ip: Union[shared.IPv4Ext, shared.IPv6Ext],
+    prefixlen: int,
+    *,
+    flags: int = DEFAULT_FLAGS,
+    broadcast: Optional[Union[shared.IPv4Ext, shared.IPv6Ext]] = None,
+    peer: Optional[Union[shared.IPv4Ext, shared.IPv6Ext]] = None,
+) -> Entry:
+    """An IP address entry, `flags` should match `broadcast`/`peer`."""
+    ifu = broadcast or peer
+    return Entry(
+        name,
+        flags,
+        sockaddr_bytes(ip),
+        _netmask(ip, prefixlen),
+        None if ifu is None else sockaddr_bytes(ifu),
+    )
+
+
+def link_entry(
+    name: str,
+    index: int,
+    mac: bytes,
+    *,
+    flags: int = DEFAULT_FLAGS,
+    stats: Optional[shared.AdapterStats] = None,
+) -> Entry:
+    """A link-layer entry (AF_PACKET on Linux, AF_LINK on BSD derived systems)."""
+    # Also aids with platform-specific type-checking
+    if sys.platform == 'win32':
+        raise OSError(_NO_GETIFADDRS)
+    import ifaddr._posix as posix
+
+    if posix.AF_PACKET is not None:
+        ll = posix.sockaddr_ll(sll_family=posix.AF_PACKET, sll_ifindex=index, sll_halen=len(mac))
+        ll.sll_addr[: len(mac)] = mac
+        data = None
+        if stats is not None:
+            data = bytes(posix.rtnl_link_stats(*stats))
+        return Entry(name, flags, bytes(ll), data=data)
+    # sdl_data grows to hold the name and the address, sdl_len says by how much.
+    payload = name.encode() + mac
+    length = max(posix.sdl_data_offset + len(payload), ctypes.sizeof(posix.sockaddr_dl))
+    dl = posix.sockaddr_dl(
+        sdl_len=length,
+        sdl_family=posix.AF_LINK,
+        sdl_index=index,
+        sdl_nlen=len(name),
+        sdl_alen=len(mac),
+    )
+    header = bytes(dl)[: posix.sdl_data_offset]
+    return Entry(name, flags, (header + payload).ljust(length, b'\0'))
+
+
+def synthetic(count: int) -> List[Entry]:
+    """
+    Entries for `count` interfaces named `fake0`, `fake1`, ... with a MAC
+    address, an IPv4 and an IPv6 address each. Like glibc all link-layer
+    entries come first.
+    """
+    names = [f'fake{i}' for i in range(count)]
+    links = [
+        link_entry(name, i + 1, b'\x02\x00' + i.to_bytes(4, 'big')) for i, name in enumerate(names)
+    ]
+    ipv4 = [
+        entry(
+            name,
+            shared.IPv4Ext(bytes([10, i >> 16 & 0xFF, i >> 8 & 0xFF, i & 0xFF])),
+            8,
+            broadcast=shared.IPv4Ext(b'\x0a\xff\xff\xff'),
+        )
+        for i, name in enumerate(names)
+    ]
+    ipv6 = [
+        entry(name, shared.IPv6Ext(b'\xfd' + bytes(11) + i.to_bytes(4, 'big'), 0, 0), 64)
+        for i, name in enumerate(names)
+    ]
+    return links + ipv4 + ipv6
+
+
+def _sockaddr_size(pointer: Any, family: int) -> int:
+    # Also aids with platform-specific type-checking
+    if sys.platform == 'win32':
+        raise OSError(_NO_GETIFADDRS)
+    import ifaddr._posix as posix
+
+    header = pointer.contents
+    if getattr(header, 'sa_len', 0):
+        return int(header.sa_len)
+    # Netmasks don't necessarily have their family set, they share the
+    # address' structure.
+    family = header.sa_familiy or family
+    if family == socket.AF_INET:
+        return ctypes.sizeof(sockaddr_in)
+    if family == socket.AF_INET6:
+        return ctypes.sizeof(sockaddr_in6)
+    if family == posix.AF_PACKET:
+        return ctypes.sizeof(posix.sockaddr_ll)
+    return ctypes.sizeof(sockaddr)
+
+
+def _read_sockaddr(pointer: Any, family: int) -> Optional[bytes]:
+    if not pointer:
+        return None
+    return ctypes.string_at(pointer, _sockaddr_size(pointer, family))
+
+
+def record(libc: Any = None) -> List[Entry]:
+    """Reads the current getifaddrs() list of `libc` (the C library by default)."""
+    # Also aids with platform-specific type-checking
+    if sys.platform == 'win32':
+        raise OSError(_NO_GETIFADDRS)
+    import ifaddr._posix as posix
+
+    libc = posix.get_libc() if libc is None else libc
+    head = ctypes.POINTER(posix.ifaddrs)()
+    if libc.getifaddrs(ctypes.byref(head)) != 0:
+        eno = ctypes.get_errno()
+        raise OSError(eno, os.strerror(eno))
+    entries = []
+    try:
+        address = ctypes.addressof(head.contents) if head else 0
+        while address:
+            node = posix.ifaddrs.from_address(address)
+            address = ctypes.addressof(node.ifa_next.contents) if node.ifa_next else 0
+            family = node.ifa_addr.contents.sa_familiy if node.ifa_addr else 0
+            data = None
+            if family == posix.AF_PACKET and node.ifa_data:
+                data = ctypes.string_at(node.ifa_data, ctypes.sizeof(posix.rtnl_link_stats))
+            entries.append(
+                Entry(
+                    node.ifa_name.decode(encoding='UTF-8'),
+                    node.ifa_flags,
+                    _read_sockaddr(node.ifa_addr, family),
+                    _read_sockaddr(node.ifa_netmask, family),
+                    _read_sockaddr(node.ifa_ifu, family),
+                    data,
+                )
+            )
+    finally:
+        libc.freeifaddrs(head)
+    return entries
+
+
+def dumps(entries: Sequence[Entry]) -> str:
+    return json.dumps(
+        [
+            {
+                field: value.hex() if isinstance(value, bytes) else value
+                for field, value in e._asdict().items()
+            }
+            for e in entries
+        ]
+    )
+
+
+def loads(text: str) -> List[Entry]:
+    return [
+        Entry(
+            item['name'],
+            item['flags'],
+            *(
+                None if item[field] is None else bytes.fromhex(item[field])
+                for field in ('addr', 'netmask', 'ifu', 'data')
+            ),
+        )
+        for item in json.loads(text)
+    ]
+
+
+class FakeLibc:
+    """
+    Implements `getifaddrs()`/`freeifaddrs()` for a fixed list of entries.
+
+    The linked list is built once and handed out by every `getifaddrs()`
+    call, `outstanding` counts the lists that haven't been freed yet. If
+    `errno` is set `getifaddrs()` fails with it instead.
+    """
+
+    #: The nodes of the list, an array of `struct ifaddrs`.
+    nodes: Any
+
+    def __init__(self, entries: Sequence[Entry], errno: Optional[int] = None) -> None:
+        self.entries = list(entries)
+        self.errno = errno
+        self.outstanding = 0
+        # Everything the list points to has to stay alive as long as the list.
+        self._buffers: List[Any] = []
+        # Also aids with platform-specific type-checking
+        if sys.platform == 'win32':
+            raise OSError(_NO_GETIFADDRS)
+        import ifaddr._posix as posix
+
+        self.nodes = (posix.ifaddrs * len(self.entries))()
+        for node, e in zip(self.nodes, self.entries):
+            node.ifa_flags = e.flags
+            self._point(node, 'ifa_name', e.name.encode(encoding='UTF-8') + b'\0')
+            for field, value in [
+                ('ifa_addr', e.addr),
+                ('ifa_netmask', e.netmask),
+                ('ifa_ifu', e.ifu),
+                ('ifa_data', e.data),
+            ]:
+                if value is not None:
+                    self._point(node, field, value)
+        for i in range(len(self.nodes) - 1):
+            self._store(self.nodes[i], 'ifa_next', ctypes.addressof(self.nodes[i + 1]))
+
+    @staticmethod
+    def _store(node: Any, field: str, address: int) -> None:
+        # Writing the raw address keeps ctypes from attaching keep-alive
+        # references to the nodes, which memory from libc doesn't have either.
+        offset = getattr(type(node), field).offset
+        ctypes.c_void_p.from_address(ctypes.addressof(node) + offset).value = address
+
+    def _point(self, node: Any, field: str, value: bytes) -> None:
+        buffer = ctypes.create_string_buffer(value, len(value))
+        self._buffers.append(buffer)
+        self._store(node, field, ctypes.addressof(buffer))
+
+    def getifaddrs(self, ifap: Any) -> int:
+        if self.errno is not None:
+            ctypes.set_errno(self.errno)
+            return -1
+        # `ifap` is ctypes.byref(pointer), _obj is the pointer itself.
+        head = ctypes.addressof(self.nodes) if self.entries else None
+        ctypes.c_void_p.from_address(ctypes.addressof(ifap._obj)).value = head
+        self.outstanding += 1
+        return 0
+
+    def freeifaddrs(self, ifa: Any) -> None:
+        self.outstanding -= 1
+
+
+def win32_adapters(count: int) -> List[win32.IPAdapterAddress]:
+    """
+    What `ifaddr._win32.get_win32_adapters()` could return for `count`
+    adapters with an IPv4 and an IPv6 address each.
+    """
+
+    def unicast(ip: Union[shared.IPv4Ext, shared.IPv6Ext], prefixlen: int) -> Any:
+        return win32.IPAdapterUnicastAddress(0, ip, 0, 0, 0, 0, 0, 0, prefixlen)
+
+    return [
+        win32.IPAdapterAddress(
+            if_index=i + 1,
+            adapter_name=f'{{00000000-0000-0000-0000-{i:012x}}}',
+            unicast_addresses=[
+                unicast(shared.IPv4Ext(bytes([10, i >> 16 & 0xFF, i >> 8 & 0xFF, i & 0xFF])), 8),
+                unicast(shared.IPv6Ext(b'\xfd' + bytes(11) + i.to_bytes(4, 'big'), 0, 0), 64),
+            ],
+            anycast_addresses=[],
+            multicast_addresses=[],
+            dns_server_addresses=[],
+            dns_suffix='',
+            description=f'Fake Ethernet Adapter #{i}',
+            friendly_name=f'Ethernet {i}',
+            physical_address=b'\x02\x00' + i.to_bytes(4, 'big'),
+            flags=0,
+            mtu=1500,
+            if_type=6,
+            oper_status=win32.IF_OPER_STATUS_UP,
+            ipv6_if_index=i + 1,
+            zone_indices=[0] * 16,
+        )
+        for i in range(count)
+    ]
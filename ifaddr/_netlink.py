@@ -0,0 +1,658 @@
+# Copyright (c) 2014 Stefan C. Mueller
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+# Linux rtnetlink backend. Instead of going through getifaddrs() (which talks
+# rtnetlink internally anyway) we dump the links and addresses ourselves and
+# decode the replies straight from the receive buffer. That saves the ctypes
+# overhead of walking the ifaddrs linked list and gives us interface indexes
+# for free.
+
+import contextlib
+import errno
+import itertools
+import os
+import socket
+import struct
+import sys
+
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import ifaddr._profile as _profile
+import ifaddr._shared as shared
+
+# To aid with platform-specific type-checking
+assert sys.platform.startswith('linux')
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+
+RTM_GETLINK = 18
+RTM_GETADDR = 22
+RTM_GETROUTE = 26
+
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_STATS = 7
+IFLA_STATS64 = 23
+
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+IFA_BROADCAST = 4
+
+RTA_OIF = 4
+RTA_GATEWAY = 5
+RTA_PRIORITY = 6
+RTA_TABLE = 15
+
+RT_TABLE_MAIN = 254
+RTN_UNICAST = 1
+# Route flags in /proc/net/route and /proc/net/ipv6_route
+RTF_UP = 0x1
+RTF_GATEWAY = 0x2
+
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
+# Same as ifaddr._posix.IFF_MULTICAST on Linux. The getifaddrs() backend (and
+# with it ctypes) is only imported when we have to fall back to it.
+IFF_MULTICAST = 0x1000
+
+SOL_NETLINK = 270
+NETLINK_GET_STRICT_CHK = 12
+
+RECEIVE_BUFFER_SIZE = 64 * 1024
+
+nlmsghdr = struct.Struct('=IHHII')
+nlmsgerr = struct.Struct('=i')
+ifinfomsg = struct.Struct('=BxHiII')
+ifaddrmsg = struct.Struct('=BBBBI')
+rtmsg = struct.Struct('=BBBBBBBBI')
+rtattr = struct.Struct('=HH')
+rtgenmsg = struct.Struct('=Bxxx')
+# The first ten counters of struct rtnl_link_stats(64), matching AdapterStats
+link_stats = struct.Struct('=10I')
+link_stats64 = struct.Struct('=10Q')
+
+
+class Link(NamedTuple):
+    ifindex: int
+    name: str
+    flags: int
+    mac: Optional[str]
+    stats: Optional[shared.AdapterStats]
+
+
+class Address(NamedTuple):
+    family: int
+    prefixlen: int
+    ifindex: int
+    label: Optional[str]
+    packed: bytes
+    # The broadcast or the peer address, what getifaddrs() calls ifa_ifu
+    destination: Optional[bytes]
+
+
+# Every call uses a socket of its own, so the sequence numbers only need to be
+# unique per socket. That a free-threaded build may hand out a number twice
+# when threads race on the counter therefore doesn't matter.
+_sequence = itertools.count(1)
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def enable_strict_checking(sock: socket.socket) -> None:
+    """
+    Makes the kernel honour the filters in dump requests. Older kernels
+    don't know the option and dump everything, which is harmless.
+    """
+    with contextlib.suppress(OSError):
+        sock.setsockopt(SOL_NETLINK, NETLINK_GET_STRICT_CHK, 1)
+
+
+class _ProfiledSocket(socket.socket):
+    """A netlink socket that counts its calls in a :class:`CallProfile`."""
+
+    def __init__(self, profile: _profile.CallProfile) -> None:
+        super().__init__(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        self.profile = profile
+        profile.syscall('socket')
+
+    def send(self, *args: Any) -> int:
+        self.profile.syscall('send')
+        return super().send(*args)
+
+    def recv_into(self, *args: Any) -> int:
+        self.profile.syscall('recv')
+        return super().recv_into(*args)
+
+
+def open_socket(groups: int = 0, profile: Optional[_profile.CallProfile] = None) -> socket.socket:
+    if profile is None:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+    else:
+        sock = _ProfiledSocket(profile)
+    try:
+        sock.bind((0, groups))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def dump(
+    sock: socket.socket, msg_type: int, family: int, body: Optional[bytes] = None
+) -> Iterator[Tuple[int, memoryview]]:
+    """
+    Sends a dump request and yields `(message type, message)` pairs for every
+    reply. The message view covers the whole message including the header and
+    is only valid until the next item is requested.
+
+    The request body is a `struct rtgenmsg` for `family` unless `body` is given.
+    """
+    if body is None:
+        body = rtgenmsg.pack(family)
+    return request(sock, msg_type, NLM_F_DUMP, body)
+
+
+def request(
+    sock: socket.socket, msg_type: int, flags: int, body: bytes
+) -> Iterator[Tuple[int, memoryview]]:
+    """
+    Sends a request and yields the replies like :func:`dump`. Requests without
+    `NLM_F_DUMP` end after the first reply.
+    """
+    seq = next(_sequence)
+    header = nlmsghdr.pack(nlmsghdr.size + len(body), msg_type, NLM_F_REQUEST | flags, seq, 0)
+    sock.send(header + body)
+
+    buffer = bytearray(RECEIVE_BUFFER_SIZE)
+    view = memoryview(buffer)
+    while True:
+        received = sock.recv_into(buffer)
+        offset = 0
+        while offset + nlmsghdr.size <= received:
+            length, reply_type, _flags, reply_seq, _pid = nlmsghdr.unpack_from(buffer, offset)
+            if length < nlmsghdr.size:
+                raise OSError('Malformed netlink message')
+            if reply_seq == seq:
+                if reply_type == NLMSG_DONE:
+                    return
+                if reply_type == NLMSG_ERROR:
+                    (error,) = nlmsgerr.unpack_from(buffer, offset + nlmsghdr.size)
+                    if error:
+                        raise OSError(-error, 'Netlink dump failed')
+                    return
+                yield reply_type, view[offset : offset + length]
+                if not flags & NLM_F_DUMP:
+                    return
+            offset += _align(length)
+
+
+def parse_attributes(message: memoryview, offset: int) -> Dict[int, memoryview]:
+    attributes: Dict[int, memoryview] = {}
+    end = len(message)
+    while offset + rtattr.size <= end:
+        length, attr_type = rtattr.unpack_from(message, offset)
+        if length < rtattr.size:
+            break
+        attributes[attr_type] = message[offset + rtattr.size : offset + length]
+        offset += _align(length)
+    return attributes
+
+
+def _decode_string(value: memoryview) -> str:
+    return bytes(value).split(b'\0', 1)[0].decode(encoding='UTF-8')
+
+
+def _parse_link(index: int, flags: int, message: memoryview) -> Optional[Link]:
+    attributes = parse_attributes(message, nlmsghdr.size + ifinfomsg.size)
+    name = attributes.get(IFLA_IFNAME)
+    if name is None:
+        return None
+    stats = None
+    raw_stats = attributes.get(IFLA_STATS64)
+    if raw_stats is not None and len(raw_stats) >= link_stats64.size:
+        stats = shared.AdapterStats(*link_stats64.unpack_from(raw_stats))
+    else:
+        raw_stats = attributes.get(IFLA_STATS)
+        if raw_stats is not None and len(raw_stats) >= link_stats.size:
+            stats = shared.AdapterStats(*link_stats.unpack_from(raw_stats))
+    mac = attributes.get(IFLA_ADDRESS)
+    return Link(
+        index,
+        _decode_string(name),
+        flags,
+        None if mac is None else shared.format_mac(bytes(mac)),
+        stats,
+    )
+
+
+def dump_links(
+    sock: socket.socket, adapter_filter: Optional[shared.AdapterFilter] = None
+) -> Dict[int, Link]:
+    links: Dict[int, Link] = {}
+    for _, message in dump(sock, RTM_GETLINK, socket.AF_PACKET):
+        _family, _type, index, flags, _change = ifinfomsg.unpack_from(message, nlmsghdr.size)
+        if adapter_filter is not None and not adapter_filter.accepts_flags(flags):
+            continue
+        link = _parse_link(index, flags, message)
+        if link is not None:
+            links[index] = link
+    return links
+
+
+def get_link(sock: socket.socket, name_or_index: Union[str, int]) -> Optional[Link]:
+    """
+    Asks the kernel for a single link, by interface name or index. Returns
+    `None` if there is no such link.
+    """
+    if isinstance(name_or_index, int):
+        if not shared.is_valid_index(name_or_index):
+            return None
+        body = ifinfomsg.pack(socket.AF_UNSPEC, 0, name_or_index, 0, 0)
+    else:
+        name = name_or_index.encode(encoding='UTF-8') + b'\0'
+        attribute = rtattr.pack(rtattr.size + len(name), IFLA_IFNAME) + name
+        body = ifinfomsg.pack(socket.AF_UNSPEC, 0, 0, 0, 0) + attribute.ljust(
+            _align(len(attribute)), b'\0'
+        )
+    try:
+        for _, message in request(sock, RTM_GETLINK, 0, body):
+            _family, _type, index, flags, _change = ifinfomsg.unpack_from(message, nlmsghdr.size)
+            return _parse_link(index, flags, message)
+    except OSError as e:
+        if e.errno in (errno.ENODEV, errno.EINVAL, errno.ERANGE):
+            return None
+        raise
+    return None
+
+
+def dump_addresses(
+    sock: socket.socket,
+    family: Optional[int] = None,
+    links: Optional[Dict[int, Link]] = None,
+    index: int = 0,
+) -> Iterator[Address]:
+    """
+    Dumps the addresses, optionally only the ones of one `family` (filtered
+    by the kernel) and of the given `links` (skipped before their attributes
+    are parsed). Addresses are yielded as the replies come in.
+
+    With an interface `index` the kernel only reports that interface's
+    addresses if strict checking is enabled on `sock` (Linux 4.20 and later,
+    see :func:`enable_strict_checking`). `links` has to be given as well to
+    filter on older kernels.
+    """
+    start = nlmsghdr.size + ifaddrmsg.size
+    dump_family = socket.AF_UNSPEC if family is None else family
+    body = ifaddrmsg.pack(dump_family, 0, 0, 0, index) if index else None
+    for _, message in dump(sock, RTM_GETADDR, dump_family, body):
+        address_family, prefixlen, _flags, _scope, index = ifaddrmsg.unpack_from(
+            message, nlmsghdr.size
+        )
+        if address_family not in (socket.AF_INET, socket.AF_INET6):
+            continue
+        if links is not None and index not in links:
+            continue
+        attributes = parse_attributes(message, start)
+        # Same precedence as glibc's getifaddrs(): on point-to-point links
+        # IFA_ADDRESS is the peer and IFA_LOCAL is the local address.
+        local = attributes.get(IFA_LOCAL)
+        address = attributes.get(IFA_ADDRESS)
+        destination = attributes.get(IFA_BROADCAST)
+        if local is not None:
+            if destination is None:
+                destination = address
+            address = local
+        if address is None:
+            continue
+        label = attributes.get(IFA_LABEL)
+        yield Address(
+            address_family,
+            prefixlen,
+            index,
+            _decode_string(label) if label is not None else None,
+            bytes(address),
+            None if destination is None else bytes(destination),
+        )
+
+
+class Gateway(NamedTuple):
+    family: int
+    address: str
+    interface: str
+    #: Whether this is the preferred (lowest metric) default route of its family
+    default: bool
+    metric: int
+
+
+def _mark_preferred(gateways: List[Gateway]) -> List[Gateway]:
+    preferred: Dict[int, Gateway] = {}
+    for gateway in gateways:
+        best = preferred.get(gateway.family)
+        if best is None or gateway.metric < best.metric:
+            preferred[gateway.family] = gateway
+    return [g._replace(default=g is preferred[g.family]) for g in gateways]
+
+
+def dump_gateways(sock: socket.socket) -> List[Gateway]:
+    """Returns the default routes of the main table."""
+    gateways = []
+    # There are usually only a few gateways, looking up their interfaces'
+    # names one by one is cheaper than dumping all links.
+    names: Dict[int, Optional[str]] = {}
+    start = nlmsghdr.size + rtmsg.size
+    for _, message in dump(sock, RTM_GETROUTE, socket.AF_UNSPEC):
+        family, dst_len, _src_len, _tos, table, _protocol, _scope, route_type, _flags = (
+            rtmsg.unpack_from(message, nlmsghdr.size)
+        )
+        if (
+            family not in (socket.AF_INET, socket.AF_INET6)
+            or route_type != RTN_UNICAST
+            or dst_len != 0
+        ):
+            continue
+        attributes = parse_attributes(message, start)
+        raw_table = attributes.get(RTA_TABLE)
+        if raw_table is not None:
+            (table,) = struct.unpack_from('=I', raw_table)
+        gateway = attributes.get(RTA_GATEWAY)
+        oif = attributes.get(RTA_OIF)
+        if table != RT_TABLE_MAIN or gateway is None or oif is None:
+            continue
+        (index,) = struct.unpack_from('=i', oif)
+        if index not in names:
+            try:
+                names[index] = socket.if_indextoname(index)
+            except OSError:
+                names[index] = None
+        name = names[index]
+        if name is None:
+            continue
+        priority = attributes.get(RTA_PRIORITY)
+        gateways.append(
+            Gateway(
+                family,
+                socket.inet_ntop(family, bytes(gateway)),
+                name,
+                False,
+                0 if priority is None else struct.unpack_from('=I', priority)[0],
+            )
+        )
+    return _mark_preferred(gateways)
+
+
+def _proc_gateways(root: str = '/proc/net') -> List[Gateway]:
+    gateways = []
+    with contextlib.suppress(OSError), open(os.path.join(root, 'route')) as f:
+        next(f)
+        for line in f:
+            fields = line.split()
+            if len(fields) < 8 or not int(fields[3], 16) & RTF_GATEWAY:
+                continue
+            if int(fields[1], 16) != 0 or int(fields[7], 16) != 0:
+                continue
+            # The addresses are in host byte order, as hex numbers.
+            packed = struct.pack('=I', int(fields[2], 16))
+            gateways.append(
+                Gateway(socket.AF_INET, socket.inet_ntoa(packed), fields[0], False, int(fields[6]))
+            )
+    with contextlib.suppress(OSError), open(os.path.join(root, 'ipv6_route')) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 10 or not int(fields[8], 16) & RTF_GATEWAY:
+                continue
+            if int(fields[1], 16) != 0:
+                continue
+            address = socket.inet_ntop(socket.AF_INET6, bytes.fromhex(fields[4]))
+            gateways.append(Gateway(socket.AF_INET6, address, fields[9], False, int(fields[5], 16)))
+    return _mark_preferred(gateways)
+
+
+def get_gateways() -> List[Gateway]:
+    """
+    Returns the default routes, from rtnetlink or, if that isn't available,
+    from /proc/net/route and /proc/net/ipv6_route.
+    """
+    try:
+        with open_socket() as sock:
+            return dump_gateways(sock)
+    except OSError:
+        return _proc_gateways()
+
+
+def _is_link_local(packed: bytes) -> bool:
+    # IN6_IS_ADDR_LINKLOCAL || IN6_IS_ADDR_MC_LINKLOCAL, which is what getifaddrs()
+    # uses to decide whether to fill in sin6_scope_id.
+    return (packed[0] == 0xFE and packed[1] & 0xC0 == 0x80) or (
+        packed[0] == 0xFF and packed[1] & 0x0F == 0x02
+    )
+
+
+def address_name(link: Link, address: Address) -> str:
+    # IPv4 aliases (eth0:1) are reported under their label, like getifaddrs() does.
+    if address.family == socket.AF_INET and address.label is not None:
+        return address.label
+    return link.name
+
+
+def make_ip(name: str, link: Link, address: Address) -> shared.IP:
+    broadcast = peer = None
+    if address.destination is not None:
+        if link.flags & shared.IFF_BROADCAST:
+            broadcast = address.destination
+        elif link.flags & shared.IFF_POINTOPOINT:
+            peer = address.destination
+    scope_id = 0
+    if address.family == socket.AF_INET6 and _is_link_local(address.packed):
+        scope_id = address.ifindex
+    return shared.IP.from_packed(
+        address.packed, address.prefixlen, name, 0, scope_id, broadcast, peer
+    )
+
+
+def convert(
+    links: Dict[int, Link],
+    addresses: Iterable[Address],
+    include_unconfigured: bool,
+    adapter_filter: Optional[shared.AdapterFilter] = None,
+) -> Iterable[shared.Adapter]:
+    # Adapters are reported in the same order as getifaddrs() would produce them:
+    # links first (only visible with include_unconfigured), then addresses.
+    adapters: Dict[str, shared.Adapter] = {}
+
+    def get_adapter(name: str, link: Link) -> shared.Adapter:
+        adapter = adapters.get(name)
+        if adapter is None:
+            adapter = adapters[name] = shared.Adapter(
+                name,
+                name,
+                [],
+                index=link.ifindex,
+                multicast=link.flags & IFF_MULTICAST > 0,
+                flags=link.flags,
+                mac=link.mac,
+                stats=link.stats,
+            )
+        return adapter
+
+    if include_unconfigured:
+        for link in links.values():
+            if adapter_filter is None or adapter_filter.accepts_name(link.name):
+                get_adapter(link.name, link)
+
+    for address in addresses:
+        owner = links.get(address.ifindex)
+        if owner is None:
+            continue
+        name = address_name(owner, address)
+        if adapter_filter is not None and not adapter_filter.accepts_name(name):
+            continue
+        get_adapter(name, owner).ips.append(make_ip(name, owner, address))
+
+    return adapters.values()
+
+
+def get_adapters(
+    include_unconfigured: bool = False,
+    *,
+    family: Optional[int] = None,
+    names: Optional[Iterable[str]] = None,
+    exclude_loopback: bool = False,
+    require_multicast: bool = False,
+    require_up: bool = False,
+) -> Iterable[shared.Adapter]:
+    if names is not None:
+        # We may need to go through them twice if we have to fall back to getifaddrs().
+        names = list(names)
+    adapter_filter = shared.AdapterFilter(
+        multicast_flag=IFF_MULTICAST,
+        family=family,
+        names=names,
+        exclude_loopback=exclude_loopback,
+        require_multicast=require_multicast,
+        require_up=require_up,
+    )
+    profile = _profile.begin('get_adapters', 'netlink')
+    try:
+        with open_socket(profile=profile) as sock:
+            if profile is not None:
+                profile.lap('socket')
+            links = dump_links(sock, adapter_filter)
+            if profile is not None:
+                profile.lap('links')
+            addresses = list(dump_addresses(sock, family, links))
+            if profile is not None:
+                profile.lap('addresses')
+    except OSError:
+        # No netlink available (seccomp filters, gVisor and the like), getifaddrs()
+        # may still work through other means.
+        import ifaddr._posix as posix
+
+        return posix.get_adapters(
+            include_unconfigured,
+            family=family,
+            names=names,
+            exclude_loopback=exclude_loopback,
+            require_multicast=require_multicast,
+            require_up=require_up,
+        )
+    adapters = convert(links, addresses, include_unconfigured, adapter_filter)
+    if profile is not None:
+        profile.lap('convert')
+        _profile.finish(profile, adapters)
+    return adapters
+
+
+def get_adapter(name_or_index: Union[str, int]) -> Optional[shared.Adapter]:
+    if isinstance(name_or_index, bool):
+        return None
+    name = None if isinstance(name_or_index, int) else name_or_index
+    profile = _profile.begin('get_adapter', 'netlink')
+    result = None
+    try:
+        with open_socket(profile=profile) as sock:
+            enable_strict_checking(sock)
+            if profile is not None:
+                profile.lap('socket')
+            # Aliases (eth0:1) are IPv4 addresses of their interface.
+            link = get_link(sock, name_or_index if name is None else name.split(':', 1)[0])
+            if profile is not None:
+                profile.lap('link')
+            if link is not None:
+                links = {link.ifindex: link}
+                addresses = list(dump_addresses(sock, links=links, index=link.ifindex))
+                if profile is not None:
+                    profile.lap('addresses')
+    except OSError:
+        import ifaddr._posix as posix
+
+        return posix.get_adapter(name_or_index)
+    if link is not None:
+        if name is None:
+            name = link.name
+        for adapter in convert(links, addresses, include_unconfigured=True):
+            if adapter.name == name:
+                result = adapter
+                break
+    if profile is not None:
+        profile.lap('convert')
+        _profile.finish(profile, [] if result is None else [result])
+    return result
+
+
+def iter_addresses(
+    *,
+    family: Optional[int] = None,
+    names: Optional[Iterable[str]] = None,
+    exclude_loopback: bool = False,
+    require_multicast: bool = False,
+    require_up: bool = False,
+) -> Generator[shared.AddressRecord, None, None]:
+    if names is not None:
+        names = list(names)
+    adapter_filter = shared.AdapterFilter(
+        multicast_flag=IFF_MULTICAST,
+        family=family,
+        names=names,
+        exclude_loopback=exclude_loopback,
+        require_multicast=require_multicast,
+        require_up=require_up,
+    )
+    try:
+        sock = open_socket()
+    except OSError:
+        import ifaddr._posix as posix
+
+        yield from posix.iter_addresses(
+            family=family,
+            names=names,
+            exclude_loopback=exclude_loopback,
+            require_multicast=require_multicast,
+            require_up=require_up,
+        )
+        return
+    with sock:
+        links = dump_links(sock, adapter_filter)
+        for address in dump_addresses(sock, family, links):
+            link = links[address.ifindex]
+            name = address_name(link, address)
+            if adapter_filter.accepts_name(name):
+                yield shared.AddressRecord(
+                    name, link.ifindex, link.flags, make_ip(name, link, address)
+                )
@@ -22,17 +22,24 @@
 import os
 import ctypes
 import contextlib
-import ipaddress
-import collections
-import platform
 import socket
+import struct
 import sys
+import threading
 
-from typing import Dict, Iterable, Optional
+from typing import Any, Dict, Generator, Iterable, NamedTuple, Optional, Tuple, Union
 
+import ifaddr._profile as _profile
 import ifaddr._shared as shared
-
-# from ifaddr._shared import sockaddr, Interface, sockaddr_to_ip, ipv6_prefixlength
+from ifaddr._sockaddr import (
+    AF_INET,
+    AF_INET6,
+    read_family,
+    read_ip,
+    read_sockaddr,
+    sockaddr,
+    unpack_at,
+)
 
 # To aid with platform-specific type-checking
 assert sys.platform != 'win32'
@@ -46,11 +53,85 @@ ifaddrs._fields_ = [
     ('ifa_next', ctypes.POINTER(ifaddrs)),
     ('ifa_name', ctypes.c_char_p),
     ('ifa_flags', ctypes.c_uint),
-    ('ifa_addr', ctypes.POINTER(shared.sockaddr)),
-    ('ifa_netmask', ctypes.POINTER(shared.sockaddr)),
+    ('ifa_addr', ctypes.POINTER(sockaddr)),
+    ('ifa_netmask', ctypes.POINTER(sockaddr)),
+    # ifa_broadaddr or ifa_dstaddr, depending on IFF_BROADCAST/IFF_POINTOPOINT
+    ('ifa_ifu', ctypes.POINTER(sockaddr)),
+    ('ifa_data', ctypes.c_void_p),
 ]
 
 
+# struct ifaddrs, as read by _walk()
+ifaddrs_layout = struct.Struct('@PPIPPPP')
+assert ifaddrs_layout.size == ctypes.sizeof(ifaddrs)
+
+
+# Link-layer entries, Linux reports them as AF_PACKET, BSD derived systems as AF_LINK.
+AF_PACKET = getattr(socket, 'AF_PACKET', None)
+AF_LINK = getattr(socket, 'AF_LINK', None)
+
+
+class sockaddr_ll(ctypes.Structure):
+    _fields_ = [
+        ('sll_family', ctypes.c_uint16),
+        ('sll_protocol', ctypes.c_uint16),
+        ('sll_ifindex', ctypes.c_int),
+        ('sll_hatype', ctypes.c_uint16),
+        ('sll_pkttype', ctypes.c_uint8),
+        ('sll_halen', ctypes.c_uint8),
+        # getifaddrs() reports addresses of up to 24 bytes (InfiniBand has 20),
+        # like glibc's and musl's internal struct sockaddr_ll_max.
+        ('sll_addr', ctypes.c_uint8 * 24),
+    ]
+
+
+class sockaddr_dl(ctypes.Structure):
+    _fields_ = [
+        ('sdl_len', ctypes.c_uint8),
+        ('sdl_family', ctypes.c_uint8),
+        ('sdl_index', ctypes.c_uint16),
+        ('sdl_type', ctypes.c_uint8),
+        ('sdl_nlen', ctypes.c_uint8),
+        ('sdl_alen', ctypes.c_uint8),
+        ('sdl_slen', ctypes.c_uint8),
+        # Only the minimum, sdl_len is the length of the whole structure.
+        ('sdl_data', ctypes.c_uint8 * 12),
+    ]
+
+
+sdl_data_offset = sockaddr_dl.sdl_data.offset
+
+
+# The head of Linux' struct rtnl_link_stats, which getifaddrs() points
+# ifa_data of AF_PACKET entries to.
+class rtnl_link_stats(ctypes.Structure):
+    _fields_ = [(name, ctypes.c_uint32) for name in shared.AdapterStats._fields]
+
+
+class LinkLayer(NamedTuple):
+    mac: Optional[str]
+    stats: Optional[shared.AdapterStats]
+    # 0 if unknown
+    ifindex: int
+
+
+def _decode_link_layer(addr_ptr: int, data_ptr: int, family: int) -> Optional[LinkLayer]:
+    if family == AF_PACKET:
+        ll = sockaddr_ll.from_address(addr_ptr)
+        stats = None
+        if data_ptr:
+            raw = rtnl_link_stats.from_address(data_ptr)
+            stats = shared.AdapterStats(*(getattr(raw, field[0]) for field in raw._fields_))
+        halen = min(ll.sll_halen, len(ll.sll_addr))
+        return LinkLayer(shared.format_mac(bytes(ll.sll_addr[:halen])), stats, ll.sll_ifindex)
+    if family == AF_LINK:
+        dl = sockaddr_dl.from_address(addr_ptr)
+        data = ctypes.string_at(addr_ptr + sdl_data_offset, max(dl.sdl_len - sdl_data_offset, 0))
+        mac = shared.format_mac(data[dl.sdl_nlen : dl.sdl_nlen + dl.sdl_alen])
+        return LinkLayer(mac, None, dl.sdl_index)
+    return None
+
+
 def _load_libc() -> ctypes.CDLL:
     # The C library is already mapped into the process, so getifaddrs can
     # normally be resolved straight from it. Going through
@@ -66,62 +147,294 @@ def _load_libc() -> ctypes.CDLL:
     return ctypes.CDLL(util.find_library(name), use_errno=True)  # type: ignore
 
 
-libc = _load_libc()
+_libc: Optional[ctypes.CDLL] = None
+_libc_lock = threading.Lock()
+
 
+def get_libc() -> ctypes.CDLL:
+    """
+    Returns the C library, loading it on first use rather than when the
+    module is imported. Safe to call from several threads at once.
+    """
+    global _libc
+    libc = _libc
+    if libc is None:
+        with _libc_lock:
+            if _libc is None:
+                _libc = _load_libc()
+            libc = _libc
+    return libc
 
-if platform.system() == 'Darwin' or 'BSD' in platform.system():
+
+if sys.platform == 'darwin' or 'bsd' in sys.platform:
     IFF_MULTICAST = 1 << 15
 else:
     IFF_MULTICAST = 1 << 12
 
 
-def get_adapters(include_unconfigured: bool = False) -> Iterable[shared.Adapter]:
+def _walk(
+    libc: Any,
+    adapter_filter: shared.AdapterFilter,
+    profile: Optional[_profile.CallProfile] = None,
+) -> Generator[Tuple[str, int, Optional[shared.IP], Optional[LinkLayer]], None, None]:
+    """
+    Yields `(name, flags, ip, link_layer)` for every accepted getifaddrs()
+    entry. `ip` is `None` for entries without a (matching) IP address,
+    `link_layer` is only set for link-layer entries. The list is freed when the
+    generator is exhausted or closed.
+
+    `libc` is anything with C compatible `getifaddrs()` and `freeifaddrs()`
+    functions: the real C library or a fake (see `ifaddr._fake`).
+    """
     addr0 = addr = ctypes.POINTER(ifaddrs)()
     retval = libc.getifaddrs(ctypes.byref(addr))
     if retval != 0:
+        # ctypes keeps the errno of the call in thread-local storage, other
+        # threads' calls can't overwrite it.
         eno = ctypes.get_errno()
         raise OSError(eno, os.strerror(eno))
+    if profile is not None:
+        profile.lap('getifaddrs')
+        profile.syscall('getifaddrs')
+
+    try:
+        # Every node is unpacked with a precompiled struct, the socket
+        # addresses likewise (see _sockaddr.read_sockaddr).
+        # Going through the ctypes structures costs several Python objects per
+        # field access, and node.ifa_next.contents would tie every node to the
+        # one before it, which makes ctypes.cast() quadratic.
+        address = ctypes.cast(addr, ctypes.c_void_p).value or 0
+        # glibc shares the name of an interface between its entries. Names
+        # map to whether their entries are accepted, or only the link-layer
+        # one, for an alias of the interface (None).
+        names: Dict[int, Tuple[Optional[str], bool]] = {}
+        while address:
+            address, name_ptr, flags, addr_ptr, netmask_ptr, ifu_ptr, data_ptr = unpack_at(
+                ifaddrs_layout, address
+            )
+            # Everything that can be decided from the flags and the name is checked
+            # before we look at (let alone decode) the addresses.
+            if not adapter_filter.accepts_flags(flags):
+                continue
+            try:
+                name, accepted = names[name_ptr]
+            except KeyError:
+                name = ctypes.string_at(name_ptr).decode(encoding='UTF-8')
+                accepted = adapter_filter.accepts_name(name)
+                if not accepted and not adapter_filter.accepts_link_layer(name):
+                    name = None
+                names[name_ptr] = (name, accepted)
+            if name is None:
+                continue
+            if not accepted:
+                if addr_ptr:
+                    family = read_family(addr_ptr)
+                    if family in (AF_PACKET, AF_LINK):
+                        yield name, flags, None, _decode_link_layer(addr_ptr, data_ptr, family)
+                continue
+            if not addr_ptr:
+                yield name, flags, None, None
+                continue
+            # Only the family is read before the entry is known to be wanted.
+            family = read_family(addr_ptr)
+            if family not in (AF_INET, AF_INET6) or not adapter_filter.accepts_family(family):
+                yield name, flags, None, _decode_link_layer(addr_ptr, data_ptr, family)
+                continue
+            ip_addr = read_ip(addr_ptr, family)
+            netmask = read_sockaddr(netmask_ptr, family)[1] if netmask_ptr else None
+            assert netmask is not None, f'Netmask of {name} has no IP address'
+            try:
+                prefixlen = shared.netmask_to_prefixlen(netmask.packed)
+            except ValueError:
+                # Non-contiguous netmasks are exotic, the number of network bits
+                # is the best approximation we can offer.
+                prefixlen = int.from_bytes(netmask.packed, 'big').bit_count()
+            broadcast = peer = None
+            if ifu_ptr and flags & (shared.IFF_BROADCAST | shared.IFF_POINTOPOINT):
+                ifu_family, ifu_ip = read_sockaddr(ifu_ptr)
+                if ifu_family == family:
+                    if flags & shared.IFF_BROADCAST:
+                        broadcast = ifu_ip
+                    else:
+                        peer = ifu_ip
+            yield name, flags, shared.IP(ip_addr, prefixlen, name, broadcast, peer), None
+    finally:
+        libc.freeifaddrs(addr0)
+
+
+class _Indexes:
+    """
+    Interface indexes by name. Most come from the link-layer entries of the
+    getifaddrs() list, the others are looked up with a single if_nameindex()
+    call (instead of an if_nametoindex() call per interface) when the first
+    of them is needed.
+    """
+
+    __slots__ = ('_links', '_system', '_profile')
+
+    def __init__(self, profile: Optional[_profile.CallProfile] = None) -> None:
+        self._links: Dict[str, int] = {}
+        self._system: Optional[Dict[str, int]] = None
+        self._profile = profile
+
+    def add(self, name: str, link_layer: LinkLayer) -> None:
+        if link_layer.ifindex:
+            self._links[name] = link_layer.ifindex
+
+    def get(self, name: str) -> Optional[int]:
+        # Aliases (eth0:1) have the index of their interface.
+        base = name.split(':', 1)[0]
+        index = self._links.get(name) or self._links.get(base)
+        if index is None:
+            if self._system is None:
+                self._system = _if_nameindex()
+                if self._profile is not None:
+                    self._profile.syscall('if_nameindex')
+            index = self._system.get(name) or self._system.get(base)
+        return index
+
+
+def _if_nameindex() -> Dict[str, int]:
+    try:
+        return {name: index for index, name in socket.if_nameindex()}
+    except (OSError, AttributeError):
+        return {}
+
+
+def get_adapters(
+    include_unconfigured: bool = False,
+    *,
+    family: Optional[int] = None,
+    names: Optional[Iterable[str]] = None,
+    exclude_loopback: bool = False,
+    require_multicast: bool = False,
+    require_up: bool = False,
+) -> Iterable[shared.Adapter]:
+    adapter_filter = shared.AdapterFilter(
+        multicast_flag=IFF_MULTICAST,
+        family=family,
+        names=names,
+        exclude_loopback=exclude_loopback,
+        require_multicast=require_multicast,
+        require_up=require_up,
+    )
+    profile = _profile.begin('get_adapters', 'getifaddrs')
+    adapters = adapters_from_libc(get_libc(), include_unconfigured, adapter_filter, profile)
+    if profile is not None:
+        _profile.finish(profile, adapters)
+    return adapters
+
 
-    ips: Dict[str, shared.Adapter] = collections.OrderedDict()
+def adapters_from_libc(
+    libc: Any,
+    include_unconfigured: bool,
+    adapter_filter: shared.AdapterFilter,
+    profile: Optional[_profile.CallProfile] = None,
+) -> Iterable[shared.Adapter]:
+    ips: Dict[str, shared.Adapter] = {}
 
-    def add_ip(adapter_name: str, multicast: bool, ip: Optional[shared.IP]) -> None:
+    links: Dict[str, LinkLayer] = {}
+    indexes = _Indexes(profile)
+
+    def add_ip(adapter_name: str, flags: int, ip: Optional[shared.IP]) -> None:
         if adapter_name not in ips:
-            index: Optional[int] = None
-            try:
-                index = socket.if_nametoindex(adapter_name)
-            except (OSError, AttributeError):
-                pass
             ips[adapter_name] = shared.Adapter(
-                adapter_name, adapter_name, [], index=index, multicast=multicast
+                adapter_name,
+                adapter_name,
+                [],
+                multicast=flags & IFF_MULTICAST > 0,
+                flags=flags,
             )
         if ip is not None:
             ips[adapter_name].ips.append(ip)
 
-    while addr:
-        name = addr.contents.ifa_name.decode(encoding='UTF-8')
-        multicast = addr.contents.ifa_flags & IFF_MULTICAST > 0
-        ip_addr = shared.sockaddr_to_ip(addr.contents.ifa_addr)
-        if ip_addr:
-            if addr.contents.ifa_netmask and not addr.contents.ifa_netmask.contents.sa_familiy:
-                addr.contents.ifa_netmask.contents.sa_familiy = (
-                    addr.contents.ifa_addr.contents.sa_familiy
-                )
-            netmask = shared.sockaddr_to_ip(addr.contents.ifa_netmask)
-            if isinstance(netmask, shared.IPv6Ext):
-                prefixlen = shared.ipv6_prefixlength(netmask.address)
-            else:
-                assert netmask is not None, (
-                    f'sockaddr_to_ip({addr.contents.ifa_netmask}) returned None'
-                )
-                netmaskStr = str('0.0.0.0/' + str(netmask.address))
-                prefixlen = ipaddress.IPv4Network(netmaskStr).prefixlen
-            ip = shared.IP(ip_addr, prefixlen, name)
-            add_ip(name, multicast, ip)
-        else:
-            if include_unconfigured:
-                add_ip(name, multicast, None)
-        addr = addr.contents.ifa_next
-
-    libc.freeifaddrs(addr0)
+    with contextlib.closing(_walk(libc, adapter_filter, profile)) as entries:
+        for name, flags, ip, link_layer in entries:
+            if link_layer is not None:
+                links[name] = link_layer
+                indexes.add(name, link_layer)
+                if not adapter_filter.accepts_name(name):
+                    # Only read for an alias of the interface
+                    continue
+            if ip is not None or include_unconfigured:
+                add_ip(name, flags, ip)
+
+    for adapter in ips.values():
+        # Aliases (eth0:1) share the link-layer data of their interface.
+        link_layer = links.get(adapter.name) or links.get(adapter.name.split(':', 1)[0])
+        if link_layer is not None:
+            adapter.mac, adapter.stats = link_layer.mac, link_layer.stats
+        adapter.index = indexes.get(adapter.name)
+    if profile is not None:
+        profile.lap('walk')
 
     return ips.values()
+
+
+def get_adapter(name_or_index: Union[str, int]) -> Optional[shared.Adapter]:
+    profile = _profile.begin('get_adapter', 'getifaddrs')
+    adapter = adapter_from_libc(get_libc(), name_or_index, profile)
+    if profile is not None:
+        _profile.finish(profile, [] if adapter is None else [adapter])
+    return adapter
+
+
+def adapter_from_libc(
+    libc: Any,
+    name_or_index: Union[str, int],
+    profile: Optional[_profile.CallProfile] = None,
+) -> Optional[shared.Adapter]:
+    if isinstance(name_or_index, bool):
+        return None
+    if isinstance(name_or_index, int):
+        if not shared.is_valid_index(name_or_index):
+            return None
+        try:
+            name = socket.if_indextoname(name_or_index)
+        except (OSError, AttributeError):
+            return None
+        finally:
+            if profile is not None:
+                profile.lap('if_indextoname')
+                profile.syscall('if_indextoname')
+    else:
+        name = name_or_index
+    # Every entry of other interfaces is skipped before it's decoded. Aliases
+    # (eth0:1) still get the link-layer entry of their interface.
+    adapter_filter = shared.AdapterFilter(multicast_flag=IFF_MULTICAST, names=[name])
+    for adapter in adapters_from_libc(libc, True, adapter_filter, profile):
+        if adapter.name == name:
+            return adapter
+    return None
+
+
+def iter_addresses(
+    *,
+    family: Optional[int] = None,
+    names: Optional[Iterable[str]] = None,
+    exclude_loopback: bool = False,
+    require_multicast: bool = False,
+    require_up: bool = False,
+) -> Generator[shared.AddressRecord, None, None]:
+    adapter_filter = shared.AdapterFilter(
+        multicast_flag=IFF_MULTICAST,
+        family=family,
+        names=names,
+        exclude_loopback=exclude_loopback,
+        require_multicast=require_multicast,
+        require_up=require_up,
+    )
+    return addresses_from_libc(get_libc(), adapter_filter)
+
+
+def addresses_from_libc(
+    libc: Any, adapter_filter: shared.AdapterFilter
+) -> Generator[shared.AddressRecord, None, None]:
+    # getifaddrs() reports the link-layer entries before the addresses.
+    indexes = _Indexes()
+    with contextlib.closing(_walk(libc, adapter_filter)) as entries:
+        for name, flags, ip, link_layer in entries:
+            if link_layer is not None:
+                indexes.add(name, link_layer)
+            if ip is not None:
+                yield shared.AddressRecord(name, indexes.get(name), flags, ip)
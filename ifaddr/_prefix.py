@@ -0,0 +1,135 @@
+# Copyright (c) 2014 Stefan C. Mueller
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+
+import socket
+from typing import TYPE_CHECKING, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar, Union
+
+import ifaddr._shared as shared
+
+if TYPE_CHECKING:
+    # Only needed for the annotations, see ifaddr._shared.
+    import ipaddress
+
+T = TypeVar('T')
+
+#: What the lookups accept as an address: text, packed bytes or an `ipaddress` object.
+AddressLike = Union[str, bytes, 'ipaddress.IPv4Address', 'ipaddress.IPv6Address']
+
+
+def packed_address(address: AddressLike) -> bytes:
+    """
+    Returns `address` in packed form. IPv6 scope ids (`fe80::1%eth0`) are
+    ignored. Raises :class:`ValueError` for anything that isn't an IP address.
+    """
+    if isinstance(address, bytes):
+        if len(address) not in (4, 16):
+            raise ValueError(f'Packed IP addresses have 4 or 16 bytes, not {len(address)}')
+        return address
+    if isinstance(address, str):
+        # inet_pton() is a lot cheaper than parsing with ipaddress.
+        try:
+            if ':' in address:
+                return socket.inet_pton(socket.AF_INET6, address.split('%', 1)[0])
+            return socket.inet_pton(socket.AF_INET, address)
+        except OSError:
+            raise ValueError(f'{address!r} is not an IP address') from None
+    return address.packed
+
+
+class PrefixTable(Generic[T]):
+    """
+    Maps IP networks to values and finds the value of the longest network
+    that contains a given address, for example to pick the local adapter
+    that reaches a peer:
+
+    .. code-block:: python
+
+        table = ifaddr.PrefixTable.from_adapters(ifaddr.get_adapters())
+        adapter, ip = table.lookup('192.168.1.77')
+        results = table.lookup_many(peers)
+
+    `entries` are `(ip, value)` pairs, the network of an entry is
+    `ip.packed/ip.network_prefix`. Of several entries for the same network
+    the first one wins.
+
+    There is a hash table per prefix length in use, a lookup probes them from
+    the longest prefix down. It therefore takes at most as many dictionary
+    lookups as there are distinct prefix lengths, no matter how many networks
+    the table holds.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[shared.IP, T]] = ()) -> None:
+        # Address length in bytes -> [(prefix length, {network bits: value})], longest first
+        self._tables: Dict[int, List[Tuple[int, Dict[int, T]]]] = {4: [], 16: []}
+        by_length: Dict[int, Dict[int, Dict[int, T]]] = {4: {}, 16: {}}
+        for ip, value in entries:
+            packed = ip.packed
+            bits = len(packed) * 8
+            prefixlen = min(max(ip.network_prefix, 0), bits)
+            table = by_length[len(packed)].setdefault(prefixlen, {})
+            table.setdefault(int.from_bytes(packed, 'big') >> (bits - prefixlen), value)
+        for size, tables in by_length.items():
+            self._tables[size] = sorted(tables.items(), reverse=True)
+
+    @classmethod
+    def from_adapters(
+        cls, adapters: Iterable[shared.Adapter]
+    ) -> 'PrefixTable[Tuple[shared.Adapter, shared.IP]]':
+        """A table of the adapters' networks with `(adapter, ip)` pairs as values."""
+        return PrefixTable((ip, (adapter, ip)) for adapter in adapters for ip in adapter.ips)
+
+    def lookup(self, address: AddressLike) -> Optional[T]:
+        """
+        Returns the value of the longest network containing `address`, `None`
+        if there is none.
+        """
+        packed = packed_address(address)
+        value = int.from_bytes(packed, 'big')
+        bits = len(packed) * 8
+        for prefixlen, table in self._tables[len(packed)]:
+            hit = table.get(value >> (bits - prefixlen))
+            if hit is not None:
+                return hit
+        return None
+
+    def lookup_many(self, addresses: Iterable[AddressLike]) -> List[Optional[T]]:
+        """
+        Returns :meth:`lookup` for each of `addresses`, in the same order.
+        Cheaper than calling :meth:`lookup` in a loop.
+        """
+        tables = self._tables
+        from_bytes = int.from_bytes
+        results: List[Optional[T]] = []
+        append = results.append
+        for address in addresses:
+            packed = packed_address(address)
+            value = from_bytes(packed, 'big')
+            bits = len(packed) * 8
+            hit = None
+            for prefixlen, table in tables[len(packed)]:
+                hit = table.get(value >> (bits - prefixlen))
+                if hit is not None:
+                    break
+            append(hit)
+        return results
+
+    def __len__(self) -> int:
+        return sum(len(table) for tables in self._tables.values() for _, table in tables)
@@ -0,0 +1,128 @@
+# Copyright (c) 2014 Stefan C. Mueller
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+# Opt-in instrumentation of the enumeration functions. Without a hook the
+# backends only pay for a global lookup per call.
+
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import ifaddr._shared as shared
+
+ProfileHook = Callable[['CallProfile'], None]
+
+_hook: Optional[ProfileHook] = None
+
+
+class CallProfile:
+    """
+    What a single call of :func:`ifaddr.get_adapters` or
+    :func:`ifaddr.get_adapter` spent its time on, as passed to the hook
+    installed with :func:`ifaddr.set_profile_hook`.
+    """
+
+    __slots__ = (
+        'function',
+        'backend',
+        'phases',
+        'syscalls',
+        'adapters',
+        'addresses',
+        'total',
+        '_start',
+        '_last',
+    )
+
+    def __init__(self, function: str, backend: str) -> None:
+        #: Name of the profiled function, `'get_adapters'` or `'get_adapter'`.
+        self.function = function
+
+        #: The backend that did the work: `'netlink'`, `'getifaddrs'` or
+        #: `'win32'`. A netlink call that falls back to `getifaddrs()` is
+        #: reported by the latter.
+        self.backend = backend
+
+        #: Seconds per phase, in the order the phases ran. The phases depend
+        #: on the backend, together they make up (nearly all of) :attr:`total`.
+        self.phases: Dict[str, float] = {}
+
+        #: Number of calls into the operating system by name, like
+        #: `getifaddrs`, `if_nameindex` or the `send` and `recv` calls on
+        #: the netlink socket.
+        self.syscalls: Dict[str, int] = {}
+
+        #: Number of adapters returned.
+        self.adapters = 0
+
+        #: Number of IPs of the returned adapters.
+        self.addresses = 0
+
+        #: Seconds the whole call took.
+        self.total = 0.0
+
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """Attributes the time since the previous lap (or the start) to `phase`."""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def syscall(self, name: str, count: int = 1) -> None:
+        self.syscalls[name] = self.syscalls.get(name, 0) + count
+
+    def __repr__(self) -> str:
+        phases = ', '.join(
+            f'{name}={seconds * 1000:.3f}ms' for name, seconds in self.phases.items()
+        )
+        return (
+            f'CallProfile(function={self.function!r}, backend={self.backend!r}, '
+            f'total={self.total * 1000:.3f}ms, phases=[{phases}], syscalls={self.syscalls!r}, '
+            f'adapters={self.adapters}, addresses={self.addresses})'
+        )
+
+
+def set_profile_hook(hook: Optional[ProfileHook]) -> Optional[ProfileHook]:
+    """
+    Installs `hook`, which is called with a :class:`ifaddr.CallProfile`
+    after every :func:`ifaddr.get_adapters` and :func:`ifaddr.get_adapter`
+    call, in the thread that made the call. `None` removes the hook. Returns the
+    previously installed hook.
+
+    Calls that raise an exception are not reported.
+    """
+    global _hook
+    previous, _hook = _hook, hook
+    return previous
+
+
+def begin(function: str, backend: str) -> Optional[CallProfile]:
+    """Returns a profile for the call that is starting, `None` if there is no hook."""
+    return None if _hook is None else CallProfile(function, backend)
+
+
+def finish(profile: CallProfile, adapters: Iterable[shared.Adapter]) -> None:
+    profile.total = time.perf_counter() - profile._start
+    for adapter in adapters:
+        profile.adapters += 1
+        profile.addresses += len(adapter.ips)
+    hook = _hook
+    if hook is not None:
+        hook(profile)
@@ -0,0 +1,265 @@
+# Copyright (c) 2014 Stefan C. Mueller
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+# Sharing one enumeration between processes. The publisher replaces a file
+# atomically with every new snapshot, so a reader either sees the old file or
+# the new one, and a new file always has a new inode. Readers only need a
+# stat() to find out whether there is something new to load. On tmpfs
+# (`/dev/shm`, `/run`) the file never leaves memory.
+
+import logging
+import os
+import struct
+import tempfile
+import threading
+from types import TracebackType
+from typing import Callable, Iterable, List, Optional, Tuple, Type
+
+import ifaddr._shared as shared
+from ifaddr._snapshot import Snapshot
+from ifaddr._watch import Watcher
+
+logger = logging.getLogger(__name__)
+
+# magic, version of the snapshot; the encoded snapshot follows
+header = struct.Struct('<4sQ')
+MAGIC = b'IFAP'
+
+# What a replaced file looks like to stat()
+FileKey = Tuple[int, int, int, int]
+
+
+def _file_key(st: os.stat_result) -> FileKey:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _decode(data: bytes) -> Tuple[int, Snapshot]:
+    if len(data) < header.size:
+        raise ValueError('Not a published snapshot: too short')
+    magic, version = header.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a published snapshot: bad magic')
+    return version, Snapshot.from_bytes(data[header.size :])
+
+
+def _read_version(path: str) -> int:
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(header.size)
+    except OSError:
+        return 0
+    if len(data) < header.size:
+        return 0
+    magic, version = header.unpack(data)
+    return version if magic == MAGIC else 0
+
+
+def _default_get_adapters(include_unconfigured: bool) -> Iterable[shared.Adapter]:
+    import ifaddr
+
+    return ifaddr.get_adapters(include_unconfigured=include_unconfigured)
+
+
+class SnapshotPublisher:
+    """
+    Enumerates the adapters in one process and publishes them as a versioned
+    :class:`ifaddr.Snapshot` in the file `path` for :class:`SnapshotReader`
+    instances in other processes. Put `path` on a memory backed file system
+    like `/dev/shm` or `/run`.
+
+    Call :meth:`publish` to publish the current adapters, or :meth:`start` to
+    publish them from a background thread whenever they change (see
+    :class:`ifaddr.Watcher`). The thread logs its failures and tries again.
+    Versions keep counting up from the version found in `path`, also across
+    restarts of the publishing process. The file is created with the
+    permissions `mode`.
+
+    A publisher that is inherited by a forked child does nothing there:
+    :meth:`publish` raises :class:`RuntimeError`, and :meth:`close` neither
+    stops the parent's thread nor removes the file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        include_unconfigured: bool = False,
+        *,
+        interval: float = 1.0,
+        mode: int = 0o644,
+        get_adapters: Optional[Callable[[bool], Iterable[shared.Adapter]]] = None,
+    ) -> None:
+        self.path = path
+        self._include_unconfigured = include_unconfigured
+        self._interval = interval
+        self._mode = mode
+        self._get_adapters = get_adapters
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        #: The most recently published version, 0 before the first one.
+        self.version = _read_version(path)
+
+    def publish(self, adapters: Optional[Iterable[shared.Adapter]] = None) -> int:
+        """
+        Publishes `adapters`, or the current adapters if `None`, and returns
+        the new version.
+        """
+        if os.getpid() != self._pid:
+            raise RuntimeError('SnapshotPublisher was created by another process')
+        if adapters is None:
+            adapters = (self._get_adapters or _default_get_adapters)(self._include_unconfigured)
+        encoded = Snapshot(adapters).to_bytes()
+        directory, name = os.path.split(os.path.abspath(self.path))
+        with self._lock:
+            version = self.version + 1
+            fd, temporary = tempfile.mkstemp(prefix=f'.{name}.', dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    # Not os.fchmod(), Windows only has that since Python 3.13.
+                    os.chmod(temporary, self._mode)
+                    f.write(header.pack(MAGIC, version))
+                    f.write(encoded)
+                os.replace(temporary, self.path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+            self.version = version
+        return version
+
+    def start(self) -> 'SnapshotPublisher':
+        """
+        Publishes the current adapters and starts a thread that publishes
+        them again whenever they change. Returns the publisher.
+        """
+        if self._thread is not None:
+            raise RuntimeError('SnapshotPublisher is already started')
+        watcher = Watcher(
+            self._include_unconfigured, self._interval, get_adapters=self._get_adapters
+        )
+        try:
+            self.publish(watcher.adapters)
+        except BaseException:
+            watcher.close()
+            raise
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(watcher,), name='ifaddr-publisher', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def _run(self, watcher: Watcher) -> None:
+        with watcher:
+            while not self._stop.is_set():
+                try:
+                    changes = watcher.poll(timeout=min(self._interval, 0.5))
+                    if changes:
+                        self.publish(watcher.adapters)
+                except Exception:
+                    # Readers keep the previous version, the next change or
+                    # poll tries again.
+                    logger.exception('Publishing the adapters to %s failed', self.path)
+                    self._stop.wait(self._interval)
+
+    def close(self, remove: bool = False) -> None:
+        """
+        Stops the background thread and, with `remove`, deletes the published
+        file (readers then fail with :class:`FileNotFoundError`).
+        """
+        if os.getpid() != self._pid:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if remove:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> 'SnapshotPublisher':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class SnapshotReader:
+    """
+    Reads the snapshots published by a :class:`SnapshotPublisher` to `path`.
+
+    Checking for a new version (:meth:`changed`) costs a single `stat()`,
+    a new version is loaded when :meth:`snapshot` or :meth:`get_adapters`
+    is called and finds one. Readers hold no file descriptors or threads
+    between calls, so they can be created before or after forking and used
+    from several threads.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # (file key, version, snapshot), replaced as a whole
+        self._current: Optional[Tuple[FileKey, int, Snapshot]] = None
+
+    @property
+    def version(self) -> Optional[int]:
+        """The version of the most recently loaded snapshot, `None` before the first."""
+        current = self._current
+        return None if current is None else current[1]
+
+    def changed(self) -> bool:
+        """
+        Whether a different snapshot than the one loaded last has been
+        published. Raises :class:`FileNotFoundError` if nothing is published.
+        """
+        current = self._current
+        return current is None or _file_key(os.stat(self.path)) != current[0]
+
+    def snapshot(self) -> Snapshot:
+        """
+        Returns the most recently published snapshot. Raises
+        :class:`FileNotFoundError` if nothing is published and
+        :class:`ValueError` if `path` doesn't hold a published snapshot.
+        """
+        current = self._current
+        if current is not None and _file_key(os.stat(self.path)) == current[0]:
+            return current[2]
+        with open(self.path, 'rb') as f:
+            # The key of the file we actually read, the path may have been
+            # replaced since the stat() above.
+            key = _file_key(os.fstat(f.fileno()))
+            data = f.read()
+        version, snapshot = _decode(data)
+        self._current = (key, version, snapshot)
+        return snapshot
+
+    def get_adapters(self) -> List[shared.Adapter]:
+        """
+        Same as :func:`ifaddr.get_adapters`, but returns the adapters of the
+        most recently published snapshot. They are shared between callers
+        and must not be modified.
+        """
+        return self.snapshot().adapters
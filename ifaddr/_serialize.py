@@ -0,0 +1,290 @@
+# Copyright (c) 2014 Stefan C. Mueller
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+# Encodings of adapter lists for :meth:`ifaddr.Snapshot.to_bytes` and
+# :meth:`ifaddr.Snapshot.to_json`.
+#
+# The binary format, all integers little endian:
+#
+#   header     magic 'IFAS', version, reserved byte, string count, adapter count
+#   strings    per string: its length (2 bytes) and UTF-8 bytes
+#   adapters   per adapter: `adapter_record`, the MAC (length and bytes) if
+#              ADAPTER_MAC is set, 10 counters if ADAPTER_STATS is set, then
+#              its IPs: `ip_record`, the packed address, flowinfo and scope id
+#              (IPv6 only), then the packed broadcast and peer addresses if
+#              their flags are set
+#
+# Names are interned: every distinct string is stored once in the string
+# table and referenced by its position.
+
+import json
+import socket
+import struct
+from typing import Any, Dict, List, Optional
+
+import ifaddr._shared as shared
+
+MAGIC = b'IFAS'
+VERSION = 1
+
+header = struct.Struct('<4sBxII')
+string_length = struct.Struct('<H')
+# name, nice name, index, flags, ADAPTER_* bits, number of IPs
+adapter_record = struct.Struct('<IIIIBI')
+# IP_* bits, network prefix, nice name
+ip_record = struct.Struct('<BBI')
+ipv6_scope = struct.Struct('<II')
+mac_length = struct.Struct('<B')
+stats_record = struct.Struct('<10Q')
+
+ADAPTER_MULTICAST = 0x1
+ADAPTER_INDEX = 0x2
+ADAPTER_MAC = 0x4
+ADAPTER_STATS = 0x8
+
+IP_V6 = 0x1
+IP_BROADCAST = 0x2
+IP_PEER = 0x4
+
+
+class _Strings:
+    __slots__ = ('ids', 'encoded')
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.encoded: List[bytes] = []
+
+    def add(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            raw = value.encode(encoding='UTF-8')
+            if len(raw) > 0xFFFF:
+                raise ValueError(f'String too long to encode: {value[:20]!r}...')
+            string_id = self.ids[value] = len(self.encoded)
+            self.encoded.append(string_length.pack(len(raw)) + raw)
+        return string_id
+
+
+def to_bytes(adapters: List[shared.Adapter]) -> bytes:
+    strings = _Strings()
+    records: List[bytes] = []
+    for adapter in adapters:
+        bits = ADAPTER_MULTICAST if adapter.multicast else 0
+        if adapter.index is not None:
+            bits |= ADAPTER_INDEX
+        mac = None
+        if adapter.mac is not None:
+            bits |= ADAPTER_MAC
+            mac = bytes.fromhex(adapter.mac.replace(':', ''))
+        if adapter.stats is not None:
+            bits |= ADAPTER_STATS
+        records.append(
+            adapter_record.pack(
+                strings.add(adapter.name),
+                strings.add(adapter.nice_name),
+                adapter.index or 0,
+                adapter.flags,
+                bits,
+                len(adapter.ips),
+            )
+        )
+        if mac is not None:
+            records.append(mac_length.pack(len(mac)) + mac)
+        if adapter.stats is not None:
+            records.append(stats_record.pack(*adapter.stats))
+        for ip in adapter.ips:
+            ip_bits = 0 if ip.is_IPv4 else IP_V6
+            broadcast = ip.packed_broadcast
+            peer = ip.packed_peer
+            if broadcast is not None:
+                ip_bits |= IP_BROADCAST
+            if peer is not None:
+                ip_bits |= IP_PEER
+            records.append(ip_record.pack(ip_bits, ip.network_prefix, strings.add(ip.nice_name)))
+            records.append(ip.packed)
+            if ip_bits & IP_V6:
+                records.append(ipv6_scope.pack(ip.flowinfo, ip.scope_id))
+            if broadcast is not None:
+                records.append(broadcast)
+            if peer is not None:
+                records.append(peer)
+    return b''.join(
+        [header.pack(MAGIC, VERSION, len(strings.encoded), len(adapters))]
+        + strings.encoded
+        + records
+    )
+
+
+def from_bytes(data: bytes) -> List[shared.Adapter]:
+    try:
+        return _decode(bytes(data))
+    except (struct.error, UnicodeDecodeError, IndexError) as e:
+        raise ValueError(f'Malformed snapshot: {e}') from None
+
+
+def _decode(data: bytes) -> List[shared.Adapter]:
+    magic, version, string_count, adapter_count = header.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a snapshot')
+    if version != VERSION:
+        raise ValueError(f'Unsupported snapshot version {version}')
+    offset = header.size
+    strings: List[str] = []
+    for _ in range(string_count):
+        (length,) = string_length.unpack_from(data, offset)
+        offset += 2
+        strings.append(data[offset : offset + length].decode(encoding='UTF-8'))
+        offset += length
+
+    # Bound to locals, this loop is what `from_bytes` spends its time on.
+    unpack_adapter = adapter_record.unpack_from
+    adapter_size = adapter_record.size
+    ip_size = ip_record.size
+    scope_size = ipv6_scope.size
+    unpack_ip = ip_record.unpack_from
+    unpack_scope = ipv6_scope.unpack_from
+    from_packed = shared.IP.from_packed
+    Adapter = shared.Adapter
+    adapters = []
+    for _ in range(adapter_count):
+        name, nice_name, index, flags, bits, ip_count = unpack_adapter(data, offset)
+        offset += adapter_size
+        mac = stats = None
+        if bits & ADAPTER_MAC:
+            length = data[offset]
+            mac = shared.format_mac(data[offset + 1 : offset + 1 + length])
+            offset += 1 + length
+        if bits & ADAPTER_STATS:
+            stats = shared.AdapterStats(*stats_record.unpack_from(data, offset))
+            offset += stats_record.size
+        ips = []
+        for _ in range(ip_count):
+            ip_bits, prefix, ip_name = unpack_ip(data, offset)
+            offset += ip_size
+            size = 16 if ip_bits & IP_V6 else 4
+            packed = data[offset : offset + size]
+            if len(packed) != size:
+                raise ValueError('Malformed snapshot: truncated address')
+            offset += size
+            flowinfo = scope_id = 0
+            if ip_bits & IP_V6:
+                flowinfo, scope_id = unpack_scope(data, offset)
+                offset += scope_size
+            broadcast = peer = None
+            if ip_bits & IP_BROADCAST:
+                broadcast = data[offset : offset + size]
+                offset += size
+            if ip_bits & IP_PEER:
+                peer = data[offset : offset + size]
+                offset += size
+            ips.append(
+                from_packed(packed, prefix, strings[ip_name], flowinfo, scope_id, broadcast, peer)
+            )
+        adapters.append(
+            Adapter(
+                strings[name],
+                strings[nice_name],
+                ips,
+                index=index if bits & ADAPTER_INDEX else None,
+                multicast=bool(bits & ADAPTER_MULTICAST),
+                flags=flags,
+                mac=mac,
+                stats=stats,
+            )
+        )
+    if offset != len(data):
+        raise ValueError('Malformed snapshot: length mismatch')
+    return adapters
+
+
+def _ip_to_json(ip: shared.IP) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    if isinstance(ip.ip, tuple):
+        result['ip'], result['flowinfo'], result['scope_id'] = ip.ip
+    else:
+        result['ip'] = ip.ip
+    result['network_prefix'] = ip.network_prefix
+    result['nice_name'] = ip.nice_name
+    result['broadcast'] = ip.broadcast
+    result['peer'] = ip.peer
+    return result
+
+
+def to_json(adapters: List[shared.Adapter]) -> str:
+    document = {
+        'version': VERSION,
+        'adapters': [
+            {
+                'name': adapter.name,
+                'nice_name': adapter.nice_name,
+                'index': adapter.index,
+                'flags': adapter.flags,
+                'multicast': adapter.multicast,
+                'mac': adapter.mac,
+                'stats': None if adapter.stats is None else adapter.stats._asdict(),
+                'ips': [_ip_to_json(ip) for ip in adapter.ips],
+            }
+            for adapter in adapters
+        ],
+    }
+    return json.dumps(document, separators=(',', ':'))
+
+
+def _pack(address: Optional[str], family: int) -> Optional[bytes]:
+    return None if address is None else socket.inet_pton(family, address)
+
+
+def from_json(text: str) -> List[shared.Adapter]:
+    try:
+        document = json.loads(text)
+        if document['version'] != VERSION:
+            raise ValueError(f'Unsupported snapshot version {document["version"]}')
+        adapters = []
+        for item in document['adapters']:
+            ips = []
+            for ip in item['ips']:
+                family = socket.AF_INET6 if 'scope_id' in ip else socket.AF_INET
+                ips.append(
+                    shared.IP.from_packed(
+                        socket.inet_pton(family, ip['ip']),
+                        ip['network_prefix'],
+                        ip['nice_name'],
+                        ip.get('flowinfo', 0),
+                        ip.get('scope_id', 0),
+                        _pack(ip['broadcast'], family),
+                        _pack(ip['peer'], family),
+                    )
+                )
+            stats = item['stats']
+            adapters.append(
+                shared.Adapter(
+                    item['name'],
+                    item['nice_name'],
+                    ips,
+                    index=item['index'],
+                    multicast=item['multicast'],
+                    flags=item['flags'],
+                    mac=item['mac'],
+                    stats=None if stats is None else shared.AdapterStats(**stats),
+                )
+            )
+        return adapters
+    except (KeyError, TypeError, OSError) as e:
+        raise ValueError(f'Malformed snapshot: {e!r}') from None
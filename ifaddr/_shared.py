@@ -19,12 +19,62 @@
 # IN THE SOFTWARE.
 
 
-import ctypes
 import socket
-import ipaddress
-from dataclasses import dataclass
 
-from typing import List, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+if TYPE_CHECKING:
+    # Only needed for the annotations. The properties that return ipaddress
+    # objects import the module when they are first used.
+    import ipaddress
+
+
+# Interface flags that have the same value on every POSIX system we support.
+# IFF_MULTICAST differs, the backends know the right value.
+IFF_UP = 0x1
+IFF_BROADCAST = 0x2
+IFF_LOOPBACK = 0x8
+IFF_POINTOPOINT = 0x10
+IFF_RUNNING = 0x40
+
+
+class AdapterStats(NamedTuple):
+    """
+    Traffic counters of an adapter since it was brought up.
+    """
+
+    rx_packets: int
+    tx_packets: int
+    rx_bytes: int
+    tx_bytes: int
+    rx_errors: int
+    tx_errors: int
+    rx_dropped: int
+    tx_dropped: int
+    multicast: int
+    collisions: int
+
+
+def format_mac(address: bytes) -> Optional[str]:
+    return address.hex(':') if address else None
+
+
+def is_valid_index(index: int) -> bool:
+    # Interface indexes are positive C ints, anything else can't name an
+    # interface and wouldn't fit the kernel's structures. bool is an int
+    # subclass, but True is not interface 1.
+    return not isinstance(index, bool) and 0 < index < 2**31
 
 
 class Adapter:
@@ -36,13 +86,22 @@ class Adapter:
     by creating 'virtual' adapters, each represented by an instance
     of this class. Each of those 'virtual' adapters can have both
     a IPv4 and an IPv6 IP address.
+
+    Adapters compare equal if all their attributes except :attr:`stats` are
+    equal. They can be modified and are therefore not hashable, use
+    :attr:`name` (or :attr:`index`) as a key instead.
     """
 
+    __slots__ = ('name', 'nice_name', 'ips', 'index', 'multicast', 'flags', 'mac', 'stats')
+
     name: str
     nice_name: str
     ips: List['IP']
     index: Optional[int]
     multicast: bool
+    flags: int
+    mac: Optional[str]
+    stats: Optional[AdapterStats]
 
     def __init__(
         self,
@@ -51,6 +110,9 @@ class Adapter:
         ips: List['IP'],
         index: Optional[int] = None,
         multicast: bool = True,
+        flags: int = 0,
+        mac: Optional[str] = None,
+        stats: Optional[AdapterStats] = None,
     ) -> None:
         #: Unique name that identifies the adapter in the system.
         #: On Linux this is of the form of `eth0` or `eth0:1`, on
@@ -73,6 +135,34 @@ class Adapter:
         #: If this adapter supports multicast
         self.multicast = multicast
 
+        #: Interface flags (`IFF_*`) as reported by the operating system. On
+        #: Windows only `IFF_UP`, `IFF_RUNNING` and `IFF_LOOPBACK` are
+        #: derived from the adapter's properties.
+        self.flags = flags
+
+        #: Hardware (MAC) address in the `00:11:22:aa:bb:cc` format, `None`
+        #: if the adapter doesn't have one or it isn't known.
+        self.mac = mac
+
+        #: :class:`ifaddr.AdapterStats` with the adapter's traffic counters
+        #: if the system reports them (currently Linux only).
+        self.stats = stats
+
+    @property
+    def is_up(self) -> bool:
+        """Returns `True` if the adapter has been brought up (`IFF_UP`)."""
+        return bool(self.flags & IFF_UP)
+
+    @property
+    def is_running(self) -> bool:
+        """Returns `True` if the adapter is operational (`IFF_RUNNING`)."""
+        return bool(self.flags & IFF_RUNNING)
+
+    @property
+    def is_loopback(self) -> bool:
+        """Returns `True` if this is a loopback adapter (`IFF_LOOPBACK`)."""
+        return bool(self.flags & IFF_LOOPBACK)
+
     def __repr__(self) -> str:
         return 'Adapter(name={name}, nice_name={nice_name}, ips={ips}, index={index}, multicast={multicast})'.format(
             name=repr(self.name),
@@ -82,52 +172,274 @@ class Adapter:
             multicast=repr(self.multicast),
         )
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Adapter):
+            return NotImplemented
+        return (
+            self.name == other.name
+            and self.index == other.index
+            and self.nice_name == other.nice_name
+            and self.multicast == other.multicast
+            and self.flags == other.flags
+            and self.mac == other.mac
+            and self.ips == other.ips
+        )
+
+    # Mutable, the hash would change with the attributes.
+    __hash__ = None  # type: ignore[assignment]
+
 
 # Technically we don't need this wrapper but when dealing with an IPv4, IPv6 union it's nice
-# to be able to unconditionally access the "address" property on it.
-@dataclass
-class IPv4Ext:
-    address: ipaddress.IPv4Address
+# to be able to unconditionally access the "packed" and "address" properties on it.
+class IPv4Ext(NamedTuple):
+    packed: bytes
 
+    @property
+    def address(self) -> 'ipaddress.IPv4Address':
+        import ipaddress
+
+        return ipaddress.IPv4Address(self.packed)
 
-@dataclass
-class IPv6Ext:
-    address: ipaddress.IPv6Address
+
+class IPv6Ext(NamedTuple):
+    packed: bytes
     flowinfo: int
     scope_id: int
 
+    @property
+    def address(self) -> 'ipaddress.IPv6Address':
+        import ipaddress
+
+        return ipaddress.IPv6Address(self.packed)
+
+
+def _format_packed(packed: bytes) -> str:
+    if len(packed) == 4:
+        return socket.inet_ntoa(packed)
+    import ipaddress
+
+    return str(ipaddress.IPv6Address(packed))
+
+
+_set = object.__setattr__
+
+
+def _make_ip(
+    cls: 'Type[IP]',
+    packed: bytes,
+    network_prefix: int,
+    nice_name: str,
+    flowinfo: int,
+    scope_id: int,
+    broadcast: Optional[bytes],
+    peer: Optional[bytes],
+) -> 'IP':
+    # IP refuses attribute assignments, its fields are set with the
+    # object.__setattr__() that it overrides.
+    ip = object.__new__(cls)
+    _set(ip, '_packed', packed)
+    _set(ip, '_flowinfo', flowinfo)
+    _set(ip, '_scope_id', scope_id)
+    _set(ip, '_ip', None)
+    _set(ip, '_broadcast', broadcast)
+    _set(ip, '_peer', peer)
+    _set(ip, 'network_prefix', network_prefix)
+    _set(ip, 'nice_name', nice_name)
+    return ip
+
 
 class IP:
     """
     Represents an IP address of an adapter.
+
+    IPs compare equal and hash by value, so they can be put into sets and
+    used as dictionary keys. They are immutable, assigning to an attribute
+    raises :class:`AttributeError`.
+
+    Only the packed address is stored, the string form and the
+    :mod:`ipaddress` objects are created when first requested.
     """
 
-    ip: Union[tuple[str, int, int], str]
+    __slots__ = (
+        '_packed',
+        '_flowinfo',
+        '_scope_id',
+        '_ip',
+        '_broadcast',
+        '_peer',
+        'network_prefix',
+        'nice_name',
+    )
+
+    _packed: bytes
+    _flowinfo: int
+    _scope_id: int
+    _ip: Optional[Union[Tuple[str, int, int], str]]
+    _broadcast: Optional[bytes]
+    _peer: Optional[bytes]
+
+    #: Number of bits of the IP that represent the
+    #: network. For a `255.255.255.0` netmask, this
+    #: number would be `24`.
     network_prefix: int
+
+    #: Human readable name for this IP.
+    #: On Linux is this currently the same as the adapter name.
+    #: On Windows this is the name of the network connection
+    #: as configured in the system control panel.
     nice_name: str
 
-    def __init__(self, ip: Union[IPv4Ext, IPv6Ext], network_prefix: int, nice_name: str) -> None:
-        #: IP address. For IPv4 addresses this is a string in
-        #: "xxx.xxx.xxx.xxx" format. For IPv6 addresses this
-        #: is a three-tuple `(ip, flowinfo, scope_id)`, where
-        #: `ip` is a string in the usual collon separated
-        #: hex format.
-        self.ip = (
-            (str(ip.address), ip.flowinfo, ip.scope_id)
-            if isinstance(ip, IPv6Ext)
-            else str(ip.address)
+    def __new__(
+        cls,
+        ip: Union[IPv4Ext, IPv6Ext],
+        network_prefix: int,
+        nice_name: str,
+        broadcast: Optional[Union[IPv4Ext, IPv6Ext]] = None,
+        peer: Optional[Union[IPv4Ext, IPv6Ext]] = None,
+    ) -> 'IP':
+        if isinstance(ip, IPv6Ext):
+            flowinfo, scope_id = ip.flowinfo, ip.scope_id
+        else:
+            flowinfo = scope_id = 0
+        return _make_ip(
+            cls,
+            ip.packed,
+            network_prefix,
+            nice_name,
+            flowinfo,
+            scope_id,
+            None if broadcast is None else broadcast.packed,
+            None if peer is None else peer.packed,
         )
 
-        #: Number of bits of the IP that represent the
-        #: network. For a `255.255.255.0` netmask, this
-        #: number would be `24`.
-        self.network_prefix = network_prefix
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f'IP objects are immutable, cannot set {name!r}')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f'IP objects are immutable, cannot delete {name!r}')
+
+    def __reduce__(self) -> Tuple[object, ...]:
+        # The default would restore the fields with setattr().
+        return (
+            _make_ip,
+            (
+                type(self),
+                self._packed,
+                self.network_prefix,
+                self.nice_name,
+                self._flowinfo,
+                self._scope_id,
+                self._broadcast,
+                self._peer,
+            ),
+        )
 
-        #: Human readable name for this IP.
-        #: On Linux is this currently the same as the adapter name.
-        #: On Windows this is the name of the network connection
-        #: as configured in the system control panel.
-        self.nice_name = nice_name
+    @classmethod
+    def from_packed(
+        cls,
+        packed: bytes,
+        network_prefix: int,
+        nice_name: str,
+        flowinfo: int = 0,
+        scope_id: int = 0,
+        broadcast: Optional[bytes] = None,
+        peer: Optional[bytes] = None,
+    ) -> 'IP':
+        """
+        Creates an IP from its packed (4 or 16 bytes, network byte order)
+        representation. `broadcast` and `peer` are packed as well.
+        """
+        if len(packed) not in (4, 16):
+            raise ValueError(f'Expected 4 or 16 bytes, got {len(packed)}')
+        return _make_ip(cls, packed, network_prefix, nice_name, flowinfo, scope_id, broadcast, peer)
+
+    @property
+    def ip(self) -> Union[Tuple[str, int, int], str]:
+        """
+        IP address. For IPv4 addresses this is a string in
+        "xxx.xxx.xxx.xxx" format. For IPv6 addresses this
+        is a three-tuple `(ip, flowinfo, scope_id)`, where
+        `ip` is a string in the usual collon separated
+        hex format.
+        """
+        ip = self._ip
+        if ip is None:
+            if len(self._packed) == 4:
+                ip = socket.inet_ntoa(self._packed)
+            else:
+                ip = (_format_packed(self._packed), self._flowinfo, self._scope_id)
+            # A cache of a value derived from the immutable fields
+            _set(self, '_ip', ip)
+        return ip
+
+    @property
+    def packed(self) -> bytes:
+        """
+        The address in network byte order, 4 bytes long for IPv4 and 16
+        bytes long for IPv6 addresses.
+        """
+        return self._packed
+
+    @property
+    def flowinfo(self) -> int:
+        """The IPv6 flow information, 0 for IPv4 addresses."""
+        return self._flowinfo
+
+    @property
+    def scope_id(self) -> int:
+        """
+        The IPv6 scope id (the interface index of link-local addresses), 0 for
+        IPv4 addresses.
+        """
+        return self._scope_id
+
+    @property
+    def address(self) -> Union['ipaddress.IPv4Address', 'ipaddress.IPv6Address']:
+        """
+        The address as an :class:`ipaddress.IPv4Address` or
+        :class:`ipaddress.IPv6Address`.
+        """
+        import ipaddress
+
+        if len(self._packed) == 4:
+            return ipaddress.IPv4Address(self._packed)
+        return ipaddress.IPv6Address(self._packed)
+
+    @property
+    def network(self) -> Union['ipaddress.IPv4Network', 'ipaddress.IPv6Network']:
+        """
+        The network this IP belongs to, for example `192.168.0.0/24` for
+        `192.168.0.51` with a network prefix of `24`.
+        """
+        import ipaddress
+
+        return ipaddress.ip_network((self.address, self.network_prefix), strict=False)
+
+    @property
+    def broadcast(self) -> Optional[str]:
+        """
+        Broadcast address of the network, if the adapter supports
+        broadcasting and the system reports one.
+        """
+        return None if self._broadcast is None else _format_packed(self._broadcast)
+
+    @property
+    def peer(self) -> Optional[str]:
+        """
+        Address of the other end of a point-to-point link, `None` for
+        other adapters.
+        """
+        return None if self._peer is None else _format_packed(self._peer)
+
+    @property
+    def packed_broadcast(self) -> Optional[bytes]:
+        """The broadcast address in network byte order, see :attr:`broadcast`."""
+        return self._broadcast
+
+    @property
+    def packed_peer(self) -> Optional[bytes]:
+        """The peer address in network byte order, see :attr:`peer`."""
+        return self._peer
 
     @property
     def is_IPv4(self) -> bool:
@@ -135,7 +447,7 @@ class IP:
         Returns `True` if this IP is an IPv4 address and `False`
         if it is an IPv6 address.
         """
-        return not isinstance(self.ip, tuple)
+        return len(self._packed) == 4
 
     @property
     def is_IPv6(self) -> bool:
@@ -143,7 +455,7 @@ class IP:
         Returns `True` if this IP is an IPv6 address and `False`
         if it is an IPv4 address.
         """
-        return isinstance(self.ip, tuple)
+        return len(self._packed) == 16
 
     def __repr__(self) -> str:
         return 'IP(ip={ip}, network_prefix={network_prefix}, nice_name={nice_name})'.format(
@@ -152,96 +464,144 @@ class IP:
             nice_name=repr(self.nice_name),
         )
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IP):
+            return NotImplemented
+        return (
+            self._packed == other._packed
+            and self._flowinfo == other._flowinfo
+            and self._scope_id == other._scope_id
+            and self._broadcast == other._broadcast
+            and self._peer == other._peer
+            and self.network_prefix == other.network_prefix
+            and self.nice_name == other.nice_name
+        )
 
-import sys
-
-if (
-    sys.platform == 'darwin'
-    or sys.platform.startswith('freebsd')
-    or sys.platform.startswith('openbsd')
-):
-    # BSD derived systems use marginally different structures
-    # than either Linux or Windows.
-    # I still keep it in `shared` since we can use
-    # both structures equally.
-
-    class sockaddr(ctypes.Structure):
-        _fields_ = [
-            ('sa_len', ctypes.c_uint8),
-            ('sa_familiy', ctypes.c_uint8),
-            ('sa_data', ctypes.c_uint8 * 14),
-        ]
-
-    class sockaddr_in(ctypes.Structure):
-        _fields_ = [
-            ('sa_len', ctypes.c_uint8),
-            ('sa_familiy', ctypes.c_uint8),
-            ('sin_port', ctypes.c_uint16),
-            ('sin_addr', ctypes.c_uint8 * 4),
-            ('sin_zero', ctypes.c_uint8 * 8),
-        ]
-
-    class sockaddr_in6(ctypes.Structure):
-        _fields_ = [
-            ('sa_len', ctypes.c_uint8),
-            ('sa_familiy', ctypes.c_uint8),
-            ('sin6_port', ctypes.c_uint16),
-            ('sin6_flowinfo', ctypes.c_uint32),
-            ('sin6_addr', ctypes.c_uint8 * 16),
-            ('sin6_scope_id', ctypes.c_uint32),
-        ]
-
-else:
-
-    class sockaddr(ctypes.Structure):
-        _fields_ = [('sa_familiy', ctypes.c_uint16), ('sa_data', ctypes.c_uint8 * 14)]
-
-    class sockaddr_in(ctypes.Structure):
-        _fields_ = [
-            ('sin_familiy', ctypes.c_uint16),
-            ('sin_port', ctypes.c_uint16),
-            ('sin_addr', ctypes.c_uint8 * 4),
-            ('sin_zero', ctypes.c_uint8 * 8),
-        ]
-
-    class sockaddr_in6(ctypes.Structure):
-        _fields_ = [
-            ('sin6_familiy', ctypes.c_uint16),
-            ('sin6_port', ctypes.c_uint16),
-            ('sin6_flowinfo', ctypes.c_uint32),
-            ('sin6_addr', ctypes.c_uint8 * 16),
-            ('sin6_scope_id', ctypes.c_uint32),
-        ]
-
-
-def sockaddr_to_ip(sockaddr_ptr: ctypes._Pointer) -> Optional[Union[IPv4Ext, IPv6Ext]]:
-    if sockaddr_ptr:
-        if sockaddr_ptr.contents.sa_familiy == socket.AF_INET:
-            ipv4 = ctypes.cast(sockaddr_ptr, ctypes.POINTER(sockaddr_in)).contents
-            ippacked = bytes(ipv4.sin_addr)
-            return IPv4Ext(ipaddress.IPv4Address(ippacked))
-        elif sockaddr_ptr.contents.sa_familiy == socket.AF_INET6:
-            ipv6 = ctypes.cast(sockaddr_ptr, ctypes.POINTER(sockaddr_in6)).contents
-            ippacked = bytes(ipv6.sin6_addr)
-            return IPv6Ext(
-                address=ipaddress.IPv6Address(ippacked),
-                flowinfo=ipv6.sin6_flowinfo,
-                scope_id=ipv6.sin6_scope_id,
-            )
-    return None
+    def __hash__(self) -> int:
+        return hash((self._packed, self._scope_id, self.network_prefix, self.nice_name))
 
 
-def sockaddr_to_ip_strict(sockaddr_ptr: ctypes._Pointer) -> Union[IPv4Ext, IPv6Ext]:
-    """A version of sockaddr_to_ip that raises an exception instead of returning None."""
-    result = sockaddr_to_ip(sockaddr_ptr)
-    assert result is not None
-    return result
+class AddressRecord(NamedTuple):
+    """
+    A single IP of an adapter, as yielded by :func:`ifaddr.iter_addresses`.
+    """
+
+    #: Name of the adapter the IP belongs to, see :attr:`ifaddr.Adapter.name`.
+    adapter_name: str
+    #: Index of the adapter, see :attr:`ifaddr.Adapter.index`.
+    adapter_index: Optional[int]
+    #: The interface flags (`IFF_*`) reported by the operating system.
+    flags: int
+    ip: IP
 
 
-def ipv6_prefixlength(address: ipaddress.IPv6Address) -> int:
-    prefix_length = 0
-    address_as_int = int(address)
-    for i in range(address.max_prefixlen):
-        if address_as_int >> i & 1:
-            prefix_length = prefix_length + 1
-    return prefix_length
+def ipv6_prefixlength(address: 'ipaddress.IPv6Address') -> int:
+    return int(address).bit_count()
+
+
+def netmask_to_prefixlen(packed: bytes) -> int:
+    """
+    Returns the prefix length of a netmask given in packed form (4 or 16 bytes).
+
+    Raises :class:`ValueError` if the netmask is not contiguous (like
+    `255.0.255.0`), which can't be expressed as a prefix length.
+    """
+    value = int.from_bytes(packed, 'big')
+    # A contiguous netmask is all ones followed by all zeros, so its
+    # complement must be of the form 2**n - 1.
+    host_bits = value ^ ((1 << (len(packed) * 8)) - 1)
+    if host_bits & (host_bits + 1):
+        raise ValueError(f'Non-contiguous netmask: {packed.hex()}')
+    return value.bit_count()
+
+
+class AdapterFilter:
+    """
+    The filtering options of `get_adapters()` in a form that's cheap to
+    check while walking the data returned by the operating system, before
+    anything is allocated for the entries that don't match.
+    """
+
+    __slots__ = (
+        'family',
+        'required_flags',
+        'forbidden_flags',
+        '_names',
+        '_patterns',
+        '_bases',
+        '_base_patterns',
+        '_cache',
+    )
+
+    def __init__(
+        self,
+        *,
+        multicast_flag: int,
+        family: Optional[int] = None,
+        names: Optional[Iterable[str]] = None,
+        exclude_loopback: bool = False,
+        require_multicast: bool = False,
+        require_up: bool = False,
+    ) -> None:
+        self.family = family
+        self.required_flags = (IFF_UP if require_up else 0) | (
+            multicast_flag if require_multicast else 0
+        )
+        self.forbidden_flags = IFF_LOOPBACK if exclude_loopback else 0
+        self._names: Optional[Set[str]] = None
+        self._patterns: List[str] = []
+        # The interfaces of the aliases (eth0:1) among the names
+        self._bases: Set[str] = set()
+        self._base_patterns: List[str] = []
+        if names is not None:
+            self._names = set()
+            for name in names:
+                if any(c in name for c in '*?['):
+                    self._patterns.append(name)
+                else:
+                    self._names.add(name)
+                if ':' in name:
+                    base = name.split(':', 1)[0]
+                    if any(c in base for c in '*?['):
+                        self._base_patterns.append(base)
+                    else:
+                        self._bases.add(base)
+        self._cache: Dict[str, bool] = {}
+
+    @property
+    def filters_names(self) -> bool:
+        return self._names is not None
+
+    def accepts_flags(self, flags: int) -> bool:
+        return flags & self.required_flags == self.required_flags and not (
+            flags & self.forbidden_flags
+        )
+
+    def accepts_family(self, family: int) -> bool:
+        return self.family is None or self.family == family
+
+    def accepts_name(self, name: str) -> bool:
+        if self._names is None or name in self._names:
+            return True
+        result = self._cache.get(name)
+        if result is None:
+            import fnmatch
+
+            result = self._cache[name] = any(
+                fnmatch.fnmatchcase(name, pattern) for pattern in self._patterns
+            )
+        return result
+
+    def accepts_link_layer(self, name: str) -> bool:
+        """
+        Whether the link-layer data of the interface `name` is needed, for
+        the interface itself or for one of its accepted aliases (eth0:1),
+        which share it.
+        """
+        if self.accepts_name(name) or name in self._bases:
+            return True
+        if not self._base_patterns:
+            return False
+        import fnmatch
+
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in self._base_patterns)
@@ -0,0 +1,242 @@
+# Copyright (c) 2014 Stefan C. Mueller
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import ifaddr._serialize as _serialize
+import ifaddr._shared as shared
+from ifaddr._prefix import AddressLike, PrefixTable, packed_address
+
+AdapterKey = Tuple[str, Optional[int]]
+IPKey = Tuple[bytes, int, int]
+
+
+def adapter_key(adapter: shared.Adapter) -> AdapterKey:
+    return (adapter.name, adapter.index)
+
+
+def ip_key(ip: shared.IP) -> IPKey:
+    # Built from the packed form, IP.ip would format every address.
+    return (ip.packed, ip.scope_id, ip.network_prefix)
+
+
+@dataclass
+class SnapshotDiff:
+    """
+    The difference between two :class:`ifaddr.Snapshot` instances, as returned
+    by :meth:`ifaddr.Snapshot.diff`.
+
+    Adapters are matched by `(name, index)`, an adapter that was recreated
+    under the same name therefore shows up as removed and added. IPs are
+    matched by address, scope id and network prefix within their adapter. IP lists hold
+    `(adapter, ip)` pairs, for removals the adapter is the old one.
+    """
+
+    added_adapters: List[shared.Adapter] = field(default_factory=list)
+    removed_adapters: List[shared.Adapter] = field(default_factory=list)
+    #: Adapters whose own attributes (nice name, multicast support,
+    #: flags, MAC address) changed.
+    changed_adapters: List[shared.Adapter] = field(default_factory=list)
+    added_ips: List[Tuple[shared.Adapter, shared.IP]] = field(default_factory=list)
+    removed_ips: List[Tuple[shared.Adapter, shared.IP]] = field(default_factory=list)
+    #: IPs whose nice name, broadcast or peer address changed.
+    changed_ips: List[Tuple[shared.Adapter, shared.IP]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.added_adapters
+            or self.removed_adapters
+            or self.changed_adapters
+            or self.added_ips
+            or self.removed_ips
+            or self.changed_ips
+        )
+
+
+class _Indexes:
+    __slots__ = ('by_name', 'by_index', 'by_ip', 'routes')
+
+    def __init__(self, adapters: List[shared.Adapter]) -> None:
+        self.by_name: Dict[str, shared.Adapter] = {}
+        self.by_index: Dict[int, shared.Adapter] = {}
+        self.by_ip: Dict[bytes, List[Tuple[shared.Adapter, shared.IP]]] = {}
+        for adapter in adapters:
+            self.by_name.setdefault(adapter.name, adapter)
+            if adapter.index is not None:
+                self.by_index.setdefault(adapter.index, adapter)
+            for ip in adapter.ips:
+                self.by_ip.setdefault(ip.packed, []).append((adapter, ip))
+        self.routes = PrefixTable.from_adapters(adapters)
+
+
+class Snapshot:
+    """
+    A record of the adapters at one point in time, see
+    :meth:`capture`. Two snapshots can be compared with :meth:`diff` in
+    time linear in the number of adapters and IPs.
+
+    The lookups (:meth:`by_name`, :meth:`by_index`, :meth:`by_ip` and
+    :meth:`route`) share a set of indexes that is built on first use, after
+    that they take constant time.
+    """
+
+    def __init__(self, adapters: Iterable[shared.Adapter]) -> None:
+        self._adapters = list(adapters)
+        self._by_key: Dict[AdapterKey, shared.Adapter] = {
+            adapter_key(adapter): adapter for adapter in self._adapters
+        }
+        self._indexes: Optional[_Indexes] = None
+
+    @classmethod
+    def capture(cls, include_unconfigured: bool = False) -> 'Snapshot':
+        """Takes a snapshot of the current adapters, see :func:`ifaddr.get_adapters`."""
+        import ifaddr
+
+        return cls(ifaddr.get_adapters(include_unconfigured=include_unconfigured))
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns a compact binary encoding of the snapshot: addresses are
+        stored packed and every distinct name only once. :meth:`from_bytes`
+        restores it, including the adapters' :attr:`~ifaddr.Adapter.stats`.
+        """
+        return _serialize.to_bytes(self._adapters)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Snapshot':
+        """
+        Restores a snapshot encoded with :meth:`to_bytes`. Raises
+        :class:`ValueError` if `data` isn't such an encoding.
+        """
+        return cls(_serialize.from_bytes(data))
+
+    def to_json(self) -> str:
+        """
+        Returns the snapshot as JSON. The document has a `version` and an
+        `adapters` list with the attributes of :class:`ifaddr.Adapter`, with
+        `stats` as an object and `ips` as a list of objects with `ip` (the
+        address text), `network_prefix`, `nice_name`, `broadcast` and `peer`,
+        plus `flowinfo` and `scope_id` for IPv6 addresses.
+        """
+        return _serialize.to_json(self._adapters)
+
+    @classmethod
+    def from_json(cls, text: str) -> 'Snapshot':
+        """
+        Restores a snapshot from :meth:`to_json` output. Raises
+        :class:`ValueError` if `text` isn't such a document.
+        """
+        return cls(_serialize.from_json(text))
+
+    @property
+    def adapters(self) -> List[shared.Adapter]:
+        return list(self._adapters)
+
+    def __iter__(self) -> Iterator[shared.Adapter]:
+        return iter(self._adapters)
+
+    def __len__(self) -> int:
+        return len(self._adapters)
+
+    def __repr__(self) -> str:
+        return 'Snapshot({adapters})'.format(adapters=repr(self._adapters))
+
+    def _get_indexes(self) -> _Indexes:
+        # Building them twice in a race is harmless, the results are identical.
+        if self._indexes is None:
+            self._indexes = _Indexes(self._adapters)
+        return self._indexes
+
+    def by_name(self, name: str) -> Optional[shared.Adapter]:
+        """Returns the adapter called `name`, `None` if there is none."""
+        return self._get_indexes().by_name.get(name)
+
+    def by_index(self, index: int) -> Optional[shared.Adapter]:
+        """
+        Returns the adapter with interface index `index`, `None` if there is
+        none. Aliases like `eth0:1` share the index of their interface, the
+        first adapter with the index wins.
+        """
+        return self._get_indexes().by_index.get(index)
+
+    def by_ip(self, address: AddressLike) -> List[Tuple[shared.Adapter, shared.IP]]:
+        """
+        Returns the `(adapter, ip)` pairs that have the address `address`
+        (text, packed or an :mod:`ipaddress` object). Usually there is at most
+        one, but IPv6 link-local addresses can be configured on several
+        adapters.
+        """
+        return list(self._get_indexes().by_ip.get(packed_address(address), ()))
+
+    def route(self, address: AddressLike) -> Optional[Tuple[shared.Adapter, shared.IP]]:
+        """
+        Returns the `(adapter, ip)` pair whose network contains `address` with
+        the longest prefix, in other words the local address that reaches
+        `address` directly. Returns `None` if no network contains it.
+
+        This only considers the adapters' own networks, not the routing table.
+        See :class:`ifaddr.PrefixTable` for batched lookups.
+        """
+        return self._get_indexes().routes.lookup(address)
+
+    def diff(self, other: 'Snapshot') -> SnapshotDiff:
+        """
+        Returns what changed going from this snapshot to `other`.
+        """
+        result = SnapshotDiff()
+
+        for key, adapter in self._by_key.items():
+            if key not in other._by_key:
+                result.removed_adapters.append(adapter)
+                result.removed_ips.extend((adapter, ip) for ip in adapter.ips)
+
+        for key, adapter in other._by_key.items():
+            previous = self._by_key.get(key)
+            if previous is None:
+                result.added_adapters.append(adapter)
+                result.added_ips.extend((adapter, ip) for ip in adapter.ips)
+                continue
+            if (previous.nice_name, previous.multicast, previous.flags, previous.mac) != (
+                adapter.nice_name,
+                adapter.multicast,
+                adapter.flags,
+                adapter.mac,
+            ):
+                result.changed_adapters.append(adapter)
+            if previous.ips == adapter.ips:
+                continue
+            old_ips = {ip_key(ip): ip for ip in previous.ips}
+            new_ips = {ip_key(ip): ip for ip in adapter.ips}
+            for ip_id, ip in old_ips.items():
+                if ip_id not in new_ips:
+                    result.removed_ips.append((previous, ip))
+            for ip_id, ip in new_ips.items():
+                old_ip = old_ips.get(ip_id)
+                if old_ip is None:
+                    result.added_ips.append((adapter, ip))
+                elif (old_ip.nice_name, old_ip.packed_broadcast, old_ip.packed_peer) != (
+                    ip.nice_name,
+                    ip.packed_broadcast,
+                    ip.packed_peer,
+                ):
+                    result.changed_ips.append((adapter, ip))
+
+        return result
@@ -0,0 +1,167 @@
+# Copyright (c) 2014 Stefan C. Mueller
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+# Socket address structures as read by the getifaddrs() and Windows backends.
+# They live apart from `ifaddr._shared` so the netlink backend can be used
+# without importing ctypes.
+
+import ctypes
+import socket
+import struct
+import sys
+from typing import Any, Dict, Optional, Tuple, Union
+
+from ifaddr._shared import IPv4Ext, IPv6Ext
+
+if (
+    sys.platform == 'darwin'
+    or sys.platform.startswith('freebsd')
+    or sys.platform.startswith('openbsd')
+):
+    # BSD derived systems use marginally different structures
+    # than either Linux or Windows.
+
+    # sa_len, sa_family
+    sa_family = struct.Struct('=xB')
+
+    class sockaddr(ctypes.Structure):
+        _fields_ = [
+            ('sa_len', ctypes.c_uint8),
+            ('sa_familiy', ctypes.c_uint8),
+            ('sa_data', ctypes.c_uint8 * 14),
+        ]
+
+    class sockaddr_in(ctypes.Structure):
+        _fields_ = [
+            ('sa_len', ctypes.c_uint8),
+            ('sa_familiy', ctypes.c_uint8),
+            ('sin_port', ctypes.c_uint16),
+            ('sin_addr', ctypes.c_uint8 * 4),
+            ('sin_zero', ctypes.c_uint8 * 8),
+        ]
+
+    class sockaddr_in6(ctypes.Structure):
+        _fields_ = [
+            ('sa_len', ctypes.c_uint8),
+            ('sa_familiy', ctypes.c_uint8),
+            ('sin6_port', ctypes.c_uint16),
+            ('sin6_flowinfo', ctypes.c_uint32),
+            ('sin6_addr', ctypes.c_uint8 * 16),
+            ('sin6_scope_id', ctypes.c_uint32),
+        ]
+
+else:
+    sa_family = struct.Struct('=H')
+
+    class sockaddr(ctypes.Structure):
+        _fields_ = [('sa_familiy', ctypes.c_uint16), ('sa_data', ctypes.c_uint8 * 14)]
+
+    class sockaddr_in(ctypes.Structure):
+        _fields_ = [
+            ('sin_familiy', ctypes.c_uint16),
+            ('sin_port', ctypes.c_uint16),
+            ('sin_addr', ctypes.c_uint8 * 4),
+            ('sin_zero', ctypes.c_uint8 * 8),
+        ]
+
+    class sockaddr_in6(ctypes.Structure):
+        _fields_ = [
+            ('sin6_familiy', ctypes.c_uint16),
+            ('sin6_port', ctypes.c_uint16),
+            ('sin6_flowinfo', ctypes.c_uint32),
+            ('sin6_addr', ctypes.c_uint8 * 16),
+            ('sin6_scope_id', ctypes.c_uint32),
+        ]
+
+
+# Both layouts have the address family and the port in the first four bytes.
+# The integers are read in native byte order, like the ctypes structures do.
+sin_addr = struct.Struct('=4x4s')
+sin6 = struct.Struct('=4xI16sI')
+AF_INET = socket.AF_INET
+AF_INET6 = socket.AF_INET6
+
+
+# Byte array types by size. Their instances are views of exactly one structure,
+# which struct can unpack in place.
+_arrays: Dict[int, Any] = {}
+
+
+def unpack_at(layout: struct.Struct, address: int) -> Tuple[Any, ...]:
+    """
+    Unpacks `layout` from the `layout.size` bytes at the memory address
+    `address`. That is several times cheaper than copying them out with
+    ctypes.string_at() or creating ctypes structures for them.
+    """
+    array = _arrays.get(layout.size)
+    if array is None:
+        array = _arrays[layout.size] = ctypes.c_uint8 * layout.size
+    return layout.unpack_from(array.from_address(address))
+
+
+def read_family(address: int, fallback_family: int = 0) -> int:
+    """
+    Returns the family of the socket address at the memory address `address`.
+    Some systems report netmasks with a family of 0, that is replaced by
+    `fallback_family`.
+    """
+    family: int = unpack_at(sa_family, address)[0]
+    return family or fallback_family
+
+
+def read_ip(address: int, family: int) -> Union[IPv4Ext, IPv6Ext]:
+    """
+    Returns the IP of the socket address at the memory address `address`,
+    which has to be of `family` AF_INET or AF_INET6.
+    """
+    if family == AF_INET:
+        return IPv4Ext(unpack_at(sin_addr, address)[0])
+    flowinfo, packed, scope_id = unpack_at(sin6, address)
+    return IPv6Ext(packed, flowinfo, scope_id)
+
+
+def read_sockaddr(
+    address: int, fallback_family: int = 0
+) -> Tuple[int, Optional[Union[IPv4Ext, IPv6Ext]]]:
+    """
+    Returns the family of the socket address at the memory address `address`
+    (see :func:`read_family`) and the IP for AF_INET and AF_INET6 (`None` for
+    other families).
+
+    The fields are unpacked with precompiled structs, without the ctypes
+    structures and pointer casts.
+    """
+    family = read_family(address, fallback_family)
+    if family in (AF_INET, AF_INET6):
+        return family, read_ip(address, family)
+    return family, None
+
+
+def sockaddr_to_ip(sockaddr_ptr: ctypes._Pointer) -> Optional[Union[IPv4Ext, IPv6Ext]]:
+    if sockaddr_ptr:
+        return read_sockaddr(ctypes.addressof(sockaddr_ptr.contents))[1]
+    return None
+
+
+def sockaddr_to_ip_strict(sockaddr_ptr: ctypes._Pointer) -> Union[IPv4Ext, IPv6Ext]:
+    """A version of sockaddr_to_ip that raises an exception instead of returning None."""
+    result = sockaddr_to_ip(sockaddr_ptr)
+    assert result is not None
+    return result
@@ -0,0 +1,252 @@
+# Copyright (c) 2014 Stefan C. Mueller
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to
+# deal in the Software without restriction, including without limitation the
+# rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+# sell copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+import enum
+import errno
+import select
+import socket
+import sys
+import time
+from dataclasses import dataclass
+from types import TracebackType
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Type,
+    Union,
+)
+
+import ifaddr._shared as shared
+from ifaddr._snapshot import Snapshot, SnapshotDiff
+
+
+class ChangeType(enum.Enum):
+    ADDED = 'added'
+    REMOVED = 'removed'
+    CHANGED = 'changed'
+
+
+@dataclass(frozen=True)
+class AdapterChange:
+    """
+    An adapter appeared, disappeared or had its attributes (nice name,
+    multicast support, flags, MAC address) changed. For removals
+    :attr:`adapter` is the last known state.
+    """
+
+    type: ChangeType
+    adapter: shared.Adapter
+
+
+@dataclass(frozen=True)
+class IPChange:
+    """
+    An IP was added to or removed from :attr:`adapter`, or its nice name,
+    broadcast or peer address changed. A changed network prefix is reported
+    as a removal and an addition.
+    """
+
+    type: ChangeType
+    adapter: shared.Adapter
+    ip: shared.IP
+
+
+Change = Union[AdapterChange, IPChange]
+
+
+def changes_from_diff(diff: SnapshotDiff) -> List[Change]:
+    changes: List[Change] = []
+    changes.extend(IPChange(ChangeType.REMOVED, adapter, ip) for adapter, ip in diff.removed_ips)
+    changes.extend(AdapterChange(ChangeType.REMOVED, adapter) for adapter in diff.removed_adapters)
+    changes.extend(AdapterChange(ChangeType.ADDED, adapter) for adapter in diff.added_adapters)
+    changes.extend(AdapterChange(ChangeType.CHANGED, adapter) for adapter in diff.changed_adapters)
+    changes.extend(IPChange(ChangeType.ADDED, adapter, ip) for adapter, ip in diff.added_ips)
+    changes.extend(IPChange(ChangeType.CHANGED, adapter, ip) for adapter, ip in diff.changed_ips)
+    return changes
+
+
+def _default_get_adapters(include_unconfigured: bool) -> Iterable[shared.Adapter]:
+    import ifaddr
+
+    return ifaddr.get_adapters(include_unconfigured=include_unconfigured)
+
+
+class Watcher:
+    """
+    Reports changes to the network adapters and their IPs. Iterate over it
+    (``for change in watcher``) to block until changes arrive or use
+    ``async for`` from asyncio code.
+
+    On Linux the watcher subscribes to rtnetlink link and address
+    notifications and wakes up only when something changed. On other
+    systems the adapters are polled every `interval` seconds.
+    """
+
+    def __init__(
+        self,
+        include_unconfigured: bool = False,
+        interval: float = 1.0,
+        *,
+        get_adapters: Optional[Callable[[bool], Iterable[shared.Adapter]]] = None,
+    ) -> None:
+        self._include_unconfigured = include_unconfigured
+        self._interval = interval
+        self._get_adapters = get_adapters or _default_get_adapters
+        self._socket = self._subscribe() if get_adapters is None else None
+        self._pending: List[Change] = []
+        # Subscribe before taking the initial snapshot so that nothing can
+        # slip through in between.
+        self._snapshot = Snapshot(self._enumerate())
+
+    @staticmethod
+    def _subscribe() -> Optional[socket.socket]:
+        if not sys.platform.startswith('linux'):
+            return None
+        import ifaddr._netlink as netlink
+
+        try:
+            sock = netlink.open_socket(
+                netlink.RTMGRP_LINK | netlink.RTMGRP_IPV4_IFADDR | netlink.RTMGRP_IPV6_IFADDR
+            )
+        except OSError:
+            return None
+        sock.setblocking(False)
+        return sock
+
+    @property
+    def adapters(self) -> List[shared.Adapter]:
+        """The adapters as of the most recently reported change."""
+        return self._snapshot.adapters
+
+    def _enumerate(self) -> Iterable[shared.Adapter]:
+        return self._get_adapters(self._include_unconfigured)
+
+    def _drain(self) -> None:
+        # We only use the notifications as a wake-up signal and re-read the full
+        # state afterwards, so coalescing a burst of them (or losing some to
+        # ENOBUFS) is harmless.
+        assert self._socket is not None
+        while True:
+            try:
+                self._socket.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                # The kernel dropped notifications, the resync covers that.
+                if e.errno != errno.ENOBUFS:
+                    raise
+
+    def _refresh(self) -> List[Change]:
+        snapshot = Snapshot(self._enumerate())
+        changes = changes_from_diff(self._snapshot.diff(snapshot))
+        self._snapshot = snapshot
+        return changes
+
+    def poll(self, timeout: Optional[float] = None) -> List[Change]:
+        """
+        Waits up to `timeout` seconds (forever when `None`) for changes and
+        returns them. Returns an empty list if nothing changed in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self._socket is not None:
+                readable, _, _ = select.select([self._socket], [], [], remaining)
+                if not readable:
+                    return []
+                self._drain()
+            else:
+                time.sleep(self._interval if remaining is None else min(self._interval, remaining))
+            changes = self._refresh()
+            if changes or (deadline is not None and time.monotonic() >= deadline):
+                return changes
+
+    def __iter__(self) -> Iterator[Change]:
+        while True:
+            while self._pending:
+                yield self._pending.pop(0)
+            self._pending.extend(self.poll())
+
+    async def _wait_async(self) -> None:
+        # asyncio is expensive to import and most users never need it.
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        if self._socket is None:
+            await asyncio.sleep(self._interval)
+            return
+        readable = loop.create_future()
+
+        def on_readable() -> None:
+            if not readable.done():
+                readable.set_result(None)
+
+        fd = self._socket.fileno()
+        loop.add_reader(fd, on_readable)
+        try:
+            await readable
+        finally:
+            loop.remove_reader(fd)
+        self._drain()
+
+    async def __aiter__(self) -> AsyncIterator[Change]:
+        import asyncio
+
+        from ifaddr.aio import _get_executor
+
+        loop = asyncio.get_running_loop()
+        while True:
+            while self._pending:
+                yield self._pending.pop(0)
+            await self._wait_async()
+            # Enumeration is blocking, keep it off the event loop (on the
+            # threads ifaddr.aio uses for that).
+            self._pending.extend(await loop.run_in_executor(_get_executor(), self._refresh))
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self) -> 'Watcher':
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+def watch(include_unconfigured: bool = False, interval: float = 1.0) -> Watcher:
+    """
+    Starts watching the network adapters for changes. See :class:`Watcher`.
+
+    :param include_unconfigured: Whether adapters without IPs are reported too.
+    :param interval: Polling interval in seconds on systems without change
+        notifications.
+    """
+    return Watcher(include_unconfigured, interval)
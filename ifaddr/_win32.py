@@ -23,12 +23,15 @@ import ctypes
 import sys
 from ctypes import wintypes
 from dataclasses import dataclass
-from typing import Iterable, List, TypeVar, Union
+from typing import Any, Generator, Iterable, List, Optional, TypeVar, Union
 
+import ifaddr._profile as _profile
 import ifaddr._shared as shared
+from ifaddr._sockaddr import sockaddr, sockaddr_to_ip_strict
 
-# To aid with platform-specific type-checking
-assert sys.platform == 'win32'
+# Only the OS interaction is Windows specific. The rest of this module imports
+# everywhere, so that the conversion can be tested and profiled on any system
+# (see `ifaddr._fake`).
 
 NO_ERROR = 0
 ERROR_BUFFER_OVERFLOW = 111
@@ -36,10 +39,17 @@ MAX_ADAPTER_NAME_LENGTH = 256
 MAX_ADAPTER_DESCRIPTION_LENGTH = 128
 MAX_ADAPTER_ADDRESS_LENGTH = 8
 AF_UNSPEC = 0
+AF_INET6 = 23
+IF_TYPE_SOFTWARE_LOOPBACK = 24
+IF_OPER_STATUS_UP = 1
+IP_ADAPTER_NO_MULTICAST = 0x10
+# Windows has no interface flags in the POSIX sense, we synthesize them
+# from the adapter properties above to share the filtering logic.
+IFF_MULTICAST = 0x1000
 
 
 class SOCKET_ADDRESS(ctypes.Structure):
-    _fields_ = [('lpSockaddr', ctypes.POINTER(shared.sockaddr)), ('iSockaddrLength', wintypes.INT)]
+    _fields_ = [('lpSockaddr', ctypes.POINTER(sockaddr)), ('iSockaddrLength', wintypes.INT)]
 
 
 class IP_ADAPTER_UNICAST_ADDRESS(ctypes.Structure):
@@ -150,7 +160,10 @@ class IPAdapterAddress:
     # Not implemented yet: there's a bunch of extra properties left in IP_ADAPTER_ADDRESSES
 
 
-iphlpapi = ctypes.windll.LoadLibrary('Iphlpapi')
+if sys.platform == 'win32':
+    iphlpapi: Any = ctypes.windll.LoadLibrary('Iphlpapi')
+else:
+    iphlpapi = None
 
 T = TypeVar('T', IP_ADAPTER_UNICAST_ADDRESS, IP_ADAPTER_FLAGS_ADDRESS)
 
@@ -164,30 +177,110 @@ def gather_linked_list(first: ctypes._Pointer) -> List[T]:
     return result
 
 
-def get_adapters(include_unconfigured: bool = False) -> Iterable[shared.Adapter]:
-    win32_adapters = get_win32_adapters()
-    converted = convert_win32_adapters(win32_adapters, include_unconfigured=include_unconfigured)
+def get_adapters(
+    include_unconfigured: bool = False,
+    *,
+    family: Optional[int] = None,
+    names: Optional[Iterable[str]] = None,
+    exclude_loopback: bool = False,
+    require_multicast: bool = False,
+    require_up: bool = False,
+) -> Iterable[shared.Adapter]:
+    profile = _profile.begin('get_adapters', 'win32')
+    win32_adapters = get_win32_adapters(AF_UNSPEC if family is None else family, profile)
+    adapter_filter = shared.AdapterFilter(
+        multicast_flag=IFF_MULTICAST,
+        family=family,
+        names=names,
+        exclude_loopback=exclude_loopback,
+        require_multicast=require_multicast,
+        require_up=require_up,
+    )
+    converted = convert_win32_adapters(
+        win32_adapters, include_unconfigured=include_unconfigured, adapter_filter=adapter_filter
+    )
+    if profile is not None:
+        profile.lap('convert')
+        _profile.finish(profile, converted)
     return converted
 
 
-def get_win32_adapters() -> List[IPAdapterAddress]:
+def get_adapter(name_or_index: Union[str, int]) -> Optional[shared.Adapter]:
+    if isinstance(name_or_index, bool):
+        return None
+    profile = _profile.begin('get_adapter', 'win32')
+    result = None
+    for adapter in get_win32_adapters(profile=profile):
+        if name_or_index in (adapter.adapter_name, adapter.if_index):
+            result = convert_win32_adapters([adapter], include_unconfigured=True)[0]
+            break
+    if profile is not None:
+        profile.lap('convert')
+        _profile.finish(profile, [] if result is None else [result])
+    return result
+
+
+def iter_addresses(
+    *,
+    family: Optional[int] = None,
+    names: Optional[Iterable[str]] = None,
+    exclude_loopback: bool = False,
+    require_multicast: bool = False,
+    require_up: bool = False,
+) -> Generator[shared.AddressRecord, None, None]:
+    # GetAdaptersAddresses() hands us everything at once, there is nothing to stream.
+    adapter_filter = shared.AdapterFilter(
+        multicast_flag=IFF_MULTICAST,
+        family=family,
+        names=names,
+        exclude_loopback=exclude_loopback,
+        require_multicast=require_multicast,
+        require_up=require_up,
+    )
+    for adapter in get_win32_adapters(AF_UNSPEC if family is None else family):
+        flags = adapter_flags(adapter)
+        if not (
+            adapter_filter.accepts_flags(flags)
+            and adapter_filter.accepts_name(adapter.adapter_name)
+        ):
+            continue
+        for a in adapter.unicast_addresses:
+            yield shared.AddressRecord(
+                adapter.adapter_name,
+                adapter.if_index,
+                flags,
+                shared.IP(a.address, a.on_link_prefix_length, adapter.friendly_name),
+            )
+
+
+def get_win32_adapters(
+    family: int = AF_UNSPEC, profile: Optional[_profile.CallProfile] = None
+) -> List[IPAdapterAddress]:
     # This function interacts with the OS. It does *not* interpret the results too much,
     # only decodes/deserializes them.
 
+    # Also aids with platform-specific type-checking
+    if sys.platform != 'win32':
+        raise OSError('GetAdaptersAddresses() is only available on Windows')
+
     # Call GetAdaptersAddresses() with error and buffer size handling
     addressbuffersize = wintypes.ULONG(15 * 1024)
     retval = ERROR_BUFFER_OVERFLOW
     while retval == ERROR_BUFFER_OVERFLOW:
         addressbuffer = ctypes.create_string_buffer(addressbuffersize.value)
         retval = iphlpapi.GetAdaptersAddresses(
-            wintypes.ULONG(AF_UNSPEC),
+            wintypes.ULONG(family),
             wintypes.ULONG(0),
             None,
             ctypes.byref(addressbuffer),
             ctypes.byref(addressbuffersize),
         )
+        if profile is not None:
+            profile.syscall('GetAdaptersAddresses')
     if retval != NO_ERROR:
         raise ctypes.WinError()
+    if profile is not None:
+        profile.lap('GetAdaptersAddresses')
 
     # Iterate through adapters fill array
     address_infos: List[IP_ADAPTER_ADDRESSES] = []
@@ -197,7 +290,7 @@ def get_win32_adapters() -> List[IPAdapterAddress]:
         if not address_info.Next:
             break
         address_info = address_info.Next.contents
-    return [
+    adapters = [
         IPAdapterAddress(
             a.IfIndex,
             # We don't expect non-ascii characters here, so encoding shouldn't matter
@@ -205,7 +298,7 @@ def get_win32_adapters() -> List[IPAdapterAddress]:
             [
                 IPAdapterUnicastAddress(
                     ua.Flags,
-                    shared.sockaddr_to_ip_strict(ua.Address.lpSockaddr),
+                    sockaddr_to_ip_strict(ua.Address.lpSockaddr),
                     ua.PrefixOrigin,
                     ua.SuffixOrigin,
                     ua.DadState,
@@ -219,21 +312,21 @@ def get_win32_adapters() -> List[IPAdapterAddress]:
             [
                 IPAdapterAddressWithFlags(
                     ua.Flags,
-                    shared.sockaddr_to_ip_strict(ua.Address.lpSockaddr),
+                    sockaddr_to_ip_strict(ua.Address.lpSockaddr),
                 )
                 for ua in gather_linked_list(a.FirstAnycastAddress)
             ],
             [
                 IPAdapterAddressWithFlags(
                     ua.Flags,
-                    shared.sockaddr_to_ip_strict(ua.Address.lpSockaddr),
+                    sockaddr_to_ip_strict(ua.Address.lpSockaddr),
                 )
                 for ua in gather_linked_list(a.FirstMulticastAddress)
             ],
             [
                 IPAdapterAddressWithFlags(
                     ua.Flags,
-                    shared.sockaddr_to_ip_strict(ua.Address.lpSockaddr),
+                    sockaddr_to_ip_strict(ua.Address.lpSockaddr),
                 )
                 for ua in gather_linked_list(a.FirstDnsServerAddress)
             ],
@@ -250,10 +343,27 @@ def get_win32_adapters() -> List[IPAdapterAddress]:
         )
         for a in address_infos
     ]
+    if profile is not None:
+        profile.lap('decode')
+    return adapters
+
+
+def adapter_flags(adapter: IPAdapterAddress) -> int:
+    flags = 0
+    if adapter.oper_status == IF_OPER_STATUS_UP:
+        flags |= shared.IFF_UP | shared.IFF_RUNNING
+    if adapter.if_type == IF_TYPE_SOFTWARE_LOOPBACK:
+        flags |= shared.IFF_LOOPBACK
+    if not adapter.flags & IP_ADAPTER_NO_MULTICAST:
+        flags |= IFF_MULTICAST
+    return flags
 
 
 def convert_win32_adapters(
-    adapters: List[IPAdapterAddress], *, include_unconfigured: bool
+    adapters: List[IPAdapterAddress],
+    *,
+    include_unconfigured: bool,
+    adapter_filter: Optional[shared.AdapterFilter] = None,
 ) -> List[shared.Adapter]:
     # This function *does not* interact with the OS. It converts raw data returned
     # from the OS to ifaddr adapters.
@@ -261,17 +371,40 @@ def convert_win32_adapters(
     # Iterate through unicast addresses
     result: List[shared.Adapter] = []
     for adapter in adapters:
+        flags = adapter_flags(adapter)
+        if adapter_filter is not None and not (
+            adapter_filter.accepts_flags(flags)
+            and adapter_filter.accepts_name(adapter.adapter_name)
+        ):
+            continue
         name = adapter.adapter_name
         nice_name = adapter.description
         index = adapter.if_index
-
-        if adapter.unicast_addresses:
-            ips = [
-                shared.IP(a.address, a.on_link_prefix_length, adapter.friendly_name)
-                for a in adapter.unicast_addresses
+        mac = shared.format_mac(adapter.physical_address)
+
+        unicast_addresses = adapter.unicast_addresses
+        if adapter_filter is not None and adapter_filter.family is not None:
+            unicast_addresses = [
+                a
+                for a in unicast_addresses
+                if isinstance(a.address, shared.IPv6Ext) == (adapter_filter.family == AF_INET6)
             ]
-            result.append(shared.Adapter(name, nice_name, ips, index=index))
-        elif include_unconfigured:
-            result.append(shared.Adapter(name, nice_name, [], index=index))
+        if not unicast_addresses and not include_unconfigured:
+            continue
+        ips = [
+            shared.IP(a.address, a.on_link_prefix_length, adapter.friendly_name)
+            for a in unicast_addresses
+        ]
+        result.append(
+            shared.Adapter(
+                name,
+                nice_name,
+                ips,
+                index=index,
+                multicast=flags & IFF_MULTICAST > 0,
+                flags=flags,
+                mac=mac,
+            )
+        )
 
     return result
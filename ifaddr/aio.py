@@ -0,0 +1,95 @@
+# asyncio support
+#
+# Enumerating the adapters is a blocking operation that can take a while on
+# hosts with many interfaces, these wrappers keep it off the event loop.
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import ifaddr
+from ifaddr._watch import Change, Watcher
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_in_flight: Dict[
+    Tuple[asyncio.AbstractEventLoop, Hashable], 'asyncio.Future[List[ifaddr.Adapter]]'
+] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ifaddr')
+        return _executor
+
+
+def _enumerate(include_unconfigured: bool, filters: Dict[str, Any]) -> List[ifaddr.Adapter]:
+    return list(ifaddr.get_adapters(include_unconfigured, **filters))
+
+
+def _finished(
+    key: Tuple[asyncio.AbstractEventLoop, Hashable], future: 'asyncio.Future[List[ifaddr.Adapter]]'
+) -> None:
+    _in_flight.pop(key, None)
+    # The callers await the future through asyncio.shield(). If they have all
+    # been cancelled, nobody retrieves an exception and asyncio would report it
+    # as never retrieved.
+    if not future.cancelled():
+        future.exception()
+
+
+async def get_adapters(
+    include_unconfigured: bool = False,
+    *,
+    family: Optional[int] = None,
+    names: Optional[Iterable[str]] = None,
+    exclude_loopback: bool = False,
+    require_multicast: bool = False,
+    require_up: bool = False,
+) -> List[ifaddr.Adapter]:
+    """
+    Same as :func:`ifaddr.get_adapters`, but the enumeration runs in a shared
+    worker thread. Concurrent calls with the same arguments share a single
+    enumeration.
+    """
+    filters: Dict[str, Any] = dict(
+        family=family,
+        names=None if names is None else tuple(names),
+        exclude_loopback=exclude_loopback,
+        require_multicast=require_multicast,
+        require_up=require_up,
+    )
+    loop = asyncio.get_running_loop()
+    key = (loop, (include_unconfigured, tuple(filters.items())))
+    future = _in_flight.get(key)
+    if future is None:
+        future = _in_flight[key] = loop.run_in_executor(
+            _get_executor(), functools.partial(_enumerate, include_unconfigured, filters)
+        )
+        future.add_done_callback(functools.partial(_finished, key))
+    # Shielded so that a cancelled caller doesn't cancel the call for everybody else.
+    adapters = await asyncio.shield(future)
+    return list(adapters)
+
+
+async def watch(include_unconfigured: bool = False, interval: float = 1.0) -> AsyncIterator[Change]:
+    """
+    Yields adapter and IP changes as they happen, see :func:`ifaddr.watch`.
+
+    .. code-block:: python
+
+        async for change in ifaddr.aio.watch():
+            print(change)
+    """
+    loop = asyncio.get_running_loop()
+    # Creating the watcher takes the initial snapshot, which blocks as well.
+    watcher = await loop.run_in_executor(_get_executor(), Watcher, include_unconfigured, interval)
+    try:
+        async for change in watcher:
+            yield change
+    finally:
+        watcher.close()
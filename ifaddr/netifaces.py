@@ -1,10 +1,98 @@
 # netifaces compatibility layer
 
 import ifaddr
+import ifaddr._shared as shared
 
-from typing import List
+import socket
+import sys
+from typing import Dict, List, Tuple, Union
+
+# Same values as in netifaces
+AF_INET = int(socket.AF_INET)
+AF_INET6 = int(socket.AF_INET6)
+if sys.platform == 'win32':
+    AF_LINK = -1000
+else:
+    AF_LINK = int(getattr(socket, 'AF_LINK', None) or getattr(socket, 'AF_PACKET'))
+
+_BROADCAST_MAC = 'ff:ff:ff:ff:ff:ff'
 
 
 def interfaces() -> List[str]:
     adapters = ifaddr.get_adapters(include_unconfigured=True)
     return [a.name for a in adapters]
+
+
+def _netmask(ip: ifaddr.IP) -> str:
+    bits = len(ip.packed) * 8
+    prefix = min(ip.network_prefix, bits)
+    mask = (((1 << prefix) - 1) << (bits - prefix)).to_bytes(bits // 8, 'big')
+    if ip.is_IPv4:
+        return socket.inet_ntoa(mask)
+    return f'{socket.inet_ntop(socket.AF_INET6, mask)}/{prefix}'
+
+
+def ifaddresses(name: str) -> Dict[int, List[Dict[str, str]]]:
+    """
+    Returns the addresses of the interface `name` by address family, in the
+    format of `netifaces.ifaddresses()`. Raises :class:`ValueError` if there
+    is no such interface.
+    """
+    adapter = ifaddr.get_adapter(name)
+    if adapter is None:
+        raise ValueError('You must specify a valid interface name.')
+    result: Dict[int, List[Dict[str, str]]] = {}
+    # IPv4 aliases (eth0:1) have no link-layer entry of their own. Linux
+    # doesn't allow colons in interface names, so they are easy to tell apart.
+    if adapter.mac is not None and ':' not in name:
+        link = {'addr': adapter.mac}
+        if adapter.flags & shared.IFF_BROADCAST:
+            link['broadcast'] = _BROADCAST_MAC
+        elif adapter.flags & (shared.IFF_POINTOPOINT | shared.IFF_LOOPBACK):
+            link['peer'] = adapter.mac
+        result[AF_LINK] = [link]
+    for ip in adapter.ips:
+        entry: Dict[str, str]
+        if isinstance(ip.ip, str):
+            entry = {'addr': ip.ip, 'netmask': _netmask(ip)}
+            if ip.broadcast is not None:
+                entry['broadcast'] = ip.broadcast
+            elif ip.peer is not None:
+                entry['peer'] = ip.peer
+            elif adapter.is_loopback:
+                # getifaddrs() reports the address itself as the destination.
+                entry['peer'] = entry['addr']
+            result.setdefault(AF_INET, []).append(entry)
+        else:
+            address, _, scope_id = ip.ip
+            if scope_id:
+                address = f'{address}%{adapter.name}'
+            entry = {'addr': address, 'netmask': _netmask(ip)}
+            if ip.peer is not None:
+                entry['peer'] = ip.peer
+            result.setdefault(AF_INET6, []).append(entry)
+    return result
+
+
+def gateways() -> Dict[Union[str, int], object]:
+    """
+    Returns the default gateways in the format of `netifaces.gateways()`: the
+    preferred (lowest metric) default gateway per address family under
+    `'default'`, and a list of `(address, interface, is_preferred)` per
+    address family. Only implemented on Linux, elsewhere the result is
+    always `{'default': {}}`, as if there were no gateways.
+    """
+    defaults: Dict[int, Tuple[str, str]] = {}
+    result: Dict[Union[str, int], object] = {'default': defaults}
+    if not sys.platform.startswith('linux'):
+        return result
+    import ifaddr._netlink
+
+    for gateway in ifaddr._netlink.get_gateways():
+        family = int(gateway.family)
+        entries = result.setdefault(family, [])
+        assert isinstance(entries, list)
+        entries.append((gateway.address, gateway.interface, gateway.default))
+        if gateway.default:
+            defaults[family] = (gateway.address, gateway.interface)
+    return result
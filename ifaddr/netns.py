@@ -0,0 +1,160 @@
+# Network namespaces (Linux only)
+#
+# A netlink socket belongs to the network namespace it was created in, no
+# matter which namespace the thread that uses it is in later. The workers
+# therefore only switch to the target namespace to open the socket and
+# switch back right away, the dumps run in the original namespace.
+
+import contextlib
+import errno
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import ifaddr
+import ifaddr._shared as shared
+
+CLONE_NEWNET = 0x40000000
+
+
+class NamespaceResult(NamedTuple):
+    """
+    The outcome of enumerating one namespace, see :func:`get_adapters`.
+    """
+
+    #: The namespace path as given.
+    path: str
+    #: The adapters, `None` if the enumeration failed.
+    adapters: Optional[List[ifaddr.Adapter]]
+    #: Why the enumeration failed, `None` if it succeeded.
+    error: Optional[OSError]
+
+
+def _setns(fd: int) -> None:
+    if hasattr(os, 'setns'):
+        os.setns(fd, CLONE_NEWNET)
+        return
+    # Python < 3.12
+    import ctypes
+
+    # Only reached on Linux, see get_adapters_in(). Also aids with
+    # platform-specific type-checking.
+    if sys.platform == 'win32':
+        raise OSError('setns() is only available on Linux')
+
+    import ifaddr._posix as posix
+
+    if posix.get_libc().setns(fd, CLONE_NEWNET) != 0:
+        eno = ctypes.get_errno()
+        raise OSError(eno, os.strerror(eno))
+
+
+@contextlib.contextmanager
+def _entered(path: str) -> Iterator[None]:
+    """Moves the calling thread into the network namespace `path` and back."""
+    home = os.open(f'/proc/self/task/{threading.get_native_id()}/ns/net', os.O_RDONLY)
+    try:
+        target = os.open(path, os.O_RDONLY)
+        try:
+            _setns(target)
+        finally:
+            os.close(target)
+        try:
+            yield
+        finally:
+            try:
+                _setns(home)
+            except OSError as e:
+                # Not an OSError, so it isn't mistaken for a problem with
+                # this namespace: the thread is now in the wrong one.
+                raise RuntimeError(f'Could not return from network namespace {path}') from e
+    finally:
+        os.close(home)
+
+
+def get_adapters_in(
+    path: str,
+    include_unconfigured: bool = False,
+    *,
+    family: Optional[int] = None,
+    names: Optional[Iterable[str]] = None,
+    exclude_loopback: bool = False,
+    require_multicast: bool = False,
+    require_up: bool = False,
+) -> List[ifaddr.Adapter]:
+    """
+    Same as :func:`ifaddr.get_adapters`, but for the adapters of the network
+    namespace `path`, like `/run/netns/blue` or `/proc/1234/ns/net`. Raises
+    :class:`OSError` if the namespace can't be entered (entering one needs
+    `CAP_SYS_ADMIN`) or enumerated. Network namespaces only exist on Linux,
+    elsewhere it always raises :class:`OSError`.
+
+    Interface indexes (and the scope ids of IPv6 link-local addresses) are
+    the ones of that namespace.
+    """
+    if not sys.platform.startswith('linux'):
+        raise OSError(errno.ENOSYS, 'Network namespaces only exist on Linux', path)
+    import ifaddr._netlink as netlink
+
+    adapter_filter = shared.AdapterFilter(
+        multicast_flag=netlink.IFF_MULTICAST,
+        family=family,
+        names=names,
+        exclude_loopback=exclude_loopback,
+        require_multicast=require_multicast,
+        require_up=require_up,
+    )
+    with _entered(path):
+        sock = netlink.open_socket()
+    with sock:
+        links = netlink.dump_links(sock, adapter_filter)
+        addresses = list(netlink.dump_addresses(sock, family, links))
+    return list(netlink.convert(links, addresses, include_unconfigured, adapter_filter))
+
+
+def get_adapters(
+    paths: Iterable[str],
+    include_unconfigured: bool = False,
+    *,
+    max_workers: int = 16,
+    family: Optional[int] = None,
+    names: Optional[Iterable[str]] = None,
+    exclude_loopback: bool = False,
+    require_multicast: bool = False,
+    require_up: bool = False,
+) -> Dict[str, NamespaceResult]:
+    """
+    Enumerates the adapters of the network namespaces `paths` concurrently,
+    in up to `max_workers` threads, see :func:`get_adapters_in`. Returns a
+    :class:`NamespaceResult` per path, in the order of `paths`. A namespace
+    that can't be enumerated gets a result with the error instead of failing
+    the whole batch, off Linux that is every one of them.
+    """
+    unique = list(dict.fromkeys(paths))
+    if names is not None:
+        names = list(names)
+
+    def enumerate_one(path: str) -> NamespaceResult:
+        try:
+            adapters = get_adapters_in(
+                path,
+                include_unconfigured,
+                family=family,
+                names=names,
+                exclude_loopback=exclude_loopback,
+                require_multicast=require_multicast,
+                require_up=require_up,
+            )
+        except OSError as e:
+            return NamespaceResult(path, None, e)
+        return NamespaceResult(path, adapters, None)
+
+    if not unique:
+        return {}
+    # The threads are not reused after the batch, so a thread that failed to
+    # leave a namespace can't do any harm later.
+    workers = max(1, min(max_workers, len(unique)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ifaddr-netns') as executor:
+        return {result.path: result for result in executor.map(enumerate_one, unique)}
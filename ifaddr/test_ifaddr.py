@@ -1,13 +1,25 @@
 # Copyright (C) 2015 Stefan C. Mueller
 
+import asyncio
+import gc
 import ipaddress
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
 import unittest
+from typing import Any, List, Union
 
 import pytest
 
 import ifaddr
+import ifaddr.aio
 import ifaddr.netifaces
-from ifaddr._shared import ipv6_prefixlength
+from ifaddr._shared import IFF_RUNNING, IFF_UP, IPv4Ext, ipv6_prefixlength, netmask_to_prefixlen
 
 try:
     import netifaces
@@ -21,9 +33,8 @@ class TestIfaddr(unittest.TestCase):
     """
     Unittests for :mod:`ifaddr`.
 
-    There isn't much unit-testing that can be done without making assumptions
-    on the system or mocking of operating system APIs. So this just contains
-    a sanity check for the moment.
+    These run against the actual system, so they only check what every system
+    has. Tests that need a particular interface table use ``ifaddr._fake``.
     """
 
     def test_get_adapters_contains_localhost(self) -> None:
@@ -41,11 +52,48 @@ class TestIfaddr(unittest.TestCase):
 def test_netifaces_compatibility() -> None:
     interfaces = ifaddr.netifaces.interfaces()
     assert interfaces == netifaces.interfaces()
-    # TODO: implement those as well
-    # for interface in interfaces:
-    #     print(interface)
-    #     assert ifaddr.netifaces.ifaddresses(interface) == netifaces.ifaddresses(interface)
-    # assert ifaddr.netifaces.gateways() == netifaces.gateways()
+    for interface in interfaces:
+        assert ifaddr.netifaces.ifaddresses(interface) == netifaces.ifaddresses(interface)
+    if sys.platform.startswith('linux'):
+        assert ifaddr.netifaces.gateways() == netifaces.gateways()
+
+
+def test_netifaces_ifaddresses() -> None:
+    (loopback,) = [a for a in ifaddr.get_adapters() if '127.0.0.1' in [ip.ip for ip in a.ips]]
+    entry = ifaddr.netifaces.ifaddresses(loopback.name)[ifaddr.netifaces.AF_INET][0]
+    assert (entry['addr'], entry['netmask']) == ('127.0.0.1', '255.0.0.0')
+    with pytest.raises(ValueError):
+        ifaddr.netifaces.ifaddresses('no-such-interface0')
+
+
+def test_netifaces_gateways_from_proc(tmp_path: Any, monkeypatch: pytest.MonkeyPatch) -> None:
+    if not sys.platform.startswith('linux'):
+        pytest.skip('Linux only')
+    import ifaddr._netlink
+
+    (tmp_path / 'route').write_text(
+        'Iface\tDestination\tGateway \tFlags\tRefCnt\tUse\tMetric\tMask\t\tMTU\tWindow\tIRTT\n'
+        'eth1\t00000000\t0101A8C0\t0003\t0\t0\t600\t00000000\t0\t0\t0\n'
+        'eth0\t00000000\t0100000A\t0003\t0\t0\t100\t00000000\t0\t0\t0\n'
+        'eth0\t0000000A\t00000000\t0001\t0\t0\t100\t00FFFFFF\t0\t0\t0\n'
+        'eth0\t000010AC\tFE00000A\t0003\t0\t0\t0\t0000FFFF\t0\t0\t0\n'
+    )
+    (tmp_path / 'ipv6_route').write_text(
+        '00000000000000000000000000000000 00 00000000000000000000000000000000 00 '
+        'fe800000000000000000000000000001 00000400 00000001 00000000 00450003     eth0\n'
+        'fd000000000000000000000000000000 40 00000000000000000000000000000000 00 '
+        '00000000000000000000000000000000 00000100 00000001 00000000 00000001     eth0\n'
+    )
+    gateways = ifaddr._netlink._proc_gateways(str(tmp_path))
+    monkeypatch.setattr(ifaddr._netlink, 'get_gateways', lambda: gateways)
+    assert ifaddr.netifaces.gateways() == {
+        'default': {socket.AF_INET: ('10.0.0.1', 'eth0'), socket.AF_INET6: ('fe80::1', 'eth0')},
+        socket.AF_INET: [('192.168.1.1', 'eth1', False), ('10.0.0.1', 'eth0', True)],
+        socket.AF_INET6: [('fe80::1', 'eth0', True)],
+    }
+
+    monkeypatch.setattr(sys, 'platform', 'darwin')
+    assert ifaddr.netifaces.gateways() == {'default': {}}
 
 
 def test_ipv6_prefixlength() -> None:
@@ -53,3 +101,865 @@ def test_ipv6_prefixlength() -> None:
         ipv6_prefixlength(ipaddress.IPv6Address('ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff')) == 128
     )
     assert ipv6_prefixlength(ipaddress.IPv6Address('ffff:ffff:ffff:ffff::')) == 64
+
+
+@pytest.mark.parametrize('include_unconfigured', [False, True])
+def test_netlink_matches_getifaddrs(include_unconfigured: bool) -> None:
+    # Skipping here rather than with a marker lets type checkers for the other
+    # platforms skip the rest of the test as well.
+    if not sys.platform.startswith('linux'):
+        pytest.skip('Linux only')
+    import ifaddr._netlink
+    import ifaddr._posix
+
+    expected = ifaddr._posix.get_adapters(include_unconfigured=include_unconfigured)
+    actual = ifaddr._netlink.get_adapters(include_unconfigured=include_unconfigured)
+    assert repr(list(actual)) == repr(list(expected))
+    # Also covers the attributes that aren't part of the representation.
+    assert list(actual) == list(expected)
+
+
+def make_adapter(name: str, *ips: str, index: int = 1, prefix: int = 24) -> ifaddr.Adapter:
+    return ifaddr.Adapter(
+        name,
+        name,
+        [ifaddr.IP(IPv4Ext(ipaddress.IPv4Address(ip).packed), prefix, name) for ip in ips],
+        index=index,
+    )
+
+
+def test_watcher_reports_changes() -> None:
+    snapshots = [
+        [make_adapter('eth0', '10.0.0.1')],
+        [make_adapter('eth0', '10.0.0.1', '10.0.0.2'), make_adapter('eth1', '10.1.0.1', index=2)],
+        [make_adapter('eth0', '10.0.0.2', prefix=16)],
+    ]
+    watcher = ifaddr.Watcher(interval=0, get_adapters=lambda _: snapshots.pop(0))
+
+    changes = watcher.poll()
+    assert [(type(c).__name__, c.type, c.adapter.name) for c in changes] == [
+        ('AdapterChange', ifaddr.ChangeType.ADDED, 'eth1'),
+        ('IPChange', ifaddr.ChangeType.ADDED, 'eth0'),
+        ('IPChange', ifaddr.ChangeType.ADDED, 'eth1'),
+    ]
+
+    changes = watcher.poll()
+    assert [(type(c).__name__, c.type, c.adapter.name) for c in changes] == [
+        ('IPChange', ifaddr.ChangeType.REMOVED, 'eth1'),
+        ('IPChange', ifaddr.ChangeType.REMOVED, 'eth0'),
+        ('IPChange', ifaddr.ChangeType.REMOVED, 'eth0'),
+        ('AdapterChange', ifaddr.ChangeType.REMOVED, 'eth1'),
+        ('IPChange', ifaddr.ChangeType.ADDED, 'eth0'),
+    ]
+    assert watcher.adapters[0].ips[0].network_prefix == 16
+
+
+def test_adapter_cache() -> None:
+    calls: List[bool] = []
+
+    def get_adapters(include_unconfigured: bool) -> List[ifaddr.Adapter]:
+        calls.append(include_unconfigured)
+        return [make_adapter('eth0', '10.0.0.1')]
+
+    cache = ifaddr.AdapterCache(ttl=None, get_adapters=get_adapters)
+    assert cache.get_adapters()[0].name == 'eth0'
+    assert cache.get_adapters()[0].name == 'eth0'
+    cache.get_adapters(include_unconfigured=True)
+    assert calls == [False, True]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    cache.invalidate()
+    cache.get_adapters()
+    assert calls == [False, True, False]
+
+    cache.ttl = 0
+    cache.get_adapters()
+    assert len(calls) == 4
+
+
+def test_adapter_cache_single_flight() -> None:
+    calls: List[bool] = []
+
+    def slow_get_adapters(include_unconfigured: bool) -> List[ifaddr.Adapter]:
+        calls.append(include_unconfigured)
+        time.sleep(0.1)
+        return []
+
+    cache = ifaddr.AdapterCache(ttl=60, get_adapters=slow_get_adapters)
+    threads = [threading.Thread(target=cache.get_adapters) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [False]
+    assert (cache.hits, cache.misses) == (7, 1)
+
+
+def test_concurrent_enumeration(monkeypatch: pytest.MonkeyPatch) -> None:
+    expected = list(ifaddr.get_adapters(include_unconfigured=True))
+    functions = [
+        lambda: list(ifaddr.get_adapters(include_unconfigured=True)) == expected,
+        lambda: ifaddr.get_adapter(expected[0].name) == expected[0],
+        lambda: len(list(ifaddr.iter_addresses())) == sum(len(a.ips) for a in expected),
+    ]
+    if sys.platform != 'win32':
+        import ifaddr._posix as posix
+
+        # Every thread races to load the C library.
+        monkeypatch.setattr(posix, '_libc', None)
+        functions.append(lambda: list(posix.get_adapters(include_unconfigured=True)) == expected)
+
+    barrier = threading.Barrier(8)
+    failures: List[Any] = []
+
+    def worker(seed: int) -> None:
+        barrier.wait()
+        try:
+            for i in range(25):
+                function = functions[(seed + i) % len(functions)]
+                if not function():
+                    failures.append((seed, i))
+        except Exception as e:
+            failures.append(e)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+
+    # No invalidation gets lost, even without the GIL.
+    cache = ifaddr.AdapterCache(ttl=None, get_adapters=lambda _: expected)
+
+    def invalidate() -> None:
+        for _ in range(1000):
+            cache.invalidate()
+
+    threads = [threading.Thread(target=invalidate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache._generation == 8000
+
+
+def test_snapshot_publisher(tmp_path: Any) -> None:
+    if sys.platform == 'win32':
+        pytest.skip('needs fork()')
+    path = str(tmp_path / 'adapters')
+    current = [make_adapter('eth0', '10.0.0.1')]
+    publisher = ifaddr.SnapshotPublisher(path, interval=0.01, get_adapters=lambda _: current)
+    reader = ifaddr.SnapshotReader(path)
+    with pytest.raises(FileNotFoundError):
+        reader.get_adapters()
+
+    assert publisher.publish() == 1
+    assert os.stat(path).st_mode & 0o777 == 0o644
+    assert reader.changed() and reader.version is None
+    assert reader.get_adapters() == current
+    assert not reader.changed() and reader.version == 1
+    assert reader.snapshot() is reader.snapshot()
+
+    # A forked worker reads what the parent publishes later, the publisher
+    # it inherited is inert.
+    read, write = os.pipe()
+    go_read, go_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.read(go_read, 1)
+            publisher.close(remove=True)
+            adapters = reader.get_adapters()
+            os.write(write, f'{reader.version} {adapters[0].ips[0].ip}'.encode())
+        finally:
+            os._exit(0)
+    os.close(write)
+    publisher.start()
+    current = [make_adapter('eth0', '10.0.0.2')]
+    deadline = time.monotonic() + 5
+    while publisher.version < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    os.write(go_write, b'x')
+    assert os.read(read, 100) == b'3 10.0.0.2'
+    os.waitpid(pid, 0)
+    publisher.close()
+    assert os.listdir(tmp_path) == ['adapters']
+
+    # Versions continue from the published file.
+    with ifaddr.SnapshotPublisher(path, get_adapters=lambda _: current) as successor:
+        assert successor.publish() == 4
+    open(path, 'wb').close()
+    with pytest.raises(ValueError):
+        reader.snapshot()
+
+
+def test_snapshot_publisher_survives_errors(
+    tmp_path: Any, caplog: pytest.LogCaptureFixture
+) -> None:
+    path = str(tmp_path / 'adapters')
+    calls = 0
+
+    def get_adapters(_: bool) -> List[ifaddr.Adapter]:
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError('broken')
+        return [make_adapter('eth0', '10.0.0.1' if calls == 1 else '10.0.0.2')]
+
+    with ifaddr.SnapshotPublisher(path, interval=0.01, get_adapters=get_adapters) as publisher:
+        publisher.start()
+        deadline = time.monotonic() + 5
+        while publisher.version < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert ifaddr.SnapshotReader(path).get_adapters()[0].ips[0].ip == '10.0.0.2'
+    assert 'broken' in caplog.text
+
+
+def test_snapshot_diff() -> None:
+    old = ifaddr.Snapshot(
+        [
+            make_adapter('eth0', '10.0.0.1', '10.0.0.2'),
+            make_adapter('eth1', '10.1.0.1', index=2),
+            make_adapter('eth2', index=3),
+        ]
+    )
+    new = ifaddr.Snapshot(
+        [
+            make_adapter('eth0', '10.0.0.1', '10.0.0.3'),
+            make_adapter('eth1', '10.1.0.1', index=4),
+            make_adapter('eth2', index=3),
+        ]
+    )
+    new.adapters[2].multicast = False
+
+    diff = old.diff(new)
+    assert [a.index for a in diff.removed_adapters] == [2]
+    assert [a.index for a in diff.added_adapters] == [4]
+    assert [a.name for a in diff.changed_adapters] == ['eth2']
+    assert [(a.name, ip.ip) for a, ip in diff.removed_ips] == [
+        ('eth1', '10.1.0.1'),
+        ('eth0', '10.0.0.2'),
+    ]
+    assert [(a.name, ip.ip) for a, ip in diff.added_ips] == [
+        ('eth0', '10.0.0.3'),
+        ('eth1', '10.1.0.1'),
+    ]
+    assert not diff.changed_ips
+    assert not new.diff(new)
+
+    # Matching IPs doesn't format them.
+    before = ifaddr.Snapshot([make_adapter('eth0', '10.0.0.1', '10.0.0.2')])
+    after = ifaddr.Snapshot([make_adapter('eth0', '10.0.0.2', '10.0.0.3')])
+    assert len(before.diff(after).added_ips) == 1
+    assert all(ip._ip is None for snapshot in (before, after) for ip in snapshot.adapters[0].ips)
+
+    # So does a new broadcast or peer address.
+    packed = b'\x0a\x00\x00\x01'
+    ips = [
+        ifaddr.IP.from_packed(packed, 24, 'eth0', broadcast=b'\x0a\x00\x00\xff'),
+        ifaddr.IP.from_packed(packed, 24, 'eth0', broadcast=b'\x0a\x00\x00\xfe'),
+        ifaddr.IP.from_packed(packed, 24, 'eth0', peer=b'\x0a\x00\x00\x02'),
+    ]
+    snapshots = [ifaddr.Snapshot([ifaddr.Adapter('eth0', 'eth0', [ip], index=1)]) for ip in ips]
+    for old, new in zip(snapshots, snapshots[1:]):
+        diff = old.diff(new)
+        assert [ip for _, ip in diff.changed_ips] == new.adapters[0].ips
+        assert not diff.added_ips and not diff.removed_ips
+
+    # A link going down and a new MAC address change the adapter.
+    up = make_adapter('eth0', '10.0.0.1')
+    up.flags = IFF_UP | IFF_RUNNING
+    up.mac = '02:00:00:00:00:01'
+    down = make_adapter('eth0', '10.0.0.1')
+    down.flags = 0
+    down.mac = up.mac
+    moved = make_adapter('eth0', '10.0.0.1')
+    moved.flags = up.flags
+    moved.mac = '02:00:00:00:00:02'
+    assert ifaddr.Snapshot([up]).diff(ifaddr.Snapshot([down])).changed_adapters == [down]
+    assert ifaddr.Snapshot([up]).diff(ifaddr.Snapshot([moved])).changed_adapters == [moved]
+
+
+def test_adapter_and_ip_value_semantics() -> None:
+    first = make_adapter('eth0', '10.0.0.1', '10.0.0.2')
+    second = make_adapter('eth0', '10.0.0.1', '10.0.0.2')
+    assert first == second
+    assert first != make_adapter('eth0', '10.0.0.1')
+    with pytest.raises(TypeError):
+        hash(first)
+    assert {ip for ip in first.ips} == set(second.ips)
+    assert first.ips[0] != first.ips[1]
+    assert not hasattr(first, '__dict__')
+    assert not hasattr(first.ips[0], '__dict__')
+    with pytest.raises(AttributeError):
+        first.ips[0].network_prefix = 16  # type: ignore[misc]
+    with pytest.raises(AttributeError):
+        first.ips[0].nice_name = 'eth1'  # type: ignore[misc]
+    assert first.ips[0] == second.ips[0] and first.ips[0] in set(second.ips)
+
+
+def test_ip_from_packed() -> None:
+    ipv4 = ifaddr.IP.from_packed(bytes([192, 168, 0, 51]), 24, 'eth0')
+    assert ipv4.is_IPv4 and not ipv4.is_IPv6
+    assert ipv4.ip == '192.168.0.51'
+    assert ipv4.network == ipaddress.IPv4Network('192.168.0.0/24')
+    assert ipv4 == ifaddr.IP(IPv4Ext(bytes([192, 168, 0, 51])), 24, 'eth0')
+
+    packed = ipaddress.IPv6Address('fe80::1').packed
+    ipv6 = ifaddr.IP.from_packed(packed, 64, 'eth0', scope_id=2)
+    assert ipv6.is_IPv6 and not ipv6.is_IPv4
+    assert ipv6.ip == ('fe80::1', 0, 2)
+    assert (ipv6.flowinfo, ipv6.scope_id) == (0, 2)
+    assert ipv6.packed == packed
+    assert ipv6.address == ipaddress.IPv6Address('fe80::1')
+    assert ipv6.network == ipaddress.IPv6Network('fe80::/64')
+
+    with pytest.raises(ValueError):
+        ifaddr.IP.from_packed(b'\x00', 8, 'eth0')
+
+
+@pytest.mark.parametrize(
+    'network_class, bits', [(ipaddress.IPv4Network, 32), (ipaddress.IPv6Network, 128)]
+)
+def test_netmask_to_prefixlen(network_class: type, bits: int) -> None:
+    for prefixlen in range(bits + 1):
+        netmask = network_class((0, prefixlen)).netmask
+        assert netmask_to_prefixlen(netmask.packed) == prefixlen
+        if network_class is ipaddress.IPv4Network:
+            assert ipaddress.IPv4Network(f'0.0.0.0/{netmask}').prefixlen == prefixlen
+        else:
+            assert ipv6_prefixlength(netmask) == prefixlen
+
+
+@pytest.mark.parametrize('size', [4, 16])
+def test_netmask_to_prefixlen_random_masks(size: int) -> None:
+    rng = random.Random(size)
+    for _ in range(2000):
+        # Mostly contiguous masks with a random bit flipped now and then.
+        prefixlen = rng.randint(0, size * 8)
+        value = ((1 << prefixlen) - 1) << (size * 8 - prefixlen)
+        if rng.random() < 0.5:
+            value ^= 1 << rng.randrange(size * 8)
+        packed = value.to_bytes(size, 'big')
+        bits = format(value, f'0{size * 8}b')
+        if '01' in bits:
+            with pytest.raises(ValueError):
+                netmask_to_prefixlen(packed)
+        else:
+            assert netmask_to_prefixlen(packed) == bits.count('1')
+
+
+def backends() -> List[object]:
+    # Runs during collection, where the skipif markers don't apply yet.
+    if sys.platform == 'win32':
+        return []
+    import ifaddr._posix
+
+    result: List[object] = [ifaddr._posix]
+    if sys.platform.startswith('linux'):
+        import ifaddr._netlink
+
+        result.append(ifaddr._netlink)
+    return result
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='POSIX only')
+@pytest.mark.parametrize('backend', backends())
+def test_get_adapters_filters(backend: Any) -> None:
+    everything = list(backend.get_adapters(include_unconfigured=True))
+
+    ipv4 = list(backend.get_adapters(family=socket.AF_INET))
+    assert ipv4 and all(ip.is_IPv4 for adapter in ipv4 for ip in adapter.ips)
+
+    no_loopback = list(backend.get_adapters(include_unconfigured=True, exclude_loopback=True))
+    assert '127.0.0.1' not in [ip.ip for adapter in no_loopback for ip in adapter.ips]
+    assert len(no_loopback) == len(everything) - 1
+
+    first = everything[0].name
+    named = list(backend.get_adapters(include_unconfigured=True, names=[first]))
+    assert [adapter.name for adapter in named] == [first]
+    pattern = first[:1] + '*'
+    patterned = list(backend.get_adapters(include_unconfigured=True, names=[pattern]))
+    assert [a.name for a in patterned] == [a.name for a in everything if a.name[:1] == first[:1]]
+
+    multicast = list(backend.get_adapters(include_unconfigured=True, require_multicast=True))
+    assert multicast == [adapter for adapter in everything if adapter.multicast]
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='POSIX only')
+@pytest.mark.parametrize('backend', backends())
+def test_iter_addresses(backend: Any) -> None:
+    expected = [
+        (adapter.name, adapter.index, ip)
+        for adapter in backend.get_adapters()
+        for ip in adapter.ips
+    ]
+    records = list(backend.iter_addresses())
+    # Records come in the operating system's order, not grouped by adapter.
+    assert sorted([(r.adapter_name, r.adapter_index, r.ip) for r in records], key=repr) == sorted(
+        expected, key=repr
+    )
+    assert all(isinstance(r.flags, int) for r in records)
+
+    # Stopping early must release the OS resources, which we can't observe directly,
+    # but it must not break subsequent calls either.
+    addresses = backend.iter_addresses()
+    assert next(addresses) == records[0]
+    addresses.close()
+    assert [r.ip for r in backend.iter_addresses(family=socket.AF_INET)] == [
+        r.ip for r in records if r.ip.is_IPv4
+    ]
+
+
+@pytest.mark.parametrize('backend', backends())
+def test_link_layer_details(backend: Any) -> None:
+    if not sys.platform.startswith('linux'):
+        pytest.skip('Linux only')
+    import ifaddr._posix
+
+    adapters = {a.name: a for a in backend.get_adapters(include_unconfigured=True)}
+    loopback = adapters['lo']
+    assert loopback.is_loopback and loopback.is_up
+    assert loopback.mac == '00:00:00:00:00:00'
+    assert loopback.stats is not None and loopback.stats.rx_packets >= 0
+    assert all(ip.broadcast is None and ip.peer is None for ip in loopback.ips)
+    for adapter in adapters.values():
+        assert adapter.multicast == bool(adapter.flags & ifaddr._posix.IFF_MULTICAST)
+
+
+def test_aio_get_adapters_coalesces(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: List[bool] = []
+
+    def slow_get_adapters(include_unconfigured: bool, **filters: Any) -> List[ifaddr.Adapter]:
+        calls.append(include_unconfigured)
+        time.sleep(0.1)
+        return [make_adapter('eth0', '10.0.0.1')]
+
+    monkeypatch.setattr(ifaddr, 'get_adapters', slow_get_adapters)
+
+    async def main() -> None:
+        results = await asyncio.gather(*(ifaddr.aio.get_adapters() for _ in range(5)))
+        assert all(result == results[0] for result in results)
+        assert results[0] is not results[1]
+        await ifaddr.aio.get_adapters(include_unconfigured=True)
+
+    asyncio.run(main())
+    assert calls == [False, True]
+
+
+def test_aio_executor(monkeypatch: pytest.MonkeyPatch) -> None:
+    unhandled: List[Any] = []
+
+    def failing_get_adapters(include_unconfigured: bool, **filters: Any) -> List[ifaddr.Adapter]:
+        time.sleep(0.05)
+        raise OSError('broken')
+
+    monkeypatch.setattr(ifaddr, 'get_adapters', failing_get_adapters)
+
+    async def cancelled() -> None:
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda _, context: unhandled.append(context))
+        task = asyncio.ensure_future(ifaddr.aio.get_adapters())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.sleep(0.1)
+        gc.collect()
+
+    asyncio.run(cancelled())
+    assert unhandled == []
+
+    # Watchers refresh on the same threads.
+    threads: List[str] = []
+
+    def get_adapters(_: bool) -> List[ifaddr.Adapter]:
+        threads.append(threading.current_thread().name)
+        return [make_adapter('eth0', f'10.0.0.{len(threads)}')]
+
+    async def watch() -> None:
+        async for _ in ifaddr.Watcher(interval=0, get_adapters=get_adapters):
+            break
+
+    asyncio.run(watch())
+    assert threads[0] == threading.current_thread().name
+    assert threads[1].startswith('ifaddr')
+
+
+def test_fake_libc() -> None:
+    if sys.platform == 'win32':
+        pytest.skip('POSIX only')
+    import ifaddr._fake as fake
+    import ifaddr._posix as posix
+    from ifaddr._shared import IFF_POINTOPOINT, IFF_UP, AdapterFilter, AdapterStats, IPv6Ext
+
+    stats = AdapterStats(*range(10))
+    libc = fake.FakeLibc(
+        [
+            fake.link_entry('eth0', 2, b'\x02\x00\x00\x00\x00\x01', stats=stats),
+            fake.entry(
+                'eth0', IPv4Ext(b'\x0a\x00\x00\x01'), 24, broadcast=IPv4Ext(b'\x0a\x00\x00\xff')
+            ),
+            fake.entry(
+                'tun0',
+                IPv4Ext(b'\x0a\x08\x00\x01'),
+                32,
+                flags=IFF_UP | IFF_POINTOPOINT,
+                peer=IPv4Ext(b'\x0a\x08\x00\x02'),
+            ),
+            fake.entry('eth0', IPv6Ext(b'\xfe\x80' + bytes(13) + b'\x01', 0, 2), 64),
+            fake.Entry('down0', 0),
+        ]
+    )
+    adapter_filter = AdapterFilter(multicast_flag=posix.IFF_MULTICAST)
+    adapters = list(posix.adapters_from_libc(libc, True, adapter_filter))
+    assert [a.name for a in adapters] == ['eth0', 'tun0', 'down0']
+    eth0, tun0, down0 = adapters
+    assert eth0.mac == '02:00:00:00:00:01' and eth0.stats == stats
+    assert [(ip.ip, ip.network_prefix) for ip in eth0.ips] == [
+        ('10.0.0.1', 24),
+        (('fe80::1', 0, 2), 64),
+    ]
+    assert str(eth0.ips[0].broadcast) == '10.0.0.255'
+    assert str(tun0.ips[0].peer) == '10.8.0.2' and tun0.ips[0].broadcast is None
+    assert down0.ips == [] and not down0.is_up
+    assert libc.outstanding == 0
+
+    addresses = posix.addresses_from_libc(libc, adapter_filter)
+    assert next(addresses).ip == eth0.ips[0]
+    addresses.close()
+    assert libc.outstanding == 0
+
+    with pytest.raises(OSError):
+        list(posix.adapters_from_libc(fake.FakeLibc([], errno=12), False, adapter_filter))
+
+
+def test_fake_libc_replays_recording() -> None:
+    if sys.platform == 'win32':
+        pytest.skip('POSIX only')
+    import ifaddr._fake as fake
+    import ifaddr._posix as posix
+    from ifaddr._shared import AdapterFilter
+
+    recording = fake.loads(fake.dumps(fake.record()))
+    replayed = posix.adapters_from_libc(
+        fake.FakeLibc(recording), True, AdapterFilter(multicast_flag=posix.IFF_MULTICAST)
+    )
+    assert list(replayed) == list(posix.get_adapters(include_unconfigured=True))
+
+
+def test_read_sockaddr() -> None:
+    import ctypes
+
+    import ifaddr._fake as fake
+    from ifaddr._shared import IPv6Ext
+    from ifaddr._sockaddr import read_sockaddr, sockaddr, sockaddr_to_ip
+
+    ips: List[Union[IPv4Ext, IPv6Ext]] = [
+        IPv4Ext(b'\x0a\x00\x00\x01'),
+        IPv6Ext(bytes(range(16)), 0x12345, 7),
+    ]
+    for ip in ips:
+        family = socket.AF_INET6 if isinstance(ip, IPv6Ext) else socket.AF_INET
+        buffer = ctypes.create_string_buffer(fake.sockaddr_bytes(ip))
+        assert read_sockaddr(ctypes.addressof(buffer)) == (family, ip)
+        assert sockaddr_to_ip(ctypes.cast(buffer, ctypes.POINTER(sockaddr))) == ip
+        # Netmasks without a family
+        sockaddr.from_buffer(buffer).sa_familiy = 0
+        assert read_sockaddr(ctypes.addressof(buffer), family) == (family, ip)
+        assert read_sockaddr(ctypes.addressof(buffer)) == (0, None)
+
+
+def test_convert_win32_adapters() -> None:
+    import ifaddr._fake as fake
+    import ifaddr._win32 as win32
+    from ifaddr._shared import AdapterFilter
+
+    raw = fake.win32_adapters(3)
+    raw[1].oper_status = 2
+    raw[2].unicast_addresses = []
+    raw[2].flags |= win32.IP_ADAPTER_NO_MULTICAST
+    adapters = win32.convert_win32_adapters(raw, include_unconfigured=True)
+    assert [a.index for a in adapters] == [1, 2, 3]
+    assert [a.is_up for a in adapters] == [True, False, True]
+    assert [a.multicast for a in adapters] == [True, True, False]
+    assert adapters[0].mac == '02:00:00:00:00:00'
+    assert [ip.nice_name for ip in adapters[0].ips] == ['Ethernet 0', 'Ethernet 0']
+
+    adapter_filter = AdapterFilter(
+        multicast_flag=win32.IFF_MULTICAST, family=socket.AF_INET, require_up=True
+    )
+    filtered = win32.convert_win32_adapters(
+        raw, include_unconfigured=False, adapter_filter=adapter_filter
+    )
+    assert [(a.index, [ip.ip for ip in a.ips]) for a in filtered] == [(1, ['10.0.0.0'])]
+
+
+def test_snapshot_serialization() -> None:
+    lan = ifaddr.IP.from_packed(b'\x0a\x00\x00\x01', 24, 'LAN', broadcast=b'\x0a\x00\x00\xff')
+    link_local = ipaddress.IPv6Address('fe80::1').packed
+    p2p = ifaddr.IP.from_packed(link_local, 64, 'eth0', 1, 2, peer=bytes(15) + b'\x02')
+    assert (lan.packed_broadcast, lan.packed_peer) == (b'\x0a\x00\x00\xff', None)
+    assert (p2p.packed_broadcast, p2p.packed_peer) == (None, bytes(15) + b'\x02')
+    eth0 = ifaddr.Adapter(
+        'eth0',
+        'eth0',
+        [lan, p2p],
+        index=2,
+        mac='02:00:00:00:00:01',
+        stats=ifaddr.AdapterStats(*range(10)),
+    )
+    unconfigured = ifaddr.Adapter('tuné', 'Tuné', [], multicast=False)
+    snapshot = ifaddr.Snapshot([eth0, unconfigured, make_adapter('eth0:1', '10.0.0.2', index=2)])
+
+    for restored in [
+        ifaddr.Snapshot.from_bytes(snapshot.to_bytes()),
+        ifaddr.Snapshot.from_json(snapshot.to_json()),
+    ]:
+        assert restored.adapters == snapshot.adapters
+        assert [a.stats for a in restored] == [a.stats for a in snapshot]
+        ips = restored.adapters[0].ips
+        assert (ips[0].broadcast, ips[0].nice_name) == ('10.0.0.255', 'LAN')
+        assert (ips[1].ip, ips[1].peer) == (('fe80::1', 1, 2), '::2')
+    assert len(snapshot.to_bytes()) < len(snapshot.to_json()) / 2
+
+    for data in [b'', b'IFAS', snapshot.to_bytes()[:-1], snapshot.to_bytes() + b'\0']:
+        with pytest.raises(ValueError):
+            ifaddr.Snapshot.from_bytes(data)
+    for text in ['', '{}', '{"version": 1, "adapters": [{}]}']:
+        with pytest.raises(ValueError):
+            ifaddr.Snapshot.from_json(text)
+
+
+def test_snapshot_lookups() -> None:
+    eth0 = make_adapter('eth0', '10.0.0.1', index=2, prefix=8)
+    eth1 = make_adapter('eth1', '10.1.0.1', index=3, prefix=16)
+    alias = make_adapter('eth1:1', '10.1.2.1', index=3, prefix=24)
+    link_local = ipaddress.IPv6Address('fe80::1').packed
+    for adapter in [eth0, eth1]:
+        ip = ifaddr.IP.from_packed(link_local, 64, adapter.name, scope_id=adapter.index or 0)
+        adapter.ips.append(ip)
+    snapshot = ifaddr.Snapshot([eth0, eth1, alias])
+
+    assert snapshot.by_name('eth1:1') is alias
+    assert snapshot.by_name('eth2') is None
+    assert snapshot.by_index(3) is eth1
+    assert snapshot.by_index(4) is None
+
+    assert snapshot.by_ip('10.1.0.1') == [(eth1, eth1.ips[0])]
+    assert snapshot.by_ip(ipaddress.IPv4Address('10.1.0.1')) == snapshot.by_ip(b'\x0a\x01\x00\x01')
+    assert [adapter for adapter, _ in snapshot.by_ip('fe80::1%eth0')] == [eth0, eth1]
+    assert snapshot.by_ip('10.1.0.2') == []
+
+    assert snapshot.route('10.200.0.1') == (eth0, eth0.ips[0])
+    assert snapshot.route('10.1.200.1') == (eth1, eth1.ips[0])
+    assert snapshot.route('10.1.2.200') == (alias, alias.ips[0])
+    assert snapshot.route('fe80::abcd') == (eth0, eth0.ips[1])
+    assert snapshot.route('192.168.0.1') is None
+    assert snapshot.route('fd00::1') is None
+    with pytest.raises(ValueError):
+        snapshot.route('eth0')
+
+
+def test_prefix_table_matches_ipaddress() -> None:
+    rng = random.Random(1)
+    adapters = [
+        make_adapter(f'eth{i}', str(ipaddress.IPv4Address(rng.getrandbits(32))), prefix=prefix)
+        for i, prefix in enumerate(rng.choice([0, 8, 16, 23, 24, 30, 32]) for _ in range(50))
+    ]
+    table = ifaddr.PrefixTable.from_adapters(adapters)
+    assert len(table) == len({(ip.network, ip.network_prefix) for a in adapters for ip in a.ips})
+
+    peers = [str(ip.address) for adapter in adapters for ip in adapter.ips]
+    peers += [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(200)]
+    expected = []
+    for peer in peers:
+        candidates = [
+            (ip.network_prefix, -i, (adapter, ip))
+            for i, adapter in enumerate(adapters)
+            for ip in adapter.ips
+            if ipaddress.IPv4Address(peer) in ip.network
+        ]
+        expected.append(max(candidates, key=lambda c: c[:2])[2] if candidates else None)
+    assert table.lookup_many(peers) == expected
+    assert [table.lookup(peer) for peer in peers] == expected
+    assert table.lookup_many([ipaddress.IPv6Address('::1')]) == [None]
+    with pytest.raises(ValueError):
+        table.lookup_many(['not an address'])
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='POSIX only')
+@pytest.mark.parametrize('backend', backends())
+def test_get_adapter(backend: Any) -> None:
+    for adapter in backend.get_adapters(include_unconfigured=True):
+        assert backend.get_adapter(adapter.name) == adapter
+        if ':' not in adapter.name:
+            assert backend.get_adapter(adapter.index) == adapter
+    assert backend.get_adapter('no-such-interface0') is None
+    assert backend.get_adapter(2**31 - 1) is None
+    for index in (0, -1, 2**31, 2**32, True, False):
+        assert backend.get_adapter(index) is None
+
+
+def test_get_adapter_of_alias() -> None:
+    if sys.platform == 'win32':
+        pytest.skip('POSIX only')
+    import ifaddr._fake as fake
+    import ifaddr._posix as posix
+    from ifaddr._shared import AdapterFilter
+
+    libc = fake.FakeLibc(
+        [
+            fake.link_entry('eth0', 2, b'\x02\x00\x00\x00\x00\x01'),
+            fake.entry('eth0', IPv4Ext(b'\x0a\x00\x00\x01'), 24),
+            fake.entry('eth0:1', IPv4Ext(b'\x0a\x00\x00\x02'), 24),
+        ]
+    )
+    alias = posix.adapter_from_libc(libc, 'eth0:1')
+    assert alias is not None
+    assert [ip.ip for ip in alias.ips] == ['10.0.0.2']
+    assert alias.mac == '02:00:00:00:00:01'
+    assert posix.adapter_from_libc(libc, 'eth0:2') is None
+
+    # Filtering on an alias keeps the link-layer data, but not the interface.
+    for names in (['eth0:1'], ['eth*:1']):
+        adapter_filter = AdapterFilter(multicast_flag=posix.IFF_MULTICAST, names=names)
+        adapters = list(posix.adapters_from_libc(libc, True, adapter_filter))
+        assert [(a.name, a.mac, a.index) for a in adapters] == [('eth0:1', '02:00:00:00:00:01', 2)]
+
+
+def test_long_link_layer_addresses(monkeypatch: pytest.MonkeyPatch) -> None:
+    if sys.platform == 'win32':
+        pytest.skip('POSIX only')
+    import ctypes
+
+    import ifaddr._fake as fake
+    import ifaddr._posix as posix
+    from ifaddr._shared import AdapterFilter
+
+    # InfiniBand addresses have 20 bytes.
+    address = bytes(range(1, 21))
+    libc = fake.FakeLibc([fake.link_entry('ib0', 3, address)])
+    adapter_filter = AdapterFilter(multicast_flag=posix.IFF_MULTICAST)
+    (adapter,) = posix.adapters_from_libc(libc, True, adapter_filter)
+    assert (adapter.mac, adapter.index) == (address.hex(':'), 3)
+
+    # The sockaddr_dl of BSD derived systems, whatever this system is.
+    monkeypatch.setattr(posix, 'AF_PACKET', None)
+    monkeypatch.setattr(posix, 'AF_LINK', 18)
+    entry = fake.link_entry('ib0', 3, address)
+    assert entry.addr is not None
+    buffer = ctypes.create_string_buffer(entry.addr, len(entry.addr))
+    link_layer = posix._decode_link_layer(ctypes.addressof(buffer), 0, 18)
+    assert link_layer == posix.LinkLayer(address.hex(':'), None, 3)
+
+
+def test_import_is_lazy() -> None:
+    code = 'import sys; before = set(sys.modules); import ifaddr; print(*set(sys.modules) - before)'
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, check=True, text=True
+    )
+    # Neither the backend nor ctypes, ipaddress and friends are loaded yet.
+    assert result.stdout.split() == ['ifaddr']
+
+    # Neither do snapshots need ipaddress.
+    code = 'import sys, ifaddr; ifaddr.Snapshot([]); print("ipaddress" in sys.modules)'
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, check=True, text=True
+    )
+    assert result.stdout.split() == ['False']
+
+
+def test_profile_hook() -> None:
+    profiles: List[ifaddr.CallProfile] = []
+    previous = ifaddr.set_profile_hook(profiles.append)
+    try:
+        adapters = list(ifaddr.get_adapters())
+        ifaddr.get_adapter(adapters[0].name)
+    finally:
+        ifaddr.set_profile_hook(previous)
+    ifaddr.get_adapters()
+    assert [p.function for p in profiles] == ['get_adapters', 'get_adapter']
+    profile = profiles[0]
+    assert profile.adapters == len(adapters)
+    assert profile.addresses == sum(len(a.ips) for a in adapters)
+    assert profile.phases and profile.syscalls
+    assert 0 < sum(profile.phases.values()) <= profile.total
+    assert profiles[1].adapters == 1
+
+
+def test_profile_getifaddrs() -> None:
+    if sys.platform == 'win32':
+        pytest.skip('POSIX only')
+    import ifaddr._fake as fake
+    import ifaddr._posix as posix
+    from ifaddr._profile import CallProfile
+    from ifaddr._shared import AdapterFilter
+
+    profile = CallProfile('get_adapters', 'getifaddrs')
+    libc = fake.FakeLibc(fake.synthetic(10))
+    adapter_filter = AdapterFilter(multicast_flag=posix.IFF_MULTICAST)
+    adapters = list(posix.adapters_from_libc(libc, False, adapter_filter, profile))
+    # The indexes come from the link-layer entries, no extra system calls.
+    assert [a.index for a in adapters] == list(range(1, 11))
+    assert list(profile.phases) == ['getifaddrs', 'walk']
+    assert profile.syscalls == {'getifaddrs': 1}
+
+    # Without a link-layer entry the index is looked up, once for all interfaces.
+    (index, name), *_ = socket.if_nameindex()
+    profile = CallProfile('get_adapters', 'getifaddrs')
+    libc = fake.FakeLibc(
+        [
+            fake.entry(name, IPv4Ext(b'\x0a\x00\x00\x01'), 24),
+            fake.entry(f'{name}:1', IPv4Ext(b'\x0a\x00\x00\x02'), 24),
+        ]
+    )
+    adapters = list(posix.adapters_from_libc(libc, False, adapter_filter, profile))
+    assert [a.index for a in adapters] == [index, index]
+    assert profile.syscalls == {'getifaddrs': 1, 'if_nameindex': 1}
+
+
+def test_netns_get_adapters() -> None:
+    if not sys.platform.startswith('linux'):
+        pytest.skip('Linux only')
+    import ifaddr.netns
+
+    paths = ['/proc/self/ns/net', '/no/such/namespace', '/proc/self/ns/uts']
+    child = None
+    if os.geteuid() == 0 and shutil.which('unshare') and shutil.which('ip'):
+        child = subprocess.Popen(
+            ['unshare', '--net', 'sh', '-c', 'ip link set lo up; echo; sleep 60'],
+            stdout=subprocess.PIPE,
+        )
+        assert child.stdout is not None
+        child.stdout.readline()
+        paths.append(f'/proc/{child.pid}/ns/net')
+    try:
+        results = ifaddr.netns.get_adapters(paths)
+    finally:
+        if child is not None:
+            child.kill()
+            child.wait()
+
+    assert list(results) == paths
+    # One bad namespace doesn't spoil the others.
+    assert isinstance(results['/no/such/namespace'].error, FileNotFoundError)
+    assert results['/proc/self/ns/uts'].error is not None
+    own = results['/proc/self/ns/net']
+    if own.error is not None:
+        pytest.skip(f'Cannot enter network namespaces: {own.error}')
+    assert own.adapters == list(ifaddr.get_adapters())
+    if child is not None:
+        (loopback,) = results[paths[-1]].adapters or []
+        assert [ip.ip for ip in loopback.ips] == ['127.0.0.1', ('::1', 0, 0)]
+
+
+def test_netns_elsewhere(monkeypatch: pytest.MonkeyPatch) -> None:
+    import ifaddr.netns
+
+    monkeypatch.setattr(sys, 'platform', 'darwin')
+    with pytest.raises(OSError):
+        ifaddr.netns.get_adapters_in('/proc/self/ns/net')
+    (result,) = ifaddr.netns.get_adapters(['/proc/self/ns/net']).values()
+    assert result.adapters is None
+    assert isinstance(result.error, OSError)
+    assert ifaddr.netifaces.gateways() == {'default': {}}